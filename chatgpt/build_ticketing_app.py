@@ -1,77 +1,233 @@
 #!/usr/bin/env python3
 import argparse
-import re
+import sys
+import time
 from pathlib import Path
 
-# Match:
-#   - A markdown heading (## to ######)
-#   - Optional label text and/or colon
-#   - A backticked relative path like `api/Dockerfile` or `.env.example`
-#   - The very next fenced code block ```lang\n ... \n```
-HEADER_AND_BLOCK_RE = re.compile(
-    r"""
-    ^\#{2,6}[ \t]*                              # heading level 2-6
-    (?:[^\n`]*?:?[ \t]*)?                       # optional label + colon
-    `(?P<relpath>[^`\n]+)`[ \t]*\r?\n           # backticked path
-    (?:[ \t]*\r?\n)*                            # optional blank lines
-    ^```(?P<lang>[^\n]*)\r?\n                   # opening fence (lang optional)
-    (?P<content>.*?)                            # file content (non-greedy)
-    ^```\s*$                                    # closing fence
-    """,
-    re.MULTILINE | re.DOTALL | re.VERBOSE,
-)
-
-def iter_blocks(text: str):
-    for m in HEADER_AND_BLOCK_RE.finditer(text):
-        relpath = m.group("relpath").strip()
-        lang = (m.group("lang") or "").strip()
-        content = m.group("content")
-        yield relpath, lang, content
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import perf  # noqa: E402
+from common.archive import FORMATS, ArchiveSink  # noqa: E402
+from common.blockcache import load_blocks, sidecar_path  # noqa: E402
+from common.emit import CREATED, FAILED, OVERWRITTEN, SKIPPED, UNCHANGED, FileEmitter  # noqa: E402
+from common.fences import mapped, scan  # noqa: E402
+from common.incremental import IncrementalIndex  # noqa: E402
+from common.manifest import MANIFEST_NAME, Manifest  # noqa: E402
+from common.pathfilter import PathFilter, add_arguments as add_filter_arguments  # noqa: E402
+from common.staging import StagedTree  # noqa: E402
+from common.watch import FileWatcher  # noqa: E402
+
+def warn(issue):
+    print(f"⚠️  Malformed block at {issue}")
+
+def iter_blocks(buf, blocks=None, keep=None):
+    """
+    Yield (relpath, lang, content) for every heading + fenced block in buf.
+    Each block is decoded only once its closing fence has been read, so with a
+    memory-mapped buf peak memory stays flat no matter how large the spec is.
+    blocks is a precomputed index of buf (see --cache); without it buf is scanned.
+    Blocks whose path fails keep are never sliced out of buf or decoded.
+    """
+    for block in scan(buf, on_issue=warn) if blocks is None else blocks:
+        if keep is None or keep(block.path):
+            with perf.rendering(block.path):
+                content = block.text(buf)
+            yield block.path, block.lang, content
+
+def spec_blocks(args, buf):
+    """The cached block index of the input with --cache, else None (scan as we go)."""
+    return load_blocks(Path(args.input), buf, on_issue=warn) if args.cache else None
+
+def resolve_under(base: Path, rel: str):
+    """Normalize rel against base; None if it would escape base."""
+    out = (base / rel).resolve()
+    try:
+        out.relative_to(base)
+    except ValueError:
+        return None
+    return out
+
+def report(r, shown_root: Path):
+    # Paths are shown under the final root even when writing into a stage dir.
+    if r.status == SKIPPED and r.path is None:
+        print(f"⚠️  Skipping path outside base: {r.label}")
+    elif r.status == SKIPPED:
+        print(f"⏭️  Exists, skipped: {shown_root / r.label}")
+    elif r.status == FAILED:
+        print(f"❌ Failed: {shown_root / r.label}: {r.error}")
+    elif r.status == UNCHANGED:
+        pass
+    else:
+        print(f"✅ Wrote: {shown_root / r.label}")
+
+def materialize(blocks, base: Path, emitter: FileEmitter, shown_root: Path):
+    """Queue every block on the emitter, reporting results in input order."""
+    for rel, lang, content in blocks:
+        out = resolve_under(base, rel)
+        if out is None:
+            emitter.skip(rel, "outside base")
+        else:
+            emitter.submit(out.relative_to(base).as_posix(), out, content)
+        for r in emitter.ready():
+            report(r, shown_root)
+    for r in emitter.drain():
+        report(r, shown_root)
 
 def main():
     ap = argparse.ArgumentParser(description="Materialize files under 'ticketing-app' from a spec doc.")
     ap.add_argument("input", help="Path to the input .md/.txt file")
     ap.add_argument("--base-dir", default="ticketing-app", help="Output root dir (default: ticketing-app)")
     ap.add_argument("--no-clobber", action="store_true", help="Skip writing if file already exists")
+    ap.add_argument("--stream", action="store_true",
+                    help="Memory-map the input and write each file as soon as its block closes")
+    ap.add_argument("--no-manifest", action="store_true",
+                    help=f"Rewrite every file instead of skipping ones unchanged since the last run ({MANIFEST_NAME})")
+    ap.add_argument("--staged", action="store_true",
+                    help="Write into a sibling stage dir; if the run succeeds, rename each file into place "
+                         "(atomic per file, not for the tree)")
+    ap.add_argument("--watch", action="store_true",
+                    help="Keep running and re-emit only the blocks that change when the input is saved")
+    ap.add_argument("--jobs", type=int, default=1, help="Number of concurrent file writers (default: 1)")
+    ap.add_argument("--archive", metavar="DEST",
+                    help="Stream files into a tar/zip archive instead of --base-dir ('-' for stdout, "
+                         "e.g. | docker build -)")
+    ap.add_argument("--archive-format", choices=FORMATS,
+                    help="Archive format (default: from DEST's extension, tar for stdout)")
+    ap.add_argument("--cache", action="store_true",
+                    help="Reuse/refresh a sidecar block index next to the input so unchanged specs aren't re-scanned")
+    ap.add_argument("--list", action="store_true", help="List the file blocks in the input and exit")
+    add_filter_arguments(ap)
+    perf.add_arguments(ap)
     args = ap.parse_args()
+    args.keep = PathFilter(args.only, args.exclude) or None
 
-    base = Path(args.base_dir).resolve()
-    base.mkdir(parents=True, exist_ok=True)
+    if args.profile:
+        perf.start()
+        try:
+            return dispatch(args)
+        finally:
+            # Keep the report off stdout when the archive is being streamed there.
+            perf.finish(args.profile, file=sys.stderr if args.archive == "-" else None)
+    return dispatch(args)
 
-    text = Path(args.input).read_text(encoding="utf-8", errors="replace")
-    matches = list(iter_blocks(text))
+def dispatch(args):
+    if args.list:
+        return list_blocks(args)
+    if args.archive:
+        return archive(args)
 
-    if not matches:
+    target = Path(args.base_dir).resolve()
+    if args.watch:
+        return watch(args, target)
+
+    def feed(base, emitter):
+        # A mapped input means filtered or cached runs only fault in the blocks they write.
+        if args.stream or args.cache or args.keep:
+            with mapped(Path(args.input)) as buf:
+                materialize(iter_blocks(buf, spec_blocks(args, buf), args.keep), base, emitter, target)
+        else:
+            buf = Path(args.input).read_bytes()
+            materialize(iter_blocks(buf, spec_blocks(args, buf), args.keep), base, emitter, target)
+
+    counts = run(args, target, feed)
+    if not any(counts.values()) and args.keep:
+        print("No file blocks matched --only/--exclude.")
+        return
+    if not any(counts.values()):
         print("No file blocks found. Make sure headings contain a backticked path followed by a code fence.")
         return
 
-    created = overwritten = skipped = 0
-    for rel, lang, content in matches:
-        # Normalize and keep within base
-        out = (base / rel).resolve()
-        try:
-            out.relative_to(base)
-        except ValueError:
-            print(f"⚠️  Skipping path outside base: {rel}")
-            skipped += 1
-            continue
+    failed = f", Failed: {counts[FAILED]}" if counts[FAILED] else ""
+    print(f"\nDone. Created: {counts['created']}, Overwritten: {counts['overwritten']}, "
+          f"Unchanged: {counts[UNCHANGED]}, Skipped: {counts['skipped']}{failed}. Base: {target}")
 
-        out.parent.mkdir(parents=True, exist_ok=True)
+def archive(args):
+    """Stream every block straight into an archive; nothing is written under --base-dir."""
+    # Map the input first: a missing spec must not leave an empty archive behind.
+    with mapped(Path(args.input)) as buf, ArchiveSink(args.archive, args.archive_format) as sink:
+        for rel, lang, content in iter_blocks(buf, spec_blocks(args, buf), args.keep):
+            try:
+                name = sink.add(rel, content.encode("utf-8"))
+            except ValueError:
+                print(f"⚠️  Skipping path outside base: {rel}")
+                continue
+            print(f"📦 Added: {name}")
+        # Still inside the sink: with DEST '-' this goes to stderr, not the archive.
+        if not sink.count:
+            print("No file blocks found. Make sure headings contain a backticked path followed by a code fence.")
+        else:
+            print(f"\nDone. Archived {sink.count} file(s), {sink.bytes} bytes as {sink.fmt}. "
+                  f"Archive: {args.archive}")
 
-        if out.exists() and args.no_clobber:
-            print(f"⏭️  Exists, skipped: {out}")
-            skipped += 1
-            continue
+def list_blocks(args):
+    """Print path, language, size and heading line of every block without writing anything."""
+    spec = Path(args.input)
+    with mapped(spec) as buf:
+        blocks = load_blocks(spec, buf, on_issue=warn, cache=args.cache)
+    if args.keep:
+        blocks = [b for b in blocks if args.keep(b.path)]
+    for b in blocks:
+        print(f"{b.path}\t{b.lang or '-'}\t{b.end - b.start} bytes\tline {b.line}")
+    print(f"\n{len(blocks)} block(s)" + (f" (index: {sidecar_path(spec)})" if args.cache else ""))
 
-        if out.exists():
-            overwritten += 1
-        else:
-            created += 1
+def run(args, target: Path, feed, manifest=None):
+    """
+    Prepare the output root (staged or live), let feed(base, emitter) queue the
+    blocks, then save the manifest and commit the stage. Returns the counts.
+    """
+    stage = StagedTree(target).begin() if args.staged else None
+    base = stage.path if stage else target
+    base.mkdir(parents=True, exist_ok=True)
 
-        out.write_text(content, encoding="utf-8")
-        print(f"✅ Wrote: {out}")
+    if args.no_manifest:
+        manifest = None
+    elif manifest is None:
+        manifest = Manifest(target)   # compares against the live tree, also when staged
+    try:
+        with FileEmitter(jobs=args.jobs, no_clobber=args.no_clobber, manifest=manifest,
+                         detach=stage is not None, live=stage.live if stage else None) as emitter:
+            feed(base, emitter)
+        if stage and (emitter.counts[CREATED] or emitter.counts[OVERWRITTEN]):
+            stage.commit()
+        elif stage:
+            stage.abort()             # nothing changed: don't touch the target
+        if manifest is not None:
+            manifest.save()           # after the commit: records stats of the moved files
+    except BaseException:
+        if stage:
+            stage.abort()
+        raise
+    return emitter.counts
 
-    print(f"\nDone. Created: {created}, Overwritten: {overwritten}, Skipped: {skipped}. Base: {base}")
+def watch(args, target: Path):
+    """
+    Re-materialize on every save of the input. The previous parse is kept, so
+    only the edited window of the spec is re-tokenized and only blocks whose
+    content hash changed are written.
+    """
+    spec = Path(args.input).resolve()
+    index = IncrementalIndex()
+    manifest = None if args.no_manifest else Manifest(target)
+    with FileWatcher(spec) as watcher:
+        print(f"👀 Watching {spec} ({watcher.mode}). Ctrl+C to stop.")
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    # Plain read, not mmap: an editor may truncate the file while we look at it.
+                    buf = spec.read_bytes()
+                except FileNotFoundError:
+                    watcher.wait()
+                    continue
+                changed = index.update(buf, on_issue=warn)
+                blocks = iter_blocks(buf, changed, args.keep)
+                counts = run(args, target, lambda base, em: materialize(blocks, base, em, target), manifest)
+                written = counts[CREATED] + counts[OVERWRITTEN]
+                print(f"🔁 {len(changed)} changed block(s), {written} file(s) written, "
+                      f"{index.rescanned} of {len(buf)} bytes re-parsed in "
+                      f"{(time.perf_counter() - t0) * 1000:.1f} ms")
+                watcher.wait()
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
 
 if __name__ == "__main__":
     main()
@@ -2,59 +2,50 @@
 # fix_angular_schema.py
 # Adds missing tsConfig to Angular build target and creates tsconfig.app.json.
 
-import json
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-root = Path("ticketing-app") / "web"
-
-def load_json(p: Path):
-    if not p.exists():
-        raise SystemExit(f"Missing {p}. Are you running this from the folder that contains 'ticketing-app/'?")
-    return json.loads(p.read_text(encoding="utf-8"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.jsonpatch import (  # noqa: E402
+    CREATED, UNCHANGED, default, defaults, patch_file, seed, union,
+)
 
-def save_json(p: Path, data):
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+root = Path("ticketing-app") / "web"
 
-def patch_angular_json():
-    p = root / "angular.json"
-    data = load_json(p)
+# One declarative patch list per file: each file is loaded once, patched, and
+# written back only if its bytes change.
 
-    # locate the first project (usually "web")
-    projects = data.get("projects") or {}
-    if not projects:
-        raise SystemExit("No projects found in web/angular.json")
-    proj_name, proj = next(iter(projects.items()))
-    arch = proj.setdefault("architect", {})
-    build = arch.setdefault("build", {})
-    # Angular 17 uses "builder": "@angular-devkit/build-angular:browser"
-    build.setdefault("builder", "@angular-devkit/build-angular:browser")
-    opts = build.setdefault("options", {})
-    # ensure tsConfig is present
-    opts.setdefault("tsConfig", "tsconfig.app.json")
-
-    # keep sensible defaults
-    opts.setdefault("outputPath", "dist/web")
-    opts.setdefault("index", "src/index.html")
-    opts.setdefault("main", "src/main.ts")
-    opts.setdefault("assets", ["src/favicon.ico", "src/assets"])
-    opts.setdefault("styles", ["src/app/styles.css"])
-
-    # production configuration (optional but nice)
-    cfgs = build.setdefault("configurations", {})
-    prod = cfgs.setdefault("production", {})
-    prod.setdefault("optimization", True)
-    prod.setdefault("outputHashing", "all")
-
-    save_json(p, data)
-    print(f"✔ Patched {p} with tsConfig option")
+TSCONFIG_ROOT = [
+    # minimal root tsconfig if missing (or an empty placeholder)
+    seed({
+        "compilerOptions": {
+            "target": "ES2022",
+            "module": "ES2022",
+            "moduleResolution": "node",
+            "useDefineForClassFields": False,
+            "emitDecoratorMetadata": True,
+            "experimentalDecorators": True,
+            "skipLibCheck": True,
+            "lib": ["ES2022", "dom"],
+            "types": []
+        }
+    }),
+    # existing ones get the DOM/ES2022 libs, appended after whatever is there
+    union("compilerOptions/lib", ["dom", "ES2022"], casefold=True),
+    defaults("compilerOptions", {
+        "skipLibCheck": True,
+        "moduleResolution": "node",
+        "module": "ES2022",
+        "target": "ES2022",
+        "types": [],
+    }),
+]
 
-def ensure_tsconfig_app():
-    p = root / "tsconfig.app.json"
-    if p.exists():
-        print(f"• Exists {p}")
-        return
-    content = {
+TSCONFIG_APP = [
+    seed({
         "extends": "./tsconfig.json",
         "compilerOptions": {
             "outDir": "./out-tsc/app",
@@ -64,48 +55,153 @@ def ensure_tsconfig_app():
         "angularCompilerOptions": {
             # Standalone components are default in v17, no extra flags needed.
         }
-    }
-    save_json(p, content)
-    print(f"✔ Created {p}")
+    }),
+]
 
-def ensure_tsconfig_root():
-    p = root / "tsconfig.json"
-    if not p.exists():
-        # minimal root tsconfig if missing
-        content = {
-            "compilerOptions": {
-                "target": "ES2022",
-                "module": "ES2022",
-                "moduleResolution": "node",
-                "useDefineForClassFields": False,
-                "emitDecoratorMetadata": True,
-                "experimentalDecorators": True,
-                "skipLibCheck": True,
-                "lib": ["ES2022", "dom"],
-                "types": []
-            }
-        }
-        save_json(p, content)
+# a placeholder angular.json gets a minimal "web" application to patch
+PLACEHOLDER_WORKSPACE = {"version": 1, "projects": {"web": {"projectType": "application", "root": "", "sourceRoot": "src"}}}
+
+def _under(root: str, rel: str) -> str:
+    return f"{root.rstrip('/')}/{rel}" if root else rel
+
+def app_patches(name: str, proj: dict):
+    build = ("projects", name, "architect", "build")
+    root, src = proj.get("root", ""), proj.get("sourceRoot") or _under(proj.get("root", ""), "src")
+    # The esbuild "application" builder calls the entry point "browser" and rejects "main".
+    builder = proj.get("architect", {}).get("build", {}).get("builder", "")
+    entry = "browser" if builder.endswith(":application") else "main"
+    return [
+        # Angular 17 uses "builder": "@angular-devkit/build-angular:browser"
+        default(build + ("builder",), "@angular-devkit/build-angular:browser"),
+        defaults(build + ("options",), {
+            # ensure tsConfig is present
+            "tsConfig": _under(root, "tsconfig.app.json"),
+            # keep sensible defaults
+            "outputPath": f"dist/{name}",
+            "index": f"{src}/index.html",
+            entry: f"{src}/main.ts",
+            "assets": [f"{src}/favicon.ico", f"{src}/assets"],
+            "styles": [f"{src}/app/styles.css"],
+        }),
+        # production configuration (optional but nice)
+        defaults(build + ("configurations", "production"), {
+            "optimization": True,
+            "outputHashing": "all",
+        }),
+    ]
+
+def lib_patches(name: str, proj: dict):
+    build = ("projects", name, "architect", "build")
+    root = proj.get("root", "")
+    return [
+        default(build + ("builder",), "@angular-devkit/build-angular:ng-packagr"),
+        defaults(build + ("options",), {
+            "project": _under(root, "ng-package.json"),
+            "tsConfig": _under(root, "tsconfig.lib.json"),
+        }),
+        default(build + ("configurations", "production", "tsConfig"), _under(root, "tsconfig.lib.prod.json")),
+    ]
+
+def angular_patches(doc: dict):
+    """Patches for every project in an angular.json: applications get a browser build, libraries ng-packagr."""
+    if not doc:
+        return [seed(PLACEHOLDER_WORKSPACE)] + app_patches("web", PLACEHOLDER_WORKSPACE["projects"]["web"])
+    projects = doc.get("projects") or {}
+    if not projects:
+        raise ValueError("no projects found")
+    patches = []
+    for name, proj in projects.items():
+        kind = lib_patches if proj.get("projectType") == "library" else app_patches
+        patches += kind(name, proj)
+    return patches
+
+def patch(name: str, patches, create: bool = False, done: str = "Patched"):
+    p = root / name
+    try:
+        status, _ = patch_file(p, patches, create=create)
+    except FileNotFoundError:
+        raise SystemExit(f"Missing {p}. Are you running this from the folder that contains 'ticketing-app/'?")
+    except ValueError as e:
+        raise SystemExit(f"Can't patch {p}: {e}")
+    if status == UNCHANGED:
+        print(f"• Up to date {p}")
+    elif status == CREATED:
         print(f"✔ Created {p}")
-        return
-
-    data = load_json(p)
-    co = data.setdefault("compilerOptions", {})
-    libs = set(co.get("lib", []))
-    if "dom" not in {l.lower() for l in libs}:
-        libs.add("dom")
-    if "ES2022" not in libs and "es2022" not in {l for l in libs}:
-        libs.add("ES2022")
-    co["lib"] = sorted(libs)
-    co.setdefault("skipLibCheck", True)
-    co.setdefault("moduleResolution", "node")
-    co.setdefault("module", "ES2022")
-    co.setdefault("target", "ES2022")
-    co.setdefault("types", co.get("types", []))
-    save_json(p, data)
-    print(f"✔ Ensured DOM/ES2022 libs in {p}")
+    else:
+        print(f"✔ {done} {p}")
+
+def ensure_tsconfig_root():
+    patch("tsconfig.json", TSCONFIG_ROOT, create=True, done="Ensured DOM/ES2022 libs in")
+
+def ensure_tsconfig_app():
+    patch("tsconfig.app.json", TSCONFIG_APP, create=True)
+
+def patch_angular_json():
+    patch("angular.json", angular_patches, done="Patched tsConfig option in")
+
+# ---- --workspaces: every project in every angular.json under a set of roots ----
+
+SKIP_DIRS = {"node_modules", ".git", ".angular", "dist", "out-tsc"}
+
+def find_workspaces(roots):
+    """Every angular.json under roots (a root may also be the file itself), sorted, without duplicates."""
+    found = set()
+    for r in map(Path, roots):
+        if r.is_file():
+            found.add(r.resolve())
+            continue
+        for d, dirs, files in os.walk(r):
+            dirs[:] = [x for x in dirs if x not in SKIP_DIRS]
+            if "angular.json" in files:
+                found.add((Path(d) / "angular.json").resolve())
+    return sorted(found)
+
+def patch_workspace(p: Path):
+    """(path, status or None, changes, error) for one angular.json; never raises."""
+    changes = []
+    try:
+        status, _ = patch_file(p, angular_patches, changes=changes)
+        return p, status, changes, None
+    except (OSError, ValueError) as e:
+        return p, None, changes, str(e)
+
+def patch_workspaces(roots, jobs: int) -> int:
+    paths = find_workspaces(roots)
+    if not paths:
+        print("No angular.json found under " + ", ".join(map(str, roots)))
+        return 1
+    patched = failed = changed = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for p, status, changes, error in pool.map(patch_workspace, paths):
+            if error:
+                failed += 1
+                print(f"❌ {p}: {error}")
+            elif status == UNCHANGED:
+                print(f"• Up to date {p}")
+            else:
+                patched += 1
+                changed += len(changes)
+                print(f"✔ Patched {p} ({len(changes)} changes)")
+                for c in changes:
+                    print(f"    + {c}")
+    print(f"\n{len(paths)} workspaces: {patched} patched ({changed} changes), "
+          f"{len(paths) - patched - failed} up to date, {failed} failed")
+    return 1 if failed else 0
 
 def main():
+    global root
+    ap = argparse.ArgumentParser(description="Add tsConfig to the Angular build target and create tsconfig.app.json")
+    ap.add_argument("--root", default="ticketing-app", help="Project root containing web/ (default: ticketing-app)")
+    ap.add_argument("--workspaces", nargs="+", metavar="DIR",
+                    help="Instead, patch every project of every angular.json found under DIR(s); "
+                         "tsconfig files are left alone")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 4,
+                    help="angular.json files patched concurrently with --workspaces (default: CPU count)")
+    args = ap.parse_args()
+    if args.workspaces:
+        sys.exit(patch_workspaces(args.workspaces, args.jobs))
+    root = Path(args.root) / "web"
+
     ensure_tsconfig_root()
     ensure_tsconfig_app()
     patch_angular_json()
@@ -1,14 +1,22 @@
 #!/usr/bin/env python3
 # upgrade_auth_qr.py
 # Adds Registration, JWT, Google OAuth, and a camera QR scanner into the ticketing-app scaffold.
-import os, json, textwrap
+import argparse, os, sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.archive import FORMATS, ArchiveSink  # noqa: E402
+from common import perf  # noqa: E402
+from common.pathfilter import PathFilter, add_arguments as add_filter_arguments  # noqa: E402
+from common.scaffold import Registry, dedent, dumps  # noqa: E402
+from common.staging import StagedTree  # noqa: E402
+from common.vfs import output  # noqa: E402
+
 ROOT = Path("ticketing-app")
 
-FILES = {
+FILES = Registry({
     # ---------- ROOT ----------
-    ".env.example": textwrap.dedent("""\
+    ".env.example": dedent("""\
     # Postgres
     POSTGRES_USER=tickets
     POSTGRES_PASSWORD=tickets
@@ -40,7 +48,7 @@ FILES = {
     """),
 
     # ---------- API ----------
-    "api/package.json": json.dumps({
+    "api/package.json": dumps({
         "name": "tickets-api",
         "version": "0.2.0",
         "private": True,
@@ -81,7 +89,7 @@ FILES = {
     }, indent=2),
 
     # Extend user entity for Google info
-    "api/src/entities/user.entity.ts": textwrap.dedent("""\
+    "api/src/entities/user.entity.ts": dedent("""\
     import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, UpdateDateColumn } from 'typeorm';
 
     @Entity('users')
@@ -99,7 +107,7 @@ FILES = {
     """),
 
     # --- Auth DTOs
-    "api/src/auth/dto.ts": textwrap.dedent("""\
+    "api/src/auth/dto.ts": dedent("""\
     import { IsEmail, IsString, MinLength } from 'class-validator';
 
     export class RegisterDto {
@@ -114,7 +122,7 @@ FILES = {
     """),
 
     # --- Tokens service
-    "api/src/auth/tokens.service.ts": textwrap.dedent("""\
+    "api/src/auth/tokens.service.ts": dedent("""\
     import { Injectable } from '@nestjs/common';
     import { JwtService } from '@nestjs/jwt';
 
@@ -137,7 +145,7 @@ FILES = {
     """),
 
     # --- JWT strategies
-    "api/src/auth/jwt.strategy.ts": textwrap.dedent("""\
+    "api/src/auth/jwt.strategy.ts": dedent("""\
     import { Injectable } from '@nestjs/common';
     import { PassportStrategy } from '@nestjs/passport';
     import { ExtractJwt, Strategy } from 'passport-jwt';
@@ -155,7 +163,7 @@ FILES = {
     }
     """),
 
-    "api/src/auth/jwt-refresh.strategy.ts": textwrap.dedent("""\
+    "api/src/auth/jwt-refresh.strategy.ts": dedent("""\
     import { Injectable } from '@nestjs/common';
     import { PassportStrategy } from '@nestjs/passport';
     import { ExtractJwt, Strategy } from 'passport-jwt';
@@ -174,7 +182,7 @@ FILES = {
     """),
 
     # --- Google OAuth strategy
-    "api/src/auth/google.strategy.ts": textwrap.dedent("""\
+    "api/src/auth/google.strategy.ts": dedent("""\
     import { PassportStrategy } from '@nestjs/passport';
     import { Strategy, VerifyCallback } from 'passport-google-oauth20';
     import { Injectable } from '@nestjs/common';
@@ -199,7 +207,7 @@ FILES = {
     """),
 
     # --- Auth module/service/controller
-    "api/src/auth/auth.module.ts": textwrap.dedent("""\
+    "api/src/auth/auth.module.ts": dedent("""\
     import { Module } from '@nestjs/common';
     import { TypeOrmModule } from '@nestjs/typeorm';
     import { PassportModule } from '@nestjs/passport';
@@ -225,7 +233,7 @@ FILES = {
     export class AuthModule {}
     """),
 
-    "api/src/auth/auth.service.ts": textwrap.dedent("""\
+    "api/src/auth/auth.service.ts": dedent("""\
     import { Injectable } from '@nestjs/common';
     import { InjectRepository } from '@nestjs/typeorm';
     import { Repository } from 'typeorm';
@@ -273,7 +281,7 @@ FILES = {
     }
     """),
 
-    "api/src/auth/auth.controller.ts": textwrap.dedent("""\
+    "api/src/auth/auth.controller.ts": dedent("""\
     import { Body, Controller, Get, Post, Req, Res, UseGuards } from '@nestjs/common';
     import { Response, Request } from 'express';
     import { AuthService } from './auth.service';
@@ -352,7 +360,7 @@ FILES = {
     """),
 
     # ---------- WEB ----------
-    "web/package.json": json.dumps({
+    "web/package.json": dumps({
         "name": "web",
         "version": "0.2.0",
         "private": True,
@@ -384,7 +392,7 @@ FILES = {
     }, indent=2),
 
     # Camera QR scanner component
-    "web/src/app/features/checker/scan.component.ts": textwrap.dedent("""\
+    "web/src/app/features/checker/scan.component.ts": dedent("""\
     import { Component, OnDestroy, signal } from '@angular/core';
     import { HttpClient } from '@angular/common/http';
     import { BrowserMultiFormatReader } from '@zxing/browser';
@@ -441,7 +449,7 @@ FILES = {
     """),
 
     # Simple Google button (redirects to backend)
-    "web/src/app/features/auth/google-button.component.ts": textwrap.dedent("""\
+    "web/src/app/features/auth/google-button.component.ts": dedent("""\
     import { Component } from '@angular/core';
 
     @Component({
@@ -462,7 +470,7 @@ FILES = {
     """),
 
     # Minimal register form component (optional; app component will still have inline forms)
-    "web/src/app/features/auth/register.component.ts": textwrap.dedent("""\
+    "web/src/app/features/auth/register.component.ts": dedent("""\
     import { Component, inject, signal } from '@angular/core';
     import { FormsModule } from '@angular/forms';
     import { HttpClient } from '@angular/common/http';
@@ -496,7 +504,7 @@ FILES = {
     """),
 
     # Update the main AppComponent to include Google + Camera scanner
-    "web/src/app/app.component.ts": textwrap.dedent("""\
+    "web/src/app/app.component.ts": dedent("""\
     import { Component, inject, signal } from '@angular/core';
     import { HttpClient } from '@angular/common/http';
     import { FormsModule } from '@angular/forms';
@@ -598,18 +606,59 @@ FILES = {
       }
     }
     """),
-}
+})
+
+# Importable: common.scaffold.load_script("chatgpt/generate-repo.py").generate(select=[...])
+# streams (path, bytes) without touching the filesystem.
+generate = FILES.generate
 
-def write_file(path: Path, content: str):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    if not content.endswith("\n"):
-        content += "\n"
-    path.write_text(content, encoding="utf-8")
+def write_file(path: Path, data: bytes, label=None):
+    # Replace instead of truncating in place: a file may be a hardlink shared
+    # with the live tree (StagedTree(swap=True) seeds the stage that way).
+    output().write(path, data, replace=True, label=label)
 
 def main():
-    for rel, content in FILES.items():
-        write_file(ROOT / rel, content)
-    print(f"✔ Wrote/updated {len(FILES)} files under {ROOT.resolve()}")
+    ap = argparse.ArgumentParser(description="Add auth, OAuth and QR scanning to the ticketing-app scaffold.")
+    ap.add_argument("--staged", action="store_true",
+                    help="Write into a sibling stage dir; if the run succeeds, rename each file into place "
+                         "(atomic per file, not for the tree)")
+    ap.add_argument("--archive", metavar="DEST",
+                    help="Write the files into a tar/zip archive instead of ticketing-app/ ('-' for stdout)")
+    ap.add_argument("--archive-format", choices=FORMATS,
+                    help="Archive format (default: from DEST's extension, tar for stdout)")
+    add_filter_arguments(ap)
+    perf.add_arguments(ap)
+    args = ap.parse_args()
+    select = PathFilter(args.only, args.exclude) or None
+
+    if args.profile:
+        perf.start()
+        try:
+            return dispatch(args, select)
+        finally:
+            # Keep the report off stdout when the archive is being streamed there.
+            perf.finish(args.profile, file=sys.stderr if args.archive == "-" else None)
+    return dispatch(args, select)
+
+def dispatch(args, select):
+    if args.archive:
+        with ArchiveSink(args.archive, args.archive_format) as sink:
+            for rel, data in generate(select):
+                sink.add(rel, data)
+            print(f"✔ Archived {sink.count} files ({sink.bytes} bytes) to {args.archive}")
+        return
+
+    written = 0
+    if args.staged:
+        with StagedTree(ROOT) as stage:
+            for rel, data in generate(select):
+                write_file(stage.path / rel, data, rel)
+                written += 1
+    else:
+        for rel, data in generate(select):
+            write_file(ROOT / rel, data, rel)
+            written += 1
+    print(f"✔ Wrote/updated {written} files under {ROOT.resolve()}")
     print("\nNext steps:")
     print("  1) cd ticketing-app")
     print("  2) cp .env.example .env  # add Google client ID/secret")
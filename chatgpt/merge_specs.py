@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Merge several specs into one tree, writing each final file once.
+
+    python chatgpt/merge_specs.py chatgpt/backup chatgpt/generated-answer.txt --base-dir ticketing-app
+
+The merge itself lives in common/merge_specs.py; see there for the options.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.merge_specs import main  # noqa: E402
+
+if __name__ == "__main__":
+    main()
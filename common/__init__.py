@@ -0,0 +1 @@
+"""Helpers shared by the spec materializers and scaffold generators."""
@@ -0,0 +1,112 @@
+"""
+Stream generated files straight into a tar or zip archive (or stdout).
+
+Entries are appended as they are produced, so nothing touches the filesystem
+and the output can be piped into `docker build -`. tar output is written in
+stream mode (no seeking), which also makes it safe for pipes; zip uses data
+descriptors for the same reason. When a path is added twice the later entry
+wins on extraction, matching the last-writer-wins behaviour on disk.
+"""
+from __future__ import annotations
+
+import io
+import os
+import posixpath
+import sys
+import tarfile
+import time
+import zipfile
+
+FORMATS = ("tar", "tar.gz", "zip")
+
+
+def guess_format(dest: str) -> str:
+    lower = dest.lower()
+    if lower.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    if lower.endswith(".zip"):
+        return "zip"
+    return "tar"
+
+
+def safe_name(rel: str):
+    """Archive member name for rel, or None if it would escape the archive root."""
+    name = posixpath.normpath(rel.replace("\\", "/")).lstrip("/")
+    if name in ("", ".") or name == ".." or name.startswith("../"):
+        return None
+    return name
+
+
+class ArchiveSink:
+    """
+    with ArchiveSink("-") as sink:          # tar to stdout
+        sink.add("api/Dockerfile", data)
+
+    When writing to stdout, sys.stdout is pointed at stderr for the duration so
+    progress messages cannot corrupt the archive stream.
+    """
+
+    def __init__(self, dest: str, fmt: str = None):
+        self.dest = dest
+        self.fmt = fmt or guess_format(dest)
+        if self.fmt not in FORMATS:
+            raise ValueError(f"unsupported archive format: {self.fmt}")
+        # SOURCE_DATE_EPOCH keeps archives byte-reproducible across runs.
+        self.mtime = int(os.environ.get("SOURCE_DATE_EPOCH", time.time()))
+        self.count = 0
+        self.bytes = 0
+        self._fileobj = self._owned = self._saved_stdout = None
+        self._tar = self._zip = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self):
+        if self.dest == "-":
+            self._fileobj = sys.stdout.buffer
+            self._saved_stdout, sys.stdout = sys.stdout, sys.stderr
+        else:
+            self._fileobj = self._owned = open(self.dest, "wb")
+        if self.fmt == "zip":
+            self._zip = zipfile.ZipFile(self._fileobj, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            mode = "w|gz" if self.fmt == "tar.gz" else "w|"
+            self._tar = tarfile.open(fileobj=self._fileobj, mode=mode, format=tarfile.PAX_FORMAT)
+        return self
+
+    def add(self, rel: str, data: bytes, mode: int = 0o644) -> str:
+        """Append one file; returns the member name. Raises ValueError for unsafe paths."""
+        name = safe_name(rel)
+        if name is None:
+            raise ValueError(f"path outside archive root: {rel}")
+        if self._zip is not None:
+            info = zipfile.ZipInfo(name, date_time=time.gmtime(max(self.mtime, 315532800))[:6])
+            info.external_attr = (0o100000 | mode) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size, info.mtime, info.mode = len(data), self.mtime, mode
+            self._tar.addfile(info, io.BytesIO(data))
+        self.count += 1
+        self.bytes += len(data)
+        return name
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+        if self._owned is not None:
+            self._owned.close()
+            self._owned = None
+        elif self._fileobj is not None:
+            self._fileobj.flush()
+        if self._saved_stdout is not None:
+            sys.stdout = self._saved_stdout
+            self._saved_stdout = None
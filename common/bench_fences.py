@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Pathological-input benchmark for common.fences.
+
+Builds inputs that made the old non-greedy DOTALL regexes rescan the rest of
+the document once per heading (unterminated fences, fences nested in fences)
+and times the tokenizer on doubling sizes. Time per MB should stay roughly
+constant; the run fails if it grows by more than --max-ratio.
+
+    python -m common.bench_fences [--sizes 1,2,4,8] [--legacy]
+"""
+import argparse
+import re
+import sys
+import time
+
+from common.fences import scan
+
+# The regex build_ticketing_app.py used before the shared tokenizer.
+LEGACY_RE = re.compile(
+    rb"^\#{2,6}[ \t]*(?:[^\n`]*?:?[ \t]*)?`(?P<relpath>[^`\n]+)`[ \t]*\r?\n"
+    rb"(?:[ \t]*\r?\n)*^```(?P<lang>[^\n]*)\r?\n(?P<content>.*?)^```\s*$",
+    re.MULTILINE | re.DOTALL,
+)
+
+BODY = b"const x = 1;\n" * 8
+
+
+def unterminated(n: int) -> bytes:
+    """n headings, each opening a fence that is never closed."""
+    return b"".join(b"## File %d: `src/f%d.ts`\n```ts\n" % (i, i) + BODY for i in range(n))
+
+
+def nested(n: int) -> bytes:
+    """One outer block whose body holds n inner opening fences, closed only at EOF."""
+    inner = b"".join(b"### `src/n%d.ts`\n```ts\n" % i + BODY for i in range(n))
+    return b"## `outer.md`\n```md\n" + inner + b"```\n"
+
+
+def well_formed(n: int) -> bytes:
+    return b"".join(b"### `src/ok%d.ts`\n```ts\n" % i + BODY + b"```\n-----\n" for i in range(n))
+
+
+CASES = {"unterminated": unterminated, "nested": nested, "well-formed": well_formed}
+
+
+def timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def run_tokenizer(buf: bytes):
+    for _ in scan(buf, on_issue=lambda issue: None):
+        pass
+
+
+def run_legacy(buf: bytes):
+    for _ in LEGACY_RE.finditer(buf):
+        pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the fence tokenizer on pathological specs.")
+    ap.add_argument("--base", type=int, default=2000, help="Blocks at size multiplier 1 (default: 2000)")
+    ap.add_argument("--sizes", default="1,2,4,8", help="Comma-separated size multipliers")
+    ap.add_argument("--max-ratio", type=float, default=2.5,
+                    help="Fail if the slowest ms/MB exceeds the fastest by this factor")
+    ap.add_argument("--legacy", action="store_true", help="Also time the old regex (slow: quadratic)")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    failed = False
+    for name, make in CASES.items():
+        print(f"\n{name}")
+        per_mb = []
+        for mult in sizes:
+            buf = make(args.base * mult)
+            mb = len(buf) / 1e6
+            t = min(timed(run_tokenizer, buf) for _ in range(3))
+            per_mb.append(t / mb)
+            line = f"  x{mult:<3} {mb:8.2f} MB  tokenizer {t * 1000:9.1f} ms  ({t / mb * 1000:6.1f} ms/MB)"
+            if args.legacy:
+                lt = timed(run_legacy, buf)
+                line += f"  legacy {lt * 1000:10.1f} ms"
+            print(line)
+        ratio = max(per_mb) / min(per_mb)
+        verdict = "linear" if ratio <= args.max_ratio else "NOT LINEAR"
+        print(f"  ms/MB spread x{ratio:.2f} -> {verdict}")
+        failed |= ratio > args.max_ratio
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
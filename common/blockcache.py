@@ -0,0 +1,108 @@
+"""
+Sidecar cache of a spec's block index.
+
+Scanning is linear but still touches every byte of the spec. The sidecar
+(.<spec name>.blocks.json, next to the spec) records the offsets, paths and
+language tags of every block together with the malformed-block issues, keyed
+by the spec's size, mtime and sha256. A re-run on an unchanged spec loads the
+index and slices only the blocks it needs out of the memory-mapped input.
+
+Validation mirrors the manifest: size + mtime are trusted while they match and
+the spec was not modified within the same second the sidecar was written
+(the classic "racy" window); otherwise the spec is hashed and the index is
+reused if the content is unchanged.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, astuple
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from common.fences import Block, Issue, scan
+
+VERSION = 1
+RACY_NS = 1_000_000_000
+
+
+def sidecar_path(spec: Path) -> Path:
+    return spec.with_name(f".{spec.name}.blocks.json")
+
+
+def digest(buf, chunk: int = 1 << 22) -> str:
+    h = hashlib.sha256()
+    for a in range(0, len(buf), chunk):
+        h.update(buf[a:a + chunk])
+    return h.hexdigest()
+
+
+def _load(side: Path):
+    try:
+        raw = json.loads(side.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+    return raw if raw.get("version") == VERSION else None
+
+
+def _save(side: Path, st, sha: str, blocks, issues):
+    body = {
+        "version": VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "saved_ns": time.time_ns(),
+        "sha256": sha,
+        "blocks": [list(astuple(b)) for b in blocks],
+        "issues": [asdict(i) for i in issues],
+    }
+    tmp = side.with_name(side.name + ".tmp")
+    try:
+        tmp.write_text(json.dumps(body, separators=(",", ":")) + "\n", encoding="utf-8")
+        os.replace(tmp, side)
+    except OSError:
+        pass                      # read-only spec dir: the cache is best effort
+
+
+def load_blocks(spec: Path, buf, on_issue: Optional[Callable[[Issue], None]] = None,
+                cache: bool = True) -> List[Block]:
+    """
+    Return every block of spec, whose bytes are buf. With cache, reuse or refresh
+    the sidecar index; cached issues are replayed through on_issue so warnings
+    look the same whether or not the spec was re-scanned.
+    """
+    if not cache:
+        return list(scan(buf, on_issue=on_issue))
+
+    spec = Path(spec)
+    side = sidecar_path(spec)
+    st = spec.stat()
+    raw = _load(side)
+    sha = None
+    hit = False
+    if raw and raw["size"] == st.st_size == len(buf):
+        if raw["mtime_ns"] == st.st_mtime_ns and raw["saved_ns"] - st.st_mtime_ns > RACY_NS:
+            hit = True
+        else:
+            sha = digest(buf)
+            hit = sha == raw["sha256"]
+            if hit:
+                _save(side, st, sha, [Block(*b) for b in raw["blocks"]], [Issue(**i) for i in raw["issues"]])
+
+    if hit:
+        if on_issue is not None:
+            for i in raw["issues"]:
+                on_issue(Issue(**i))
+        return [Block(*b) for b in raw["blocks"]]
+
+    issues = []
+
+    def collect(issue):
+        issues.append(issue)
+        if on_issue is not None:
+            on_issue(issue)
+
+    blocks = list(scan(buf, on_issue=collect))
+    _save(side, st, sha or digest(buf), blocks, issues)
+    return blocks
@@ -0,0 +1,166 @@
+"""
+Run scaffold steps as a dependency graph.
+
+Each Step names the command it runs, the steps it depends on, and the files it
+reads and writes. Steps whose dependencies are done run concurrently, each in
+its own child process, so api and web generation overlap. The first failure
+stops scheduling and terminates whatever is still running.
+
+A step is skipped as up to date when every declared output exists, none is
+older than the step's script and inputs, none of its dependencies ran in this
+invocation, and it was not forced.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RAN, SKIPPED, FAILED, CANCELLED = "ran", "up to date", "failed", "cancelled"
+
+
+@dataclass
+class Step:
+    name: str
+    cmd: List[str]
+    cwd: Path = Path(".")
+    deps: List[str] = field(default_factory=list)
+    inputs: List[Path] = field(default_factory=list)
+    outputs: List[Path] = field(default_factory=list)
+
+
+@dataclass
+class Result:
+    step: str
+    status: str
+    seconds: float = 0.0
+    returncode: Optional[int] = None
+    output: str = ""
+
+
+def _mtime(p: Path) -> Optional[int]:
+    try:
+        return p.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def up_to_date(step: Step) -> bool:
+    if not step.outputs:
+        return False
+    outs = [_mtime(p) for p in step.outputs]
+    if None in outs:
+        return False
+    # The script itself is an input: editing a generator re-runs it.
+    sources = list(step.inputs) + [Path(a) for a in step.cmd[1:2] if a.endswith(".py")]
+    ins = [m for m in (_mtime(p) for p in sources) if m is not None]
+    return not ins or min(outs) >= max(ins)
+
+
+def toposort(steps: List[Step]) -> List[Step]:
+    by_name = {s.name: s for s in steps}
+    order, state = [], {}
+
+    def visit(s):
+        if state.get(s.name) == "done":
+            return
+        if state.get(s.name) == "visiting":
+            raise ValueError(f"dependency cycle through step '{s.name}'")
+        state[s.name] = "visiting"
+        for d in s.deps:
+            if d not in by_name:
+                raise ValueError(f"step '{s.name}' depends on unknown step '{d}'")
+            visit(by_name[d])
+        state[s.name] = "done"
+        order.append(s)
+
+    for s in steps:
+        visit(s)
+    return order
+
+
+class Runner:
+    def __init__(self, steps: List[Step], jobs: int = os.cpu_count() or 2, force=()):
+        """force is True (run everything) or the names of steps to run regardless of their outputs."""
+        self.steps = toposort(steps)
+        self.jobs = max(1, jobs)
+        self.force = force
+        self.results: Dict[str, Result] = {}
+        self._procs = {}
+        self._lock = threading.Lock()
+        self._failed = False
+
+    def _exec(self, step: Step) -> Result:
+        t0 = time.perf_counter()
+        with self._lock:
+            if self._failed:
+                return Result(step.name, CANCELLED)
+            proc = subprocess.Popen(step.cmd, cwd=step.cwd, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, text=True)
+            self._procs[step.name] = proc
+        out, _ = proc.communicate()
+        with self._lock:
+            self._procs.pop(step.name, None)
+        status = RAN if proc.returncode == 0 else FAILED
+        if status == FAILED and self._failed:
+            status = CANCELLED            # terminated because another step failed
+        return Result(step.name, status, time.perf_counter() - t0, proc.returncode, out)
+
+    def _abort(self):
+        with self._lock:
+            self._failed = True
+            for proc in self._procs.values():
+                proc.terminate()
+
+    def run(self, on_result=None) -> bool:
+        """Run every step; on_result(result) is called as each one finishes. True if none failed."""
+        pending = list(self.steps)
+        ran = set()
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or futures:
+                for step in list(pending):
+                    if self._failed:
+                        break
+                    if any(d not in self.results for d in step.deps):
+                        continue
+                    pending.remove(step)
+                    forced = self.force is True or step.name in self.force
+                    if not forced and not ran.intersection(step.deps) and up_to_date(step):
+                        self._finish(Result(step.name, SKIPPED), on_result)
+                        continue
+                    futures[pool.submit(self._exec, step)] = step
+                if self._failed:
+                    for step in pending:
+                        self._finish(Result(step.name, CANCELLED), on_result)
+                    pending = []
+                if not futures:
+                    if pending:           # only skipped steps finished this round; reschedule
+                        continue
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    futures.pop(fut)
+                    result = fut.result()
+                    if result.status == RAN:
+                        ran.add(result.step)
+                    elif result.status == FAILED:
+                        self._abort()
+                    self._finish(result, on_result)
+        return not any(r.status == FAILED for r in self.results.values())
+
+    def _finish(self, result: Result, on_result):
+        self.results[result.step] = result
+        if on_result is not None:
+            on_result(result)
+
+
+def python(script: Path, *args) -> List[str]:
+    """Command line running script with the current interpreter."""
+    return [sys.executable, str(script), *map(str, args)]
@@ -0,0 +1,175 @@
+"""
+Content-addressed output for bulk generation (--dedup STORE).
+
+Generated trees repeat a lot of bytes: empty placeholders, identical .scss
+stubs, .gitkeeps, the same Dockerfile in every tenant. With a DedupBackend in
+place each unique blob is written once into STORE, named by its sha256, and
+every destination becomes a clone of it:
+
+    reflink   FICLONE copy-on-write clone (btrfs, XFS, bcachefs, ...): shares
+              the extents on disk but is an independent file afterwards
+    hardlink  another name for the blob's inode; no extra data or inode
+    copy      plain write, when neither works (e.g. STORE on another device)
+
+--dedup-mode auto (the default) tries reflink and falls back to copy; it
+never hardlinks. Hardlinked outputs share one inode, so an in-place edit of
+one changes every copy, which is why --dedup-mode hardlink must be asked for.
+Blobs are created read-only, which makes hardlinked outputs read-only too,
+and put() compares a stored blob's contents before reusing it, so a blob
+changed through a link anyway is rewritten rather than handed to the next
+output. The generators' own DiskBackend never writes through a shared link.
+
+The store is safe to share between runs and between concurrent writers, and
+can be deleted at any time once nothing needs to link from it again.
+"""
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from common.vfs import DiskBackend, use, _bytes
+
+MODES = ("auto", "reflink", "hardlink")
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+
+# Errors meaning "this filesystem/device pair can't do that", not "the write failed".
+_UNSUPPORTED = {errno.EXDEV, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOTTY, errno.EPERM, errno.EMLINK, errno.ENOSYS}
+
+
+class DedupStore:
+    """Blobs under root/ab/cdef..., linked into place by mode."""
+
+    def __init__(self, root, mode: str = "auto"):
+        if mode not in MODES:
+            raise ValueError(f"unknown dedup mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.root = Path(root)
+        self.mode = mode
+        self._reflink = mode in ("auto", "reflink")
+        self._hardlink = mode == "hardlink"
+        self._lock = threading.Lock()
+        self.stats = {"files": 0, "blobs": 0, "blob_bytes": 0, "linked_bytes": 0,
+                      "reflink": 0, "hardlink": 0, "copy": 0}
+
+    def _count(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                self.stats[name] += value
+
+    def put(self, data: bytes) -> Path:
+        """The blob holding data, writing it first if the store doesn't have it yet."""
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.root / digest[:2] / digest[2:]
+        try:
+            # Compare the bytes, not just the size: a hardlinked output edited in
+            # place (root ignores the read-only mode) changes the blob with it.
+            fresh = blob.read_bytes() == data
+        except FileNotFoundError:
+            fresh = False
+        if not fresh:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(f"{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            tmp.chmod(0o444)
+            os.replace(tmp, blob)
+            self._count(blobs=1, blob_bytes=len(data))
+        return blob
+
+    def link(self, data: bytes, dest: Path) -> str:
+        """Materialize data at dest (which must not exist); returns the method used."""
+        blob = self.put(data)
+        method = "copy"
+        if self._reflink and data and self._try(_reflink, blob, dest, "_reflink"):
+            method = "reflink"
+        elif self._hardlink and self._try(os.link, blob, dest, "_hardlink"):
+            method = "hardlink"
+        else:
+            with open(dest, "wb") as f:
+                f.write(data)
+        self._count(files=1, linked_bytes=len(data) if method != "copy" else 0, **{method: 1})
+        return method
+
+    def _try(self, fn, blob, dest, flag) -> bool:
+        try:
+            fn(blob, dest)
+            return True
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            # Don't keep paying for a syscall this store/destination pair can't do.
+            if e.errno != errno.EMLINK:
+                setattr(self, flag, False)
+            return False
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"🔗 dedup ({self.root}): {s['files']} files (reflink {s['reflink']}, "
+                f"hardlink {s['hardlink']}, copy {s['copy']}); {s['linked_bytes']} linked bytes "
+                f"backed by {s['blobs']} new blobs of {s['blob_bytes']} bytes")
+
+
+def _reflink(src: Path, dest: Path):
+    import fcntl
+
+    with open(src, "rb") as s:
+        fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            fcntl.ioctl(fd, FICLONE, s.fileno())
+        except OSError:
+            os.close(fd)
+            os.unlink(dest)
+            raise
+        os.close(fd)
+
+
+class DedupBackend(DiskBackend):
+    """A DiskBackend whose files are clones or links of blobs in a DedupStore."""
+
+    def __init__(self, store: DedupStore):
+        super().__init__()
+        self.store = store
+
+    def write(self, path, data, encoding: str = "utf-8", replace: bool = False, label=None):
+        path = Path(path)
+        data = _bytes(data, encoding)
+        self.mkdir(path.parent)
+        try:
+            path.unlink()             # links can't be made over an existing file
+        except FileNotFoundError:
+            pass
+        self.store.link(data, path)
+
+    def touch(self, path):
+        path = Path(path)
+        self.mkdir(path.parent)
+        if not path.exists():
+            self.store.link(b"", path)
+
+
+def add_arguments(parser):
+    parser.add_argument("--dedup", metavar="STORE", type=Path,
+                        help="Write each unique file once into STORE and reflink/hardlink it into place")
+    parser.add_argument("--dedup-mode", choices=MODES, default="auto",
+                        help="How outputs share STORE's blobs (default: auto = reflink, else copy; "
+                             "hardlink outputs are read-only and share one inode)")
+
+
+def backend(args):
+    """A DedupBackend for --dedup, or None when it wasn't given."""
+    if getattr(args, "dedup", None) is None:
+        return None
+    return DedupBackend(DedupStore(args.dedup, args.dedup_mode))
+
+
+@contextmanager
+def using(args):
+    """Route output() through --dedup's store for the block; yields the store or None."""
+    b = backend(args)
+    if b is None:
+        yield None
+        return
+    with use(b):
+        yield b.store
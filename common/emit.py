@@ -0,0 +1,144 @@
+"""
+Bounded thread-pool file emission shared by the materializers.
+
+On network filesystems and overlay mounts the per-file round trips (mkdir,
+exists, open/write/close) dominate, so writes are handed to a small pool of
+threads. Each unique parent directory is created exactly once, writes to the
+same path keep their submission order (last writer still wins), and results
+are handed back in submission order so summaries stay deterministic.
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from common.perf import write_file
+
+CREATED = "created"
+OVERWRITTEN = "overwritten"
+UNCHANGED = "unchanged"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+class Emitted(NamedTuple):
+    label: str
+    path: Optional[Path]
+    status: str
+    new_dir: bool = False     # this write created its parent directory
+    error: Optional[str] = None
+
+
+class FileEmitter:
+    """
+    Usage:
+        with FileEmitter(jobs=8) as em:
+            for rel, content in blocks:
+                em.submit(rel, base / rel, content)
+                for r in em.ready():
+                    report(r)
+            for r in em.drain():
+                report(r)
+    """
+
+    def __init__(self, jobs: int = 1, no_clobber: bool = False, encoding: str = "utf-8", manifest=None,
+                 detach: bool = False, live=None):
+        self.jobs = max(1, int(jobs))
+        self.no_clobber = no_clobber
+        self.encoding = encoding
+        self.manifest = manifest      # common.manifest.Manifest: leave identical files untouched
+        self.detach = detach          # unlink before writing (hardlinked stage, see common.staging)
+        self.live = live              # out -> path currently in use (StagedTree.live); checked for identity/existence
+        self._pool = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="emit")
+        # Caps queued content so a fast parser cannot outrun slow storage.
+        self._slots = threading.BoundedSemaphore(self.jobs * 4)
+        self._lock = threading.Lock()
+        self._dirs: Dict[Path, threading.Event] = {}
+        self._last: Dict[Path, Future] = {}
+        self._pending: deque = deque()
+        self.counts = {CREATED: 0, OVERWRITTEN: 0, UNCHANGED: 0, SKIPPED: 0, FAILED: 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    # ---- submission ----
+
+    def submit(self, label: str, out: Path, content: str):
+        self._slots.acquire()
+        prev = self._last.get(out)
+        fut = self._pool.submit(self._write, label, out, content, prev)
+        fut.add_done_callback(lambda _: self._slots.release())
+        self._last[out] = fut
+        self._pending.append(fut)
+
+    def skip(self, label: str, reason: str):
+        """Record a skip decided by the caller, in order with the writes."""
+        fut: Future = Future()
+        fut.set_result(Emitted(label, None, SKIPPED, error=reason))
+        self._pending.append(fut)
+
+    # ---- results, always in submission order ----
+
+    def ready(self) -> Iterator[Emitted]:
+        """Yield results whose predecessors have all finished, without blocking."""
+        while self._pending and self._pending[0].done():
+            yield self._take()
+
+    def drain(self) -> Iterator[Emitted]:
+        """Yield every remaining result, waiting for outstanding writes."""
+        while self._pending:
+            yield self._take()
+
+    def _take(self) -> Emitted:
+        result = self._pending.popleft().result()
+        self.counts[result.status] += 1
+        return result
+
+    # ---- workers ----
+
+    def _ensure_dir(self, parent: Path) -> bool:
+        with self._lock:
+            done = self._dirs.get(parent)
+            owner = done is None
+            if owner:
+                done = self._dirs[parent] = threading.Event()
+        if not owner:
+            done.wait()
+            return False
+        try:
+            existed = parent.is_dir()
+            if not existed:
+                parent.mkdir(parents=True, exist_ok=True)
+            return not existed
+        finally:
+            done.set()
+
+    def _write(self, label: str, out: Path, content: str, prev: Optional[Future]) -> Emitted:
+        if prev is not None:
+            prev.result()             # same path submitted earlier: keep last-writer-wins
+        try:
+            data = content.encode(self.encoding)
+            current = self.live(out) if self.live else out
+            if self.manifest is not None and self.manifest.is_current(label, current, data):
+                return Emitted(label, out, UNCHANGED)
+            new_dir = self._ensure_dir(out.parent)
+            exists = current.exists()
+            if exists and self.no_clobber:
+                return Emitted(label, out, SKIPPED, new_dir, "exists")
+            if self.detach and out.exists():
+                out.unlink()
+            write_file(out, data, key=label)
+            if self.manifest is not None:
+                self.manifest.record(label, out, data)
+            return Emitted(label, out, OVERWRITTEN if exists else CREATED, new_dir)
+        except OSError as e:
+            return Emitted(label, out, FAILED, error=str(e))
@@ -0,0 +1,185 @@
+"""
+Single-pass tokenizer for specs that embed files as a heading + fenced block.
+
+Both heading styles used by the materializers are recognised:
+
+    ## API: `api/Dockerfile`          labelled (chatgpt/build_ticketing_app.py)
+    ### `src/app/auth.service.ts`     bare     (gemini/import-code.py)
+
+followed by optional blank lines, an opening ```lang fence, the file content
+and a closing ``` line.
+
+Every line is inspected exactly once and no pattern looks past the end of its
+line, so tokenizing is O(n) in the input size. Unterminated or nested fences
+cannot trigger the rescans the old non-greedy DOTALL regexes suffered from;
+they are reported as issues instead.
+"""
+from __future__ import annotations
+
+import mmap
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+FENCE = b"```"
+
+
+@dataclass(frozen=True)
+class Block:
+    """
+    A file block. start/end are byte offsets of the content in the source
+    buffer; offset/stop span the whole block from its heading line to just past
+    the closing fence, and stop_line is the line number at stop.
+    """
+    path: str
+    lang: str
+    line: int
+    start: int
+    end: int
+    offset: int = 0
+    stop: int = 0
+    stop_line: int = 0
+
+    def text(self, buf) -> str:
+        """Decode this block's content from the buffer it was scanned from."""
+        return bytes(buf[self.start:self.end]).decode("utf-8", errors="replace").replace("\r\n", "\n")
+
+
+@dataclass(frozen=True)
+class Issue:
+    """A malformed block: 'unterminated', 'nested' or 'no-fence'."""
+    kind: str
+    line: int
+    path: str
+    message: str
+
+    def __str__(self):
+        return f"line {self.line}: {self.message} ({self.path})"
+
+
+def _decode(b: bytes) -> str:
+    return b.decode("utf-8", errors="replace")
+
+
+def heading_path(line: bytes) -> Optional[str]:
+    """Return the backticked path of a '## ... `path`' heading line, else None."""
+    if not line.startswith(b"##"):
+        return None
+    head = line.rstrip(b"\r\n")
+    open_ = head.find(b"`")
+    if open_ < 0:
+        return None
+    close = head.find(b"`", open_ + 1)
+    if close < 0 or head[close + 1:].strip(b" \t"):
+        return None
+    path = _decode(head[open_ + 1:close]).strip()
+    return path or None
+
+
+def _line_end(buf, pos: int) -> int:
+    """Offset just past the line starting at pos."""
+    nl = buf.find(b"\n", pos)
+    return len(buf) if nl < 0 else nl + 1
+
+
+def _find_line(buf, prefix: bytes, pos: int) -> int:
+    """Offset of the next line at or after line start pos that begins with prefix, or -1."""
+    if buf[pos:pos + len(prefix)] == prefix:
+        return pos
+    i = buf.find(b"\n" + prefix, pos)
+    return -1 if i < 0 else i + 1
+
+
+def _count_newlines(buf, a: int, b: int, chunk: int = 1 << 20) -> int:
+    # mmap has no count(); slice in bounded chunks so memory stays flat.
+    n = 0
+    while a < b:
+        n += buf[a:min(b, a + chunk)].count(b"\n")
+        a += chunk
+    return n
+
+
+def scan(buf, on_issue: Optional[Callable[[Issue], None]] = None,
+         start: int = 0, start_line: int = 1) -> Iterator[Block]:
+    """
+    Tokenize buf (bytes or mmap) and yield a Block as soon as its closing fence
+    is read. Malformed blocks are passed to on_issue and otherwise skipped.
+
+    start/start_line resume scanning at a known clean point (the beginning of the
+    input or a previous block's stop/stop_line).
+
+    Outside a block only lines starting with '##' can matter and inside one only
+    lines starting with '```', so the scanner jumps between those with find()
+    and never revisits a byte.
+    """
+    size = len(buf)
+    pos, lineno = start, start_line  # pos is always the start of line `lineno`
+    path = None
+    heading_line = heading_pos = 0
+
+    def goto(target):
+        nonlocal pos, lineno
+        lineno += _count_newlines(buf, pos, target)
+        pos = target
+
+    def report(kind, line, message):
+        if on_issue is not None:
+            on_issue(Issue(kind, line, path, message))
+
+    while pos < size:
+        if path is None:
+            nxt = _find_line(buf, b"##", pos)
+            if nxt < 0:
+                break
+            goto(nxt)
+            end = _line_end(buf, pos)
+            path = heading_path(buf[pos:end])
+            heading_line, heading_pos = lineno, pos
+            goto(end)
+            continue
+
+        end = _line_end(buf, pos)
+        line = buf[pos:end]
+        if not line.strip():
+            goto(end)
+            continue
+        if not line.startswith(FENCE):
+            report("no-fence", heading_line, "heading is not followed by a code fence")
+            path = None           # re-read this line as a possible heading
+            continue
+
+        lang = _decode(line[3:]).strip()
+        body = end
+        goto(end)
+        while True:
+            nxt = _find_line(buf, FENCE, pos)
+            if nxt < 0:
+                report("unterminated", heading_line, "code fence is never closed")
+                goto(size)
+                path = None
+                break
+            goto(nxt)
+            end = _line_end(buf, pos)
+            if not buf[pos + 3:end].strip():
+                yield Block(path, lang, heading_line, body, pos, heading_pos, end, lineno + 1)
+                goto(end)
+                path = None
+                break
+            report("nested", lineno,
+                   f"opening fence inside the block started on line {heading_line}; treated as content")
+            goto(end)
+
+    if path is not None:
+        report("no-fence", heading_line, "heading is not followed by a code fence")
+
+
+@contextmanager
+def mapped(path: Path):
+    """Memory-map a spec file read-only; empty files map to b''."""
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
@@ -0,0 +1,97 @@
+"""
+Incremental re-parsing of a spec that is edited in place.
+
+IncrementalIndex keeps the previous parse: every block's offsets plus a hash
+of its segment (the bytes from the previous block's closing fence through its
+own). On update() it hashes segments from the front until the first mismatch
+and from the back (shifted by the size delta) until the first mismatch, then
+re-tokenizes only the window in between. Scanning stops early as soon as a
+re-scanned block closes exactly where an unchanged trailing segment begins.
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import replace
+from typing import Callable, List, Optional
+
+from common.fences import Block, Issue, scan
+
+
+def _sha(buf, a: int, b: int) -> bytes:
+    return hashlib.sha256(buf[a:b]).digest()
+
+
+class IncrementalIndex:
+    def __init__(self):
+        self.blocks: List[Block] = []
+        self.segs: List[bytes] = []      # segment hash per block
+        self.hashes: List[bytes] = []    # content hash per block
+        self.content: dict = {}          # path -> content hash of the block that wins it
+        self.trail = None                # hash of the bytes after the last block
+        self.size = 0
+        self.rescanned = 0               # bytes re-tokenized by the last update()
+
+    def _seg_start(self, i: int) -> int:
+        return self.blocks[i - 1].stop if i else 0
+
+    def update(self, buf, on_issue: Optional[Callable[[Issue], None]] = None) -> List[Block]:
+        """Re-index buf; return the blocks whose path now has different content."""
+        n = len(buf)
+        old, delta = self.blocks, n - self.size
+
+        # Leading segments that are byte-identical keep their blocks as-is.
+        k = 0
+        if self.trail is not None:
+            while k < len(old) and old[k].stop <= n and _sha(buf, self._seg_start(k), old[k].stop) == self.segs[k]:
+                k += 1
+        resume = old[k - 1].stop if k else 0
+        resume_line = old[k - 1].stop_line if k else 1
+
+        # Trailing segments that are byte-identical once shifted by delta.
+        t = len(old)
+        sync = {}
+        if old and self.trail is not None and old[-1].stop + delta >= resume \
+                and _sha(buf, old[-1].stop + delta, n) == self.trail:
+            sync[old[-1].stop + delta] = len(old)
+            while t - 1 >= k and self._seg_start(t - 1) + delta >= resume \
+                    and _sha(buf, self._seg_start(t - 1) + delta, old[t - 1].stop + delta) == self.segs[t - 1]:
+                t -= 1
+                if t:
+                    sync[old[t - 1].stop + delta] = t
+
+        blocks, segs, hashes = old[:k], self.segs[:k], self.hashes[:k]
+        tail_from = None
+        for b in scan(buf, on_issue=on_issue, start=resume, start_line=resume_line):
+            segs.append(_sha(buf, blocks[-1].stop if blocks else 0, b.stop))
+            hashes.append(_sha(buf, b.start, b.end))
+            blocks.append(b)
+            if b.stop in sync:
+                tail_from = sync[b.stop]
+                break
+        end = blocks[-1].stop if tail_from is not None else n
+        self.rescanned = end - resume
+
+        if tail_from is not None:
+            line_delta = blocks[-1].stop_line - old[tail_from - 1].stop_line
+            for i in range(tail_from, len(old)):
+                o = old[i]
+                blocks.append(replace(o, line=o.line + line_delta, start=o.start + delta, end=o.end + delta,
+                                      offset=o.offset + delta, stop=o.stop + delta,
+                                      stop_line=o.stop_line + line_delta))
+            segs.extend(self.segs[tail_from:])
+            hashes.extend(self.hashes[tail_from:])
+            trail = self.trail
+        else:
+            trail = _sha(buf, blocks[-1].stop if blocks else 0, n)
+
+        # The last block for a path wins, as when writing sequentially.
+        winners = {}
+        for i, b in enumerate(blocks):
+            winners[b.path] = i
+        content = {path: hashes[i] for path, i in winners.items()}
+        changed = [blocks[i] for path, i in winners.items() if self.content.get(path) != content[path]]
+
+        self.blocks, self.segs, self.hashes = blocks, segs, hashes
+        self.trail, self.size, self.content = trail, n, content
+        changed.sort(key=lambda b: b.offset)
+        return changed
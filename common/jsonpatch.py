@@ -0,0 +1,169 @@
+"""
+Declarative, order-preserving patches for JSON config files.
+
+A patch list is applied to a file in one load and at most one save:
+
+    patch_file(web / "package.json", [
+        defaults("dependencies", {"rxjs": "^7.8.1"}),
+        default(("devDependencies", "@angular/cli"), "^17.3.0"),
+    ])
+
+Patches only add what is missing (setdefault semantics): existing values are
+never overwritten and key order is kept, new keys go last. The file is written
+only when the patches changed the document, and then only if the new bytes
+differ from what is on disk, so an unchanged package.json keeps its mtime and
+Docker's `COPY package*.json` / `npm ci` layers stay cached.
+
+Paths are "/"-separated keys, or tuples of keys (needed when a key contains
+"/"); FIRST in a tuple steps into the first entry of a mapping. When the
+patches depend on the document (one set per angular.json project, say), pass
+a function of the loaded document that returns the list instead.
+
+Pass a list as changes= to collect the path of every key or item added.
+
+(Not RFC 6902 JSON Patch: these are idempotent "make sure" edits.)
+"""
+from __future__ import annotations
+
+import copy
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+FIRST = object()
+
+CREATED, PATCHED, UNCHANGED = "created", "patched", "unchanged"
+
+
+@dataclass(frozen=True)
+class Patch:
+    op: str            # "seed" | "default" | "defaults" | "union"
+    path: tuple
+    value: object = None
+    casefold: bool = False
+
+
+def _path(path) -> tuple:
+    if isinstance(path, tuple):
+        return path
+    return tuple(k for k in path.split("/") if k) if path else ()
+
+
+def seed(value) -> Patch:
+    """Replace an empty document (missing file or empty placeholder) with value."""
+    return Patch("seed", (), value)
+
+
+def default(path, value) -> Patch:
+    """Set the key at path unless it is already present."""
+    return Patch("default", _path(path), value)
+
+
+def defaults(path, mapping: dict) -> Patch:
+    """default() for every key of mapping, under the object at path."""
+    return Patch("defaults", _path(path), mapping)
+
+
+def union(path, items, casefold: bool = False) -> Patch:
+    """Append each item missing from the list at path (compared case-insensitively if casefold)."""
+    return Patch("union", _path(path), list(items), casefold)
+
+
+def _step(node, key):
+    if not isinstance(node, dict):
+        raise ValueError(f"expected an object at {key!r}, found {type(node).__name__}")
+    if key is FIRST:
+        if not node:
+            raise ValueError("expected at least one entry, found an empty object")
+        return next(iter(node.values()))
+    return node.setdefault(key, {})
+
+
+def _where(path) -> str:
+    return "/".join("*" if k is FIRST else str(k) for k in path) or "/"
+
+
+def _walk(doc, path: tuple):
+    node = doc
+    for key in path:
+        node = _step(node, key)
+    return node
+
+
+def apply(doc, patches, changes: list = None):
+    """
+    Apply patches to doc in order, in place where possible; returns the patched
+    document. The path of each addition is appended to changes, if given.
+    """
+    changes = [] if changes is None else changes
+    for p in patches:
+        if p.op == "seed":
+            if not doc:
+                doc = copy.deepcopy(p.value)
+                changes.append("/")
+        elif p.op == "default":
+            parent = _walk(doc, p.path[:-1])
+            if not isinstance(parent, dict):
+                raise ValueError(f"expected an object at {_where(p.path[:-1])!r}")
+            if p.path[-1] not in parent:
+                parent[p.path[-1]] = copy.deepcopy(p.value)
+                changes.append(_where(p.path))
+        elif p.op == "defaults":
+            node = _walk(doc, p.path)
+            for k, v in p.value.items():
+                if k not in node:
+                    node[k] = copy.deepcopy(v)
+                    changes.append(_where(p.path + (k,)))
+        elif p.op == "union":
+            parent = _walk(doc, p.path[:-1])
+            items = parent.setdefault(p.path[-1], [])
+            norm = (lambda s: s.lower() if isinstance(s, str) else s) if p.casefold else (lambda s: s)
+            have = {norm(i) for i in items}
+            for item in p.value:
+                if norm(item) not in have:
+                    items.append(item)
+                    have.add(norm(item))
+                    changes.append(f"{_where(p.path)}[] {item}")
+        else:
+            raise ValueError(f"unknown patch op {p.op!r}")
+    return doc
+
+
+def dumps(doc) -> bytes:
+    return (json.dumps(doc, indent=2) + "\n").encode("utf-8")
+
+
+def patch_file(path: Path, patches, create: bool = False, changes: list = None):
+    """
+    Apply patches (a list, or a function of the loaded document returning one)
+    to the JSON file at path; returns (status, document). A missing file is an
+    error unless create is set; an empty file is a skeleton placeholder and
+    reads as {}.
+    """
+    path = Path(path)
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        if not create:
+            raise
+        raw = None
+    before = json.loads(raw.strip() or b"{}") if raw is not None else {}
+    if callable(patches):
+        patches = patches(before)
+    doc = apply(copy.deepcopy(before), patches, changes)
+    if raw is not None and raw.strip() and doc == before:
+        return UNCHANGED, doc
+    data = dumps(doc)
+    if data == raw:
+        return UNCHANGED, doc
+    write_bytes(path, data)
+    return (CREATED if raw is None or not raw.strip() else PATCHED), doc
+
+
+def write_bytes(path: Path, data: bytes):
+    """Atomically replace path with data (a new inode, so hardlinks are never written through)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
@@ -0,0 +1,78 @@
+"""
+Content-hash manifest for incremental materialization.
+
+The manifest lives in the output root and maps each emitted path to the
+sha256, size and mtime of what was last written there. A re-run can then leave
+byte-identical files alone, so their mtimes do not change and downstream
+build caches (docker compose build, Angular, Next) are only invalidated by
+files that really changed.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+MANIFEST_NAME = ".materialize-manifest.json"
+VERSION = 1
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class Manifest:
+    def __init__(self, base: Path, name: str = MANIFEST_NAME):
+        self.path = Path(base) / name
+        self._lock = threading.Lock()
+        self.files = {}
+        self.dirty = False
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            if raw.get("version") == VERSION:
+                self.files = raw.get("files") or {}
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def is_current(self, key: str, out: Path, data: bytes) -> bool:
+        """
+        True if out already holds exactly data. Trusts the recorded hash while the
+        file's size and mtime still match it; otherwise compares against the bytes
+        on disk (and records them, so the next check is stat-only again).
+        """
+        try:
+            st = out.stat()
+        except FileNotFoundError:
+            return False
+        if st.st_size != len(data):
+            return False
+        new = digest(data)
+        rec = self.files.get(key)
+        if rec and rec.get("sha256") == new and rec.get("mtime_ns") == st.st_mtime_ns:
+            return True
+        try:
+            same = digest(out.read_bytes()) == new
+        except OSError:
+            return False
+        if same:
+            self._put(key, new, st)
+        return same
+
+    def record(self, key: str, out: Path, data: bytes):
+        self._put(key, digest(data), out.stat())
+
+    def _put(self, key, sha, st):
+        with self._lock:
+            self.files[key] = {"sha256": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        body = {"version": VERSION, "files": dict(sorted(self.files.items()))}
+        tmp.write_text(json.dumps(body, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.dirty = False
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Merge several specs into one plan and write every final file exactly once.
+
+    python chatgpt/merge_specs.py chatgpt/backup chatgpt/generated-answer.txt --base-dir ticketing-app
+
+(or python -m common.merge_specs ... from the repo root).
+
+Specs are indexed concurrently in worker processes (only paths, offsets and
+content hashes come back). Each path then resolves to a single winning block:
+by default the spec listed last wins, --prefer first inverts that, and within
+one spec the last block for a path wins as it does when materializing
+sequentially. Paths defined with different content by more than one spec are
+listed in a conflict report; --strict turns conflicts into a non-zero exit.
+Blocks are compared as they would be written (CRLF -> LF, and stripped with
+--strip), so blocks that produce the same file never conflict.
+Only winning blocks are ever decoded, and each is written once.
+"""
+import argparse
+import functools
+import hashlib
+import posixpath
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from common.emit import CREATED, FAILED, OVERWRITTEN, SKIPPED, UNCHANGED, FileEmitter
+from common.fences import mapped, scan
+from common.manifest import Manifest
+from common.staging import StagedTree
+
+
+def block_text(raw, strip: bool = False) -> str:
+    """A block's content exactly as it is written out."""
+    content = bytes(raw).decode("utf-8", errors="replace").replace("\r\n", "\n")
+    return content.strip() if strip else content
+
+
+def index_spec(spec: str, strip: bool = False):
+    """Worker: return ([(path, lang, line, start, end, sha)], [issue text]) for one spec."""
+    issues, entries = [], []
+    with mapped(Path(spec)) as buf:
+        for b in scan(buf, on_issue=lambda i: issues.append(str(i))):
+            sha = hashlib.sha256(block_text(buf[b.start:b.end], strip).encode("utf-8")).hexdigest()
+            entries.append((b.path, b.lang, b.line, b.start, b.end, sha))
+    return entries, issues
+
+
+def normalize(path: str) -> str:
+    return posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+
+
+def build_plan(indexes, prefer_first=False):
+    """
+    Return (plan, conflicts). plan maps path -> (spec_no, entry) for the winner;
+    conflicts maps path -> [(spec_no, entry), ...] in precedence order, winner first.
+    """
+    candidates = {}
+    for spec_no, (entries, _) in enumerate(indexes):
+        per_spec = {}
+        for e in entries:
+            per_spec[normalize(e[0])] = e        # last block within a spec wins
+        for path, e in per_spec.items():
+            candidates.setdefault(path, []).append((spec_no, e))
+
+    plan, conflicts = {}, {}
+    for path, cands in candidates.items():
+        ranked = cands if prefer_first else cands[::-1]
+        plan[path] = ranked[0]
+        if len({e[5] for _, e in cands}) > 1:
+            conflicts[path] = ranked
+    return plan, conflicts
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Merge many spec files into one tree, writing each file once.")
+    ap.add_argument("specs", nargs="+", help="Spec files, lowest precedence first")
+    ap.add_argument("--base-dir", default="ticketing-app", help="Output root dir (default: ticketing-app)")
+    ap.add_argument("--prefer", choices=("last", "first"), default="last",
+                    help="Which spec wins a conflicting path (default: last)")
+    ap.add_argument("--strip", action="store_true", help="Strip surrounding whitespace from contents (import-code.py style)")
+    ap.add_argument("--strict", action="store_true", help="Exit with status 1 if any conflicts are found")
+    ap.add_argument("--dry-run", action="store_true", help="Print the plan and conflicts without writing")
+    ap.add_argument("--no-manifest", action="store_true", help="Rewrite files even if unchanged since the last run")
+    ap.add_argument("--staged", action="store_true",
+                    help="Write into a stage dir; if the run succeeds, rename each file into place "
+                         "(atomic per file, not for the tree)")
+    ap.add_argument("--jobs", type=int, default=4, help="Parser processes and writer threads (default: 4)")
+    args = ap.parse_args()
+
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(args.specs)))) as pool:
+        indexes = list(pool.map(functools.partial(index_spec, strip=args.strip), args.specs))
+    for spec, (entries, issues) in zip(args.specs, indexes):
+        print(f"📄 {spec}: {len(entries)} block(s)")
+        for issue in issues:
+            print(f"   ⚠️  {issue}")
+
+    plan, conflicts = build_plan(indexes, prefer_first=args.prefer == "first")
+
+    if conflicts:
+        print(f"\n⚔️  {len(conflicts)} conflicting path(s):")
+        for path in sorted(conflicts):
+            (win_no, win), *rest = conflicts[path]
+            losers = ", ".join(f"{args.specs[n]}:{e[2]}" for n, e in rest)
+            print(f"   {path}: {args.specs[win_no]}:{win[2]} wins over {losers}")
+
+    if args.dry_run:
+        for path in sorted(plan):
+            spec_no, e = plan[path]
+            print(f"   {path} <- {args.specs[spec_no]}:{e[2]}")
+        sys.exit(1 if args.strict and conflicts else 0)
+
+    target = Path(args.base_dir).resolve()
+    stage = StagedTree(target).begin() if args.staged else None
+    base = stage.path if stage else target
+    base.mkdir(parents=True, exist_ok=True)
+    manifest = None if args.no_manifest else Manifest(target)
+
+    by_spec = {}
+    for path in sorted(plan):
+        spec_no, e = plan[path]
+        by_spec.setdefault(spec_no, []).append((path, e))
+    try:
+        with FileEmitter(jobs=args.jobs, manifest=manifest, detach=stage is not None,
+                         live=stage.live if stage else None) as emitter:
+            for spec_no in sorted(by_spec):
+                with mapped(Path(args.specs[spec_no])) as buf:
+                    for path, e in by_spec[spec_no]:
+                        out = (base / path).resolve()
+                        if base != out and base not in out.parents:
+                            emitter.skip(path, "outside base")
+                            continue
+                        emitter.submit(path, out, block_text(buf[e[3]:e[4]], args.strip))
+            results = list(emitter.drain())
+        if stage and (emitter.counts[CREATED] or emitter.counts[OVERWRITTEN]):
+            stage.commit()
+        elif stage:
+            stage.abort()
+        if manifest is not None:
+            manifest.save()
+    except BaseException:
+        if stage:
+            stage.abort()
+        raise
+
+    for r in sorted(results, key=lambda r: r.label):
+        if r.status == FAILED:
+            print(f"❌ Failed: {r.label}: {r.error}")
+        elif r.status == SKIPPED:
+            print(f"⏭️  Skipped: {r.label} ({r.error})")
+        elif r.status != UNCHANGED:
+            print(f"✅ Wrote: {target / r.label}")
+
+    c = emitter.counts
+    print(f"\nDone. {len(plan)} path(s) from {len(args.specs)} spec(s). Created: {c[CREATED]}, "
+          f"Overwritten: {c[OVERWRITTEN]}, Unchanged: {c[UNCHANGED]}, Skipped: {c[SKIPPED]}, "
+          f"Failed: {c[FAILED]}, Conflicts: {len(conflicts)}. Base: {target}")
+    sys.exit(1 if (args.strict and conflicts) or c[FAILED] else 0)
+
+
+if __name__ == "__main__":
+    main()
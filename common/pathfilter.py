@@ -0,0 +1,49 @@
+"""
+--only / --exclude selection of spec blocks by output path.
+
+Patterns are fnmatch globs matched against the block's relative path, so '*'
+also crosses '/': 'api/src/auth/*' selects the whole auth subtree. A pattern
+ending in '/' selects everything below that directory.
+"""
+from __future__ import annotations
+
+from fnmatch import fnmatchcase
+from typing import Iterable
+
+
+def _norm(path: str) -> str:
+    path = path.replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path
+
+
+def _match(path: str, pattern: str) -> bool:
+    pattern = _norm(pattern)
+    if pattern.endswith("/"):
+        return path.startswith(pattern)
+    return fnmatchcase(path, pattern)
+
+
+class PathFilter:
+    """keep(path) is True if path matches some --only (or there are none) and no --exclude."""
+
+    def __init__(self, only: Iterable[str] = (), exclude: Iterable[str] = ()):
+        self.only = list(only or ())
+        self.exclude = list(exclude or ())
+
+    def __bool__(self):
+        return bool(self.only or self.exclude)
+
+    def __call__(self, path: str) -> bool:
+        path = _norm(path)
+        if self.only and not any(_match(path, p) for p in self.only):
+            return False
+        return not any(_match(path, p) for p in self.exclude)
+
+
+def add_arguments(parser):
+    parser.add_argument("--only", action="append", default=[], metavar="GLOB",
+                        help="Only materialize blocks whose path matches GLOB (repeatable), e.g. 'api/src/auth/*'")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Skip blocks whose path matches GLOB (repeatable)")
@@ -0,0 +1,111 @@
+"""
+Lazy file registries for the scaffold generators.
+
+A generator script declares its files as a mapping of relative path to a
+producer: a zero-argument callable returning str or bytes. dedent() and
+dumps() are the lazy twins of textwrap.dedent and json.dumps, so a table that
+used to be built eagerly at import time keeps its shape:
+
+    FILES = Registry({
+        ".env.example": dedent(\"\"\"\\
+            API_PORT=3000
+        \"\"\"),
+        "api/package.json": dumps({"name": "tickets-api"}, indent=2),
+    })
+
+    for path, data in FILES.generate(select=["api/*"]):
+        ...
+
+Nothing is rendered until generate() reaches that path, and paths that are not
+selected are never rendered at all. Text output always ends with a newline.
+"""
+from __future__ import annotations
+
+import importlib.util
+import json
+import sys
+import textwrap
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
+
+from common.pathfilter import PathFilter
+from common.perf import rendering
+
+Producer = Callable[[], Union[str, bytes]]
+
+
+def dedent(template: str) -> Producer:
+    return partial(textwrap.dedent, template)
+
+
+def dumps(obj, **kwargs) -> Producer:
+    return partial(json.dumps, obj, **kwargs)
+
+
+def _selector(select) -> Optional[Callable[[str], bool]]:
+    """None (everything), a path predicate, a single glob or an iterable of globs."""
+    if select is None or callable(select):
+        return select
+    if isinstance(select, str):
+        select = [select]
+    return PathFilter(only=select)
+
+
+class Registry:
+    def __init__(self, producers: Optional[Dict[str, Producer]] = None):
+        self._producers: Dict[str, Producer] = dict(producers or {})
+
+    def __len__(self):
+        return len(self._producers)
+
+    def __contains__(self, path):
+        return path in self._producers
+
+    def __iter__(self):
+        return iter(self._producers)
+
+    def add(self, path: str, producer: Producer):
+        self._producers[path] = producer
+        return producer
+
+    def file(self, path: str):
+        """Decorator registering a function as the producer of path."""
+        return partial(self.add, path)
+
+    def paths(self, select=None):
+        keep = _selector(select)
+        return [p for p in self._producers if keep is None or keep(p)]
+
+    def render(self, path: str) -> bytes:
+        with rendering(path):
+            data = self._producers[path]()
+        if isinstance(data, str):
+            if not data.endswith("\n"):
+                data += "\n"
+            data = data.encode("utf-8")
+        return data
+
+    def generate(self, select=None) -> Iterator[Tuple[str, bytes]]:
+        """Yield (path, bytes) in registration order, rendering each file on demand."""
+        for path in self.paths(select):
+            yield path, self.render(path)
+
+
+def load_module(path):
+    """
+    Import a generator script by file path (the scripts have dashes in their
+    names) without running its main().
+    """
+    path = Path(path).resolve()
+    mod_name = "_scaffold_" + path.stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(mod_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_script(path, name: str = "FILES") -> Registry:
+    """Import a generator script by file path and return its registry."""
+    return getattr(load_module(path), name)
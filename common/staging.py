@@ -0,0 +1,164 @@
+"""
+Staged materialization.
+
+A StagedTree is a sibling temporary directory that generators write into as
+usual. commit() flushes the filesystem once and then moves what was written
+into the target:
+
+    default    each staged file is renamed over its counterpart in the target.
+               Cost is O(files written), files nobody wrote are untouched, and
+               watchers (nest start --watch, next dev, ng serve) keep their
+               directory and see a quick burst of whole-file changes. Atomic
+               per file only: a commit interrupted part-way leaves some files
+               new and the rest old (never a half-written file). The unmoved
+               files stay in the stage, and calling commit() again finishes.
+    swap=True  the stage is seeded with hardlinks to the whole current tree
+               and swapped in with a single rename, so the tree changes all at
+               once and an interrupted run never leaves it half updated. Seeding costs O(tree) (node_modules alone is tens of
+               thousands of links), and the old directory is deleted from
+               under anything running in it: live watchers and dev servers
+               keep a cwd and inodes that no longer exist and must be
+               restarted. Only for trees nothing is running from.
+
+With swap=True unchanged files are hardlinks into the live tree, so anything
+writing into the stage must replace files (unlink + create) rather than
+truncate them in place; use replace_bytes()/replace_text() or
+FileEmitter(detach=True). That is harmless in the default mode.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    _renameat2 = getattr(_libc, "renameat2", None)
+    _syncfs = getattr(_libc, "syncfs", None)
+except OSError:
+    _renameat2 = _syncfs = None
+
+
+def _exchange(a: Path, b: Path) -> bool:
+    """Atomically swap two paths (Linux renameat2). False if unsupported."""
+    if _renameat2 is None:
+        return False
+    rc = _renameat2(_AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE)
+    if rc == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in (22, 38, 95):       # EINVAL, ENOSYS, EOPNOTSUPP: fs/kernel lacks it
+        return False
+    raise OSError(err, os.strerror(err), str(a))
+
+
+def _flush(path: Path):
+    """One filesystem-wide flush instead of an fsync per file."""
+    if _syncfs is not None:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if _syncfs(fd) == 0:
+                return
+        finally:
+            os.close(fd)
+    os.sync()
+
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def replace_bytes(path: Path, data: bytes):
+    """Write data to path as a new inode, never through an existing hardlink."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def replace_text(path: Path, text: str, encoding: str = "utf-8"):
+    replace_bytes(path, text.encode(encoding))
+
+
+class StagedTree:
+    """
+    with StagedTree("ticketing-app") as stage:
+        write everything under stage.path
+    # on success the staged files are in ticketing-app; on error they are discarded
+    """
+
+    def __init__(self, target, swap: bool = False):
+        self.target = Path(target).resolve()
+        self.swap = swap
+        self.path = None
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def begin(self):
+        self.target.parent.mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix=f".{self.target.name}.stage-", dir=self.target.parent))
+        if self.swap and self.target.is_dir():
+            os.rmdir(self.path)
+            shutil.copytree(self.target, self.path, symlinks=True, copy_function=os.link)
+        return self
+
+    def commit(self):
+        if self.path is None:
+            return
+        _flush(self.path)
+        if not self.target.exists():
+            os.rename(self.path, self.target)
+        elif not self.swap:
+            self._move_files()
+            shutil.rmtree(self.path)
+            _flush(self.target)
+        elif _exchange(self.path, self.target):
+            shutil.rmtree(self.path)          # now holds the previous tree
+        else:
+            old = Path(tempfile.mkdtemp(prefix=f".{self.target.name}.old-", dir=self.target.parent))
+            os.rmdir(old)
+            os.rename(self.target, old)
+            os.rename(self.path, self.target)
+            shutil.rmtree(old)
+        _fsync_dir(self.target.parent)
+        self.path = None
+
+    def _move_files(self):
+        """Rename every staged file (or symlink) over its path in the target."""
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            rel = Path(dirpath).relative_to(self.path)
+            dest = self.target / rel
+            dest.mkdir(exist_ok=True)
+            links = [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]
+            for name in filenames + links:
+                os.replace(os.path.join(dirpath, name), dest / name)
+            dirnames[:] = [d for d in dirnames if d not in links]
+
+    def live(self, path) -> Path:
+        """The path under the target that a path in the stage will replace."""
+        return self.target / Path(path).relative_to(self.path)
+
+    def abort(self):
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
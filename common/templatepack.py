@@ -0,0 +1,146 @@
+"""
+Precompiled template pack for the generators.
+
+    python -m common.templatepack build      # writes common/templates.pack
+
+The pack is one marshal blob holding, per generator, the size and CRC-32 of
+the script it was built from plus either
+
+  files      rel path -> final bytes (already dedented), for generators whose
+             output only depends on where it is written (create-api-full.py)
+  templates  key -> [(literal, field), ...] segments, for str.format
+             templates, so filling one in is a join instead of dedent + parse
+             (create-root.py)
+
+A generator calls lookup(__file__) and gets None when there is no pack, the
+pack is from another format version, or the script changed since the build;
+it then falls back to its inline templates. The blob is read and unmarshalled
+lazily, once, on the first lookup.
+
+create_project.py is not packed: its templates are plain module-level string
+constants that Python already loads ready-made from the .pyc, so there is no
+per-run template work to save.
+"""
+from __future__ import annotations
+
+import marshal
+import os
+import sys
+import zlib
+from pathlib import Path
+
+# Only the lookup path is imported eagerly; build-time modules load on demand
+# so a generator using the pack pays for nothing it does not run.
+
+VERSION = 1
+REPO = Path(__file__).resolve().parents[1]
+DEFAULT_PACK = REPO / "common" / "templates.pack"
+ROOT_MARK = Path("@root")
+
+
+def pack_path() -> Path:
+    return Path(os.environ.get("TEMPLATE_PACK") or DEFAULT_PACK)
+
+
+def source_hash(script) -> str:
+    # Staleness check, not security: crc32 avoids importing hashlib on every run.
+    data = Path(script).read_bytes()
+    return f"{len(data)}:{zlib.crc32(data):08x}"
+
+
+def compile_format(text: str):
+    """Split a str.format template into [(literal, field name or None), ...] segments."""
+    from string import Formatter
+
+    return [(literal, field) for literal, field, _, _ in Formatter().parse(text)]
+
+
+def fill(segments, values: dict) -> str:
+    return "".join(lit + (str(values[field]) if field is not None else "") for lit, field in segments)
+
+
+class GeneratorPack:
+    def __init__(self, entry: dict):
+        self.files = entry.get("files", {})          # rel path -> bytes
+        self.templates = entry.get("templates", {})  # key -> segments
+
+
+_loaded = None
+
+
+def _load():
+    global _loaded
+    if _loaded is None:
+        try:
+            raw = marshal.loads(pack_path().read_bytes())
+            _loaded = raw["generators"] if raw.get("version") == VERSION else {}
+        except (OSError, ValueError, EOFError, TypeError, KeyError):
+            _loaded = {}
+    return _loaded
+
+
+def lookup(script):
+    """The pack entry for script, or None if absent or built from a different version of it."""
+    script = Path(script).resolve()
+    entry = _load().get(script.stem)
+    if entry is None or entry["source"] != source_hash(script):
+        return None
+    return GeneratorPack(entry)
+
+
+# ---- build ----
+
+def _capture_tree(script: Path) -> dict:
+    """Run the generator against an in-memory backend rooted at a marker path."""
+    import io
+    from contextlib import redirect_stdout
+
+    from common.scaffold import load_module
+    from common.vfs import MemoryBackend, use
+
+    with use(MemoryBackend()) as mem, redirect_stdout(io.StringIO()):
+        load_module(script).main(ROOT_MARK)
+    return {"files": {p.relative_to(ROOT_MARK).as_posix(): mem.read(p) for p in mem}}
+
+
+def _compile_templates(script: Path) -> dict:
+    from textwrap import dedent
+
+    from common.scaffold import load_module
+
+    templates = load_module(script).TEMPLATES
+    return {"templates": {rel: compile_format(dedent(text).lstrip()) for rel, text in templates.items()}}
+
+
+GENERATORS = {
+    REPO / "gpt-with-tech-req" / "create-api-full.py": _capture_tree,
+    REPO / "gpt-with-tech-req" / "create-root.py": _compile_templates,
+}
+
+
+def build(dest: Path = None) -> Path:
+    dest = Path(dest or pack_path())
+    generators = {}
+    for script, compile_ in GENERATORS.items():
+        entry = compile_(script)
+        entry["source"] = source_hash(script)
+        generators[script.stem] = entry
+    tmp = dest.with_name(dest.name + ".tmp")
+    tmp.write_bytes(marshal.dumps({"version": VERSION, "generators": generators}))
+    os.replace(tmp, dest)
+    return dest
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Build the precompiled generator template pack.")
+    ap.add_argument("command", choices=("build",))
+    ap.add_argument("--out", type=Path, help=f"Pack file (default: $TEMPLATE_PACK or {DEFAULT_PACK.relative_to(REPO)})")
+    args = ap.parse_args(argv)
+    dest = build(args.out)
+    print(f"✅ Wrote {dest} ({dest.stat().st_size} bytes, {len(GENERATORS)} generators)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
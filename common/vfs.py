@@ -0,0 +1,181 @@
+"""
+Pluggable output backends for the scaffold generators.
+
+Generators write through output() instead of opening files themselves:
+
+    output().write(path, text)        create or overwrite
+    output().touch(path)              ensure the file exists, keep any content
+    output().mkdir(path)              ensure an (possibly empty) directory
+    output().exists(path)             written/created so far, or already on disk
+
+The default backend is the disk. use(MemoryBackend()) swaps in an in-memory
+tree for the duration of a block, so a whole scaffold can be generated,
+diffed, validated or timed without any disk I/O, and flushed to disk later in
+one batched pass:
+
+    with use(MemoryBackend()) as mem:
+        run_script("gpt-with-tech-req/create-api.py", "--root", "ticketing-app")
+    mem.flush()
+
+In memory the last write to a path wins and touch() never replaces content.
+"""
+from __future__ import annotations
+
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+from common.perf import write_file
+
+
+def _bytes(data, encoding: str) -> bytes:
+    return data.encode(encoding) if isinstance(data, str) else bytes(data)
+
+
+def _shared(path: Path) -> bool:
+    try:
+        return path.stat().st_nlink > 1
+    except FileNotFoundError:
+        return False
+
+
+class DiskBackend:
+    """Writes straight to the filesystem, creating each parent directory once."""
+
+    def __init__(self):
+        self._made = set()
+
+    def mkdir(self, path):
+        path = Path(path)
+        if path not in self._made:
+            path.mkdir(parents=True, exist_ok=True)
+            self._made.add(path)
+            self._made.update(path.parents)
+
+    def exists(self, path) -> bool:
+        return Path(path).exists()
+
+    def write(self, path, data, encoding: str = "utf-8", replace: bool = False, label=None):
+        """
+        replace=True writes a new inode (see staging.replace_bytes) instead of
+        truncating; label names the file in --profile reports (default: path).
+        A file hardlinked elsewhere (e.g. by --dedup) is always replaced, never
+        written through.
+        """
+        path = Path(path)
+        self.mkdir(path.parent)
+        if replace or _shared(path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        write_file(path, _bytes(data, encoding), key=label)
+
+    def touch(self, path):
+        path = Path(path)
+        self.mkdir(path.parent)
+        # O_CREAT without O_TRUNC: leave any existing file alone.
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o644))
+
+
+class MemoryBackend:
+    """An in-memory tree of path -> bytes (None for a touched placeholder)."""
+
+    def __init__(self):
+        self.files = {}
+        self.dirs = set()
+
+    def mkdir(self, path):
+        self.dirs.add(Path(path))
+
+    def exists(self, path) -> bool:
+        path = Path(path)
+        return path in self.files or path in self.dirs or path.exists()
+
+    def write(self, path, data, encoding: str = "utf-8", replace: bool = False, label=None):
+        self.files[Path(path)] = _bytes(data, encoding)
+
+    def touch(self, path):
+        self.files.setdefault(Path(path), None)
+
+    def read(self, path) -> bytes:
+        return self.files[Path(path)] or b""
+
+    def __contains__(self, path):
+        return Path(path) in self.files
+
+    def __iter__(self):
+        return iter(sorted(self.files))
+
+    def __len__(self):
+        return len(self.files)
+
+    @property
+    def size(self) -> int:
+        return sum(len(d) for d in self.files.values() if d)
+
+    def leaf_dirs(self):
+        """Every directory the tree needs, minus those implied by a deeper one."""
+        wanted = set(self.dirs) | {p.parent for p in self.files}
+        implied = {a for d in wanted for a in d.parents}
+        return sorted(wanted - implied)
+
+    def diff(self, other: "MemoryBackend"):
+        """(added, removed, changed) paths going from self to other."""
+        mine, theirs = set(self.files), set(other.files)
+        changed = sorted(p for p in mine & theirs if self.read(p) != other.read(p))
+        return sorted(theirs - mine), sorted(mine - theirs), changed
+
+    def flush(self, base=None, disk=None) -> dict:
+        """
+        Write the tree to disk (relative paths under base, if given): each leaf
+        directory is created once, then every file once, in sorted order.
+        disk is the backend doing the writing (default: a new DiskBackend).
+        """
+        base = Path(base) if base is not None else None
+        at = (lambda p: base / p) if base is not None else (lambda p: p)
+        disk = disk or DiskBackend()
+        counts = {"dirs": 0, "written": 0, "placeholders": 0}
+        for d in self.leaf_dirs():
+            disk.mkdir(at(d))
+            counts["dirs"] += 1
+        for path in sorted(self.files):
+            data = self.files[path]
+            if data is None:
+                disk.touch(at(path))
+                counts["placeholders"] += 1
+            else:
+                disk.write(at(path), data)
+                counts["written"] += 1
+        return counts
+
+
+_current = DiskBackend()
+
+
+def output():
+    """The backend generators should write through."""
+    return _current
+
+
+@contextmanager
+def use(backend):
+    global _current
+    saved, _current = _current, backend
+    try:
+        yield backend
+    finally:
+        _current = saved
+
+
+def run_script(path, *argv):
+    """Run a generator script as __main__ with argv, writing through the current backend."""
+    import runpy
+
+    saved = sys.argv
+    sys.argv = [str(path), *map(str, argv)]
+    try:
+        runpy.run_path(str(path), run_name="__main__")
+    finally:
+        sys.argv = saved
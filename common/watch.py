@@ -0,0 +1,94 @@
+"""
+Wait for a file to change: inotify on Linux, stat polling elsewhere.
+
+The parent directory is watched rather than the file itself, so editors that
+save by writing a temp file and renaming it over the original are seen too.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    _inotify_init1 = getattr(_libc, "inotify_init1", None)
+    _inotify_add_watch = getattr(_libc, "inotify_add_watch", None)
+except OSError:
+    _inotify_init1 = _inotify_add_watch = None
+
+
+class FileWatcher:
+    def __init__(self, path, debounce: float = 0.01, poll_interval: float = 0.1):
+        self.path = Path(path).resolve()
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.fd = None
+        if _inotify_init1 is not None:
+            fd = _inotify_init1(IN_CLOEXEC)
+            if fd >= 0:
+                mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+                if _inotify_add_watch(fd, os.fsencode(self.path.parent), mask) >= 0:
+                    self.fd = fd
+                else:
+                    os.close(fd)
+        self._stamp = self._stat()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.fd is not None else "polling"
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _stat(self):
+        try:
+            st = self.path.stat()
+            return st.st_ino, st.st_size, st.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _ours(self, data: bytes) -> bool:
+        name = os.fsencode(self.path.name)
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            if data[pos:pos + length].rstrip(b"\0") == name:
+                return True
+            pos += length
+        return False
+
+    def wait(self):
+        """Block until the file has been written (or replaced) and settled."""
+        if self.fd is None:
+            while True:
+                time.sleep(self.poll_interval)
+                stamp = self._stat()
+                if stamp is not None and stamp != self._stamp:
+                    self._stamp = stamp
+                    return
+        while not self._ours(os.read(self.fd, 65536)):
+            pass
+        # Coalesce the burst of events a single save tends to produce.
+        while select.select([self.fd], [], [], self.debounce)[0]:
+            os.read(self.fd, 65536)
+        self._stamp = self._stat()
@@ -1,14 +1,39 @@
+import argparse
+import atexit
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import perf  # noqa: E402
+from common.staging import StagedTree  # noqa: E402
+from common.vfs import output  # noqa: E402
 
 def create_file(path, content):
     """Helper function to create a file with specified content."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, 'w') as f:
-        f.write(content)
+    # Replace instead of truncating in place: a file may be a hardlink shared
+    # with the live tree (StagedTree(swap=True) seeds the stage that way).
+    output().write(Path(path), content, replace=True, label=os.path.relpath(path, root_dir))
+
+parser = argparse.ArgumentParser(description="Create the ticket-app Next.js + Angular project.")
+parser.add_argument("--staged", action="store_true",
+                    help="Write into a sibling stage dir; if the run succeeds, rename each file into place "
+                         "(atomic per file, not for the tree)")
+perf.add_arguments(parser)
+args = parser.parse_args()
+if args.profile:
+    perf.start()
 
 # --- Project Root ---
 root_dir = 'ticket-app'
-os.makedirs(root_dir, exist_ok=True)
+# --staged: write into a sibling stage dir and rename the files into place at
+# the end, so a failed run leaves ticket-app/ untouched and watchers only see
+# whole files.
+stage = StagedTree(root_dir).begin() if args.staged else None
+if stage:
+    atexit.register(stage.abort)  # no-op once committed
+    root_dir = str(stage.path)
+output().mkdir(root_dir)
 
 # --- docker-compose.yml ---
 docker_compose_content = """version: '3.8'
@@ -352,4 +377,9 @@ web_app_component_html_content = """<mat-toolbar color="primary">
 """
 create_file(os.path.join(root_dir, 'web', 'src', 'app', 'app.component.html'), web_app_component_html_content)
 
-print("Project structure and files have been created successfully!")
\ No newline at end of file
+if stage:
+    stage.commit()
+
+print("Project structure and files have been created successfully!")
+if args.profile:
+    perf.finish(args.profile)
\ No newline at end of file
@@ -1,8 +1,26 @@
+import argparse
 import os
-import re
 import sys
+from pathlib import Path
 
-def create_files_from_markdown(markdown_content):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.blockcache import load_blocks  # noqa: E402
+from common.emit import FAILED, SKIPPED, FileEmitter  # noqa: E402
+from common.fences import scan  # noqa: E402
+from common.pathfilter import PathFilter, add_arguments as add_filter_arguments  # noqa: E402
+
+def warn(issue):
+    print(f"Malformed block at {issue}")
+
+def report(result):
+    if result.new_dir:
+        print(f"Directory created: {result.path.parent}")
+    if result.status == FAILED:
+        print(f"Error writing to file {result.path}: {result.error}")
+    elif result.status != SKIPPED:
+        print(f"File created or replaced: {result.path}")
+
+def create_files_from_markdown(markdown_content, jobs=1, blocks=None, keep=None):
     """
     Parses markdown content for a specific file pattern and creates files on disk.
 
@@ -15,53 +33,53 @@ def create_files_from_markdown(markdown_content):
     
     Args:
         markdown_content (str): A string containing the markdown with file patterns.
+        jobs (int): Number of concurrent writers. Each directory is created once
+            and results are printed in input order regardless of jobs.
+        blocks (list): Optional precomputed block index of markdown_content
+            (see --cache); markdown_content must then be the raw file bytes.
+        keep (callable): Optional path predicate (see --only/--exclude). Blocks
+            it rejects are never decoded or written.
     """
-    # Corrected regex to find the entire block for a single file.
-    # It now correctly captures the file path between backticks.
-    pattern = re.compile(
-        r"###\s*`([^`]+)`\n+```[^\n]*\n(.*?)\n```\s*\n-*",
-        re.DOTALL
-    )
+    # Blocks come from the shared single-pass tokenizer, which also accepts the
+    # labelled "## Label: `path`" headings and reports malformed blocks.
+    buf = markdown_content if isinstance(markdown_content, bytes) else markdown_content.encode('utf-8')
 
-    matches = pattern.finditer(markdown_content)
+    matches = list(scan(buf, on_issue=warn)) if blocks is None else blocks
+    if keep is not None:
+        matches = [block for block in matches if keep(block.path)]
 
     if not matches:
         print("No file patterns found in the provided markdown content.")
         return
 
-    for match in matches:
-        file_path_full = match.group(1).strip()
-        file_content = match.group(2).strip()
-
-        # Extract directory path and filename
-        dir_path = os.path.dirname(file_path_full)
-        file_name = os.path.basename(file_path_full)
+    with FileEmitter(jobs=jobs) as emitter:
+        for block in matches:
+            emitter.submit(block.path, Path(block.path), block.text(buf).strip())
+            for result in emitter.ready():
+                report(result)
+        for result in emitter.drain():
+            report(result)
 
-        # Create directories if they don't exist
-        if dir_path:
-            os.makedirs(dir_path, exist_ok=True)
-            print(f"Directory created: {dir_path}")
-
-        # Create or replace the file
-        full_file_path = os.path.join(dir_path, file_name)
-        try:
-            with open(full_file_path, 'w', encoding='utf-8') as f:
-                f.write(file_content)
-            print(f"File created or replaced: {full_file_path}")
-        except IOError as e:
-            print(f"Error writing to file {full_file_path}: {e}")
+    counts = emitter.counts
+    print(f"\nCreated: {counts['created']}, Overwritten: {counts['overwritten']}, "
+          f"Skipped: {counts['skipped']}, Failed: {counts[FAILED]}")
 
 if __name__ == '__main__':
-    # Check if a filename was provided as a command-line argument
-    if len(sys.argv) < 2:
-        print("Usage: python create_files.py <path_to_markdown_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Create files from ### `path` + code fence blocks.")
+    parser.add_argument("markdown_file", help="Path to the markdown file")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of concurrent file writers (default: 1)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse/refresh a sidecar block index next to the markdown file")
+    parser.add_argument("--list", action="store_true", help="List the file blocks and exit")
+    add_filter_arguments(parser)
+    args = parser.parse_args()
+    keep = PathFilter(args.only, args.exclude) or None
 
-    markdown_file_path = sys.argv[1]
+    markdown_file_path = args.markdown_file
 
     # Read the markdown file content
     try:
-        with open(markdown_file_path, 'r', encoding='utf-8') as file:
+        with open(markdown_file_path, 'rb') as file:
             file_content = file.read()
     except FileNotFoundError:
         print(f"Error: The file '{markdown_file_path}' was not found.")
@@ -70,5 +88,16 @@ if __name__ == '__main__':
         print(f"An error occurred while reading the file: {e}")
         sys.exit(1)
 
+    blocks = None
+    if args.cache or args.list:
+        blocks = load_blocks(Path(markdown_file_path), file_content, on_issue=warn, cache=args.cache)
+
+    if args.list:
+        shown = [block for block in blocks if keep is None or keep(block.path)]
+        for block in shown:
+            print(f"{block.path}  ({block.lang or '-'}, {block.end - block.start} bytes, line {block.line})")
+        print(f"\n{len(shown)} block(s)")
+        sys.exit(0)
+
     # Process the file content and create the files
-    create_files_from_markdown(file_content)
\ No newline at end of file
+    create_files_from_markdown(file_content, jobs=args.jobs, blocks=blocks, keep=keep)
\ No newline at end of file
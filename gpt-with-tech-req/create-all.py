@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Run the API/web skeleton and content scripts as one plan: every path is
+written exactly once (content wins over empty skeleton placeholders) and each
+directory is created once, in sorted order.
+"""
+import argparse, io, sys
+from contextlib import redirect_stdout
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+from common import dedup  # noqa: E402
+from common.scaffold import load_module  # noqa: E402
+from common.vfs import MemoryBackend, use  # noqa: E402
+
+# Later steps win when they write the same path, as when run by hand in this order.
+STEPS = [
+    ("create-api-skeleton.py", lambda mod, root: mod.main(str(root / "api"))),
+    ("create-web-skeleton.py", lambda mod, root: mod.main(str(root))),
+    ("create-api.py", lambda mod, root: mod.main(["--root", str(root)])),
+    ("create-api-full.py", lambda mod, root: mod.main(root)),
+]
+
+def main():
+    ap = argparse.ArgumentParser(description="Create the API and web scaffold in a single pass")
+    ap.add_argument("--root", type=Path, default=HERE / "ticketing-app",
+                    help="Root folder (default: ticketing-app next to this script, like create-api-full.py)")
+    ap.add_argument("--dry-run", action="store_true", help="Print the plan without writing anything")
+    dedup.add_arguments(ap)
+    args = ap.parse_args()
+
+    root = args.root
+
+    # Collect every step's output in memory; the scripts' own "created" messages would lie.
+    with use(MemoryBackend()) as plan, redirect_stdout(io.StringIO()):
+        plan.mkdir(root)                      # create-api.py insists on an existing root
+        for script, run in STEPS:
+            run(load_module(HERE / script), root)
+
+    if args.dry_run:
+        for path in plan:
+            print(f"{'write' if plan.files[path] is not None else 'touch'}  {path}")
+        print(f"\n{len(plan)} files, {len(plan.leaf_dirs())} leaf dirs")
+        return
+
+    disk = dedup.backend(args)
+    counts = plan.flush(disk=disk)
+    print(f"✅ Scaffold created under {root}: {counts['written']} files written, "
+          f"{counts['placeholders']} placeholders, {counts['dirs']} leaf dirs")
+    if disk is not None:
+        print(disk.store.summary())
+
+if __name__ == "__main__":
+    main()
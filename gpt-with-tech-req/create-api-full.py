@@ -1,20 +1,32 @@
 #!/usr/bin/env python3
+import argparse
 import os
+import sys
 from pathlib import Path
 from textwrap import dedent
 
 BASE_DIR = Path(__file__).resolve().parent
-API_DIR = BASE_DIR / "ticketing-app" / "api"
+sys.path.insert(0, str(BASE_DIR.parent))
+from common import perf, templatepack  # noqa: E402
+from common.vfs import output  # noqa: E402
 
 def write_file(path: Path, content: str):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(dedent(content).lstrip("\n"))
-
-def main():
-    API_DIR.mkdir(parents=True, exist_ok=True)
+    with perf.rendering(path):
+        text = dedent(content).lstrip("\n")
+    output().write(path, text)
+
+def main(root: Path = BASE_DIR / "ticketing-app"):
+    api_dir = root / "api"
+    output().mkdir(api_dir)
+    # A fresh `python -m common.templatepack build` holds every file below, already dedented.
+    pack = templatepack.lookup(__file__)
+    if pack is not None:
+        for rel, data in pack.files.items():
+            output().write(root / rel, data)
+        print("✅ API folder structure created successfully at:", api_dir)
+        return
     # docker-compose.yml
-    write_file(BASE_DIR / "ticketing-app" / "docker-compose.yml", """
+    write_file(root / "docker-compose.yml", """
     version: '3.9'
     services:
       db:
@@ -50,7 +62,7 @@ def main():
     """)
 
     # .env.example
-    write_file(API_DIR / ".env.example", """
+    write_file(api_dir / ".env.example", """
     DATABASE_URL=postgresql://user:pass@db:5432/appdb
     JWT_SECRET=supersecret
     SMTP_HOST=mailhog
@@ -62,7 +74,7 @@ def main():
     """)
 
     # Dockerfile
-    write_file(API_DIR / "Dockerfile", """
+    write_file(api_dir / "Dockerfile", """
     FROM node:18
     WORKDIR /app
     COPY package*.json ./
@@ -74,7 +86,7 @@ def main():
     """)
 
     # package.json
-    write_file(API_DIR / "package.json", """
+    write_file(api_dir / "package.json", """
     {
       "name": "ticketing-api",
       "version": "1.0.0",
@@ -100,7 +112,7 @@ def main():
     }
     """)
     # prisma/schema.prisma
-    write_file(API_DIR / "prisma" / "schema.prisma", """
+    write_file(api_dir / "prisma" / "schema.prisma", """
     generator client {
       provider = "prisma-client-js"
     }
@@ -239,17 +251,17 @@ def main():
     """)
 
     # migrations/init.sql
-    write_file(API_DIR / "prisma" / "migrations" / "init" / "migration.sql", "-- SQL migration file generated from schema.prisma")
+    write_file(api_dir / "prisma" / "migrations" / "init" / "migration.sql", "-- SQL migration file generated from schema.prisma")
 
     # pages/api/_utils/db.js
-    write_file(API_DIR / "pages" / "api" / "_utils" / "db.js", """
+    write_file(api_dir / "pages" / "api" / "_utils" / "db.js", """
     import { PrismaClient } from '@prisma/client';
     const prisma = new PrismaClient();
     export default prisma;
     """)
 
     # pages/api/_utils/auth.js
-    write_file(API_DIR / "pages" / "api" / "_utils" / "auth.js", """
+    write_file(api_dir / "pages" / "api" / "_utils" / "auth.js", """
     import jwt from 'jsonwebtoken';
     import bcrypt from 'bcrypt';
 
@@ -291,7 +303,7 @@ def main():
     """)
 
     # pages/api/auth/register.js
-    write_file(API_DIR / "pages" / "api" / "auth" / "register.js", """
+    write_file(api_dir / "pages" / "api" / "auth" / "register.js", """
     import prisma from '../_utils/db';
     import { hashPassword, signToken } from '../_utils/auth';
 
@@ -314,7 +326,7 @@ def main():
     """)
 
     # pages/api/auth/login.js
-    write_file(API_DIR / "pages" / "api" / "auth" / "login.js", """
+    write_file(api_dir / "pages" / "api" / "auth" / "login.js", """
     import prisma from '../_utils/db';
     import { comparePassword, signToken } from '../_utils/auth';
 
@@ -335,7 +347,7 @@ def main():
     """)
 
     # pages/api/events/index.js
-    write_file(API_DIR / "pages" / "api" / "events" / "index.js", """
+    write_file(api_dir / "pages" / "api" / "events" / "index.js", """
     import prisma from '../_utils/db';
 
     export default async function handler(req, res) {
@@ -348,7 +360,7 @@ def main():
     """)
 
     # pages/api/tickets/validate.js
-    write_file(API_DIR / "pages" / "api" / "tickets" / "validate.js", """
+    write_file(api_dir / "pages" / "api" / "tickets" / "validate.js", """
     import prisma from '../_utils/db';
 
     export default async function handler(req, res) {
@@ -356,21 +368,27 @@ def main():
       const { token } = req.body;
       if (!token) return res.status(400).json({ error: 'QR token required' });
 
-      const ticket = await prisma.tickets.findUnique({ where: { qr_token: token } });
-      if (!ticket) return res.json({ status: 'invalid' });
-      if (ticket.status === 'USED') return res.json({ status: 'already_used', used_at: ticket.used_at });
-      if (ticket.status !== 'ISSUED') return res.json({ status: ticket.status.toLowerCase() });
-
-      await prisma.tickets.update({
-        where: { id: ticket.id },
-        data: { status: 'USED', used_at: new Date() }
-      });
-
-      res.json({ status: 'valid_unused', ticket });
+      // Lookup and the ISSUED -> USED transition in one statement, so two
+      // concurrent scans of the same token can't both consume it.
+      const [row] = await prisma.$queryRaw`
+        WITH t AS (SELECT * FROM tickets WHERE qr_token = ${token}),
+        consumed AS (
+          UPDATE tickets u SET status = 'USED', used_at = (now() AT TIME ZONE 'UTC')
+          FROM t WHERE u.id = t.id AND u.status = 'ISSUED'
+          RETURNING u.*
+        )
+        SELECT t.status::text AS status, t.used_at, row_to_json(c) AS consumed
+        FROM t LEFT JOIN consumed c ON c.id = t.id`;
+
+      if (!row) return res.json({ status: 'invalid' });
+      if (row.consumed) return res.json({ status: 'valid_unused', ticket: row.consumed });
+      // Still ISSUED in our snapshot but not updated: a concurrent scan won.
+      if (row.status === 'USED' || row.status === 'ISSUED') return res.json({ status: 'already_used', used_at: row.used_at });
+      res.json({ status: row.status.toLowerCase() });
     }
     """)
     # pages/api/checkout/session.js
-    write_file(API_DIR / "pages" / "api" / "checkout" / "session.js", """
+    write_file(api_dir / "pages" / "api" / "checkout" / "session.js", """
     import Stripe from 'stripe';
     import prisma from '../_utils/db';
 
@@ -427,7 +445,7 @@ def main():
     """)
 
     # pages/api/admin/events.js
-    write_file(API_DIR / "pages" / "api" / "admin" / "events.js", """
+    write_file(api_dir / "pages" / "api" / "admin" / "events.js", """
     import prisma from '../_utils/db';
     import { requireRole } from '../_utils/auth';
 
@@ -446,7 +464,7 @@ def main():
     """)
 
     # pages/api/admin/tickets.js
-    write_file(API_DIR / "pages" / "api" / "admin" / "tickets.js", """
+    write_file(api_dir / "pages" / "api" / "admin" / "tickets.js", """
     import prisma from '../_utils/db';
     import { requireRole } from '../_utils/auth';
 
@@ -461,7 +479,7 @@ def main():
     """)
 
     # pages/api/seller/issue.js
-    write_file(API_DIR / "pages" / "api" / "seller" / "issue.js", """
+    write_file(api_dir / "pages" / "api" / "seller" / "issue.js", """
     import prisma from '../_utils/db';
     import { requireRole } from '../_utils/auth';
     import crypto from 'crypto';
@@ -488,7 +506,7 @@ def main():
     """)
 
     # pages/api/docs/index.js (Swagger UI)
-    write_file(API_DIR / "pages" / "api" / "docs" / "index.js", """
+    write_file(api_dir / "pages" / "api" / "docs" / "index.js", """
     import swaggerUi from 'swagger-ui-express';
     import swaggerDocument from '../../../swagger.json';
 
@@ -502,7 +520,7 @@ def main():
     """)
 
         # swagger.json
-    write_file(API_DIR / "swagger.json", """
+    write_file(api_dir / "swagger.json", """
 {
   "openapi": "3.0.0",
   "info": {
@@ -828,7 +846,7 @@ def main():
     """)
 
  # email templates (MJML)
-    write_file(API_DIR / "emails" / "ticketDelivery.mjml", """
+    write_file(api_dir / "emails" / "ticketDelivery.mjml", """
     <mjml>
       <mj-body>
         <mj-section>
@@ -843,7 +861,7 @@ def main():
     </mjml>
     """)
 
-    write_file(API_DIR / "emails" / "verifyEmail.mjml", """
+    write_file(api_dir / "emails" / "verifyEmail.mjml", """
     <mjml>
       <mj-body>
         <mj-section>
@@ -857,7 +875,7 @@ def main():
     """)
 
     # prisma/seed.js
-    write_file(API_DIR / "prisma" / "seed.js", """
+    write_file(api_dir / "prisma" / "seed.js", """
     import prisma from '../pages/api/_utils/db.js';
     import bcrypt from 'bcrypt';
 
@@ -908,13 +926,23 @@ def main():
         process.exit(1);
       });
     """)
-    print("✅ API folder structure created successfully at:", API_DIR)
+    print("✅ API folder structure created successfully at:", api_dir)
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Create the full Next.js API under <root>/api")
+    ap.add_argument("--root", type=Path, default=BASE_DIR / "ticketing-app",
+                    help="Project root (default: ticketing-app next to this script)")
+    perf.add_arguments(ap)
+    args = ap.parse_args()
+    if args.profile:
+        perf.start()
     try:
-        main()
+        main(args.root)
         print("✅ script2.py finished without errors.")
+        if args.profile:
+            perf.finish(args.profile)
     except Exception as e:
         print("❌ script2.py failed:", str(e))
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+        sys.exit(1)
\ No newline at end of file
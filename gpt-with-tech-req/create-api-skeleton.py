@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.vfs import output  # noqa: E402
 
 ROOT = "ticketing-app/api"
 
@@ -124,16 +128,14 @@ FILES = [
 ]
 
 def touch(path: str):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
     # Create empty file (keep .gitkeep as empty too)
-    with open(path, "a", encoding="utf-8"):
-        pass
+    output().touch(path)
 
-def main():
+def main(root=ROOT):
     for rel in FILES:
-        abs_path = os.path.join(ROOT, rel)
+        abs_path = os.path.join(root, rel)
         touch(abs_path)
-    print(f"✅ Created API skeleton under ./{ROOT} ({len(FILES)} files)")
+    print(f"✅ Created API skeleton under ./{root} ({len(FILES)} files)")
 
 if __name__ == "__main__":
     main()
@@ -3,21 +3,22 @@ import argparse, sys, json
 from pathlib import Path
 from textwrap import dedent
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.vfs import output  # noqa: E402
+
 def write(p: Path, content: str):
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(dedent(content).lstrip(), encoding="utf-8")
+    output().write(p, dedent(content).lstrip())
 
 def json_write(p: Path, obj: dict):
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(json.dumps(obj, indent=2) + "\n", encoding="utf-8")
+    output().write(p, json.dumps(obj, indent=2) + "\n")
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser(description="Create API scaffold")
     ap.add_argument("--root", required=True, help="Root folder created by script #1")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
     root = Path(args.root)
-    if not root.exists():
+    if not output().exists(root):
         print(f"Root '{root}' not found. Run script #1 first.", file=sys.stderr)
         sys.exit(1)
 
@@ -1,31 +1,29 @@
 #!/usr/bin/env python3
-import argparse, sys, secrets, string
+import argparse, csv, functools, io, json, sys, secrets, string
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from textwrap import dedent
 
-def rand_secret(n=64):
-    alphabet = string.ascii_letters + string.digits
-    return "".join(secrets.choice(alphabet) for _ in range(n))
-
-def write(p: Path, content: str):
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(dedent(content).lstrip(), encoding="utf-8")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import dedup, templatepack  # noqa: E402
+from common.vfs import output  # noqa: E402
 
-def main():
-    ap = argparse.ArgumentParser(description="Create root folder and infrastructure files")
-    ap.add_argument("--name", required=True, help="Project name, e.g. TicketingApp")
-    ap.add_argument("--api-port", type=int, default=3000)
-    ap.add_argument("--web-port", type=int, default=4200)
-    ap.add_argument("--db-port", type=int, default=5432)
-    args = ap.parse_args()
+ALPHABET = (string.ascii_letters + string.digits).encode()
+# Maps a random byte to a letter/digit; bytes >= 248 (62 * 4) are dropped so
+# every character stays equally likely.
+_SECRET_TABLE = bytes(ALPHABET[b % len(ALPHABET)] for b in range(256))
+_SECRET_REJECT = bytes(range(len(ALPHABET) * 4, 256))
 
-    root = Path(args.name)
-    if root.exists() and any(root.iterdir()):
-        print(f"Target '{root}' exists and is not empty.", file=sys.stderr)
-        sys.exit(1)
+def rand_secret(n=64):
+    out = b""
+    while len(out) < n:
+        out += secrets.token_bytes(n + n // 8).translate(_SECRET_TABLE, _SECRET_REJECT)
+    return out[:n].decode()
 
+# Shared by every tenant: dedented once, then filled in with str.format.
+TEMPLATES = {
     # .gitignore
-    write(root/".gitignore", """
+    ".gitignore": """
     node_modules/
     dist/
     .next/
@@ -33,12 +31,13 @@ def main():
     .env
     api/.env*
     web/.env*
+    api/.manifest-signing-key.pem
     coverage/
-    """)
-    
+    """,
+
     # README.md
-    write(root/"README.md", f"""
-    # {args.name}
+    "README.md": """
+    # {name}
 
     **Ticketing Web Application** – Full-stack system with API (Next.js), Web (Angular), PostgreSQL, Stripe (or mock), and MailHog for email.
 
@@ -49,10 +48,10 @@ def main():
     ```
 
     **Services**:
-    - API: http://localhost:{args.api_port} (Swagger: /api/docs)
-    - Web: http://localhost:{args.web_port}
+    - API: http://localhost:{api_port} (Swagger: /api/docs)
+    - Web: http://localhost:{web_port}
     - MailHog UI: http://localhost:8025
-    - Postgres: localhost:{args.db_port}
+    - Postgres: localhost:{db_port}
     - Stripe Mock (if enabled): http://localhost:12111
 
     **Seed Admin Credentials**:
@@ -73,32 +72,32 @@ def main():
     - Configure `.env` for production services
     - Build images: `docker compose build`
     - Deploy via your container platform
-    """)
+    """,
 
     # .env.example
-    write(root/".env.example", f"""
+    ".env.example": """
     # ----- API -----
     DATABASE_URL=postgresql://appuser:apppass@db:5432/appdb
-    JWT_SECRET={rand_secret()}
+    JWT_SECRET={jwt_secret}
     SMTP_HOST=mailhog
     SMTP_PORT=1025
     SMTP_USER=
     SMTP_PASS=
     SMTP_FROM="Tickets <no-reply@example.com>"
-    APP_BASE_URL=http://localhost:{args.web_port}
-    API_BASE_URL=http://localhost:{args.api_port}
+    APP_BASE_URL=http://localhost:{web_port}
+    API_BASE_URL=http://localhost:{api_port}
     PAYMENTS_DISABLED=true
     GOOGLE_CLIENT_ID=
     GOOGLE_CLIENT_SECRET=
-    OAUTH_REDIRECT_URL=http://localhost:{args.api_port}/api/auth/oauth/google/callback
+    OAUTH_REDIRECT_URL=http://localhost:{api_port}/api/auth/oauth/google/callback
     STRIPE_SECRET_KEY=
     STRIPE_WEBHOOK_SECRET=
     # ----- WEB -----
-    NG_APP_API_BASE_URL=http://localhost:{args.api_port}
-    """)
+    NG_APP_API_BASE_URL=http://localhost:{api_port}
+    """,
 
     # docker-compose.yml
-    write(root/"docker-compose.yml", f"""
+    "docker-compose.yml": """
     version: "3.9"
     services:
       db:
@@ -108,7 +107,7 @@ def main():
           POSTGRES_USER: appuser
           POSTGRES_PASSWORD: apppass
         ports:
-          - "{args.db_port}:5432"
+          - "{db_port}:5432"
         volumes:
           - db_data:/var/lib/postgresql/data
         healthcheck:
@@ -132,16 +131,16 @@ def main():
             condition: service_started
         env_file: .env
         environment:
-          PORT: {args.api_port}
+          PORT: {api_port}
         ports:
-          - "{args.api_port}:3000"
+          - "{api_port}:3000"
 
       web:
         build: ./web
         environment:
           NG_APP_API_BASE_URL: "http://api:3000"
         ports:
-          - "{args.web_port}:4200"
+          - "{web_port}:4200"
         depends_on:
           - api
 
@@ -153,10 +152,10 @@ def main():
 
     volumes:
       db_data:
-    """)
+    """,
 
     # Makefile
-    write(root/"Makefile", f"""
+    "Makefile": """
     up:
     \tdocker compose up --build
     down:
@@ -167,9 +166,109 @@ def main():
     \tdocker compose exec api node scripts/seed.cjs
     logs:
     \tdocker compose logs -f
-    """)
+    """,
+}
+
+@functools.lru_cache(maxsize=None)
+def compiled():
+    return {rel: dedent(text).lstrip() for rel, text in TEMPLATES.items()}
+
+def render(values: dict) -> dict:
+    """rel path -> file text for one tenant; values holds name, the ports and jwt_secret."""
+    pack = packed()
+    if pack is not None:
+        return {rel: templatepack.fill(segments, values) for rel, segments in pack.templates.items()}
+    return {rel: text.format(**values) for rel, text in compiled().items()}
+
+@functools.lru_cache(maxsize=None)
+def packed():
+    return templatepack.lookup(__file__)
+
+def not_empty(root: Path) -> bool:
+    return root.exists() and any(root.iterdir())
+
+def existing_secret(root: Path):
+    """JWT_SECRET from an existing root's .env.example, so --update keeps it stable."""
+    try:
+        text = (root / ".env.example").read_text(encoding="utf-8")
+    except OSError:
+        return None
+    for line in text.splitlines():
+        if line.startswith("JWT_SECRET="):
+            return line.split("=", 1)[1].strip() or None
+    return None
+
+def create(values: dict):
+    root = Path(values["name"])
+    for rel, text in render(values).items():
+        output().write(root / rel, text)
+    return values["name"]
+
+def load_rows(path: Path):
+    """Tenant rows from a CSV (header: name,api_port,web_port,db_port) or a JSON list of objects."""
+    text = path.read_text(encoding="utf-8")
+    rows = json.loads(text) if path.suffix.lower() == ".json" else list(csv.DictReader(io.StringIO(text)))
+    defaults = {"api_port": 3000, "web_port": 4200, "db_port": 5432}
+    tenants = []
+    for i, row in enumerate(rows, 1):
+        name = str(row.get("name") or "").strip()
+        if not name:
+            raise SystemExit(f"{path}: row {i} has no name")
+        values = {"name": name}
+        for key, default in defaults.items():
+            raw = row.get(key)
+            values[key] = int(raw) if raw not in (None, "") else default
+        tenants.append(values)
+    return tenants
+
+def main():
+    ap = argparse.ArgumentParser(description="Create root folder and infrastructure files")
+    ap.add_argument("--name", help="Project name, e.g. TicketingApp")
+    ap.add_argument("--api-port", type=int, default=3000)
+    ap.add_argument("--web-port", type=int, default=4200)
+    ap.add_argument("--db-port", type=int, default=5432)
+    ap.add_argument("--batch", type=Path, metavar="FILE",
+                    help="Create one root per row of a CSV or JSON file of {name, api_port, web_port, db_port}")
+    ap.add_argument("--jobs", type=int, default=8, help="Roots written concurrently in --batch mode (default: 8)")
+    ap.add_argument("--update", action="store_true",
+                    help="Rewrite the root files of an existing, non-empty root (keeps its JWT_SECRET)")
+    dedup.add_arguments(ap)
+    args = ap.parse_args()
+    if not args.name and not args.batch:
+        ap.error("one of --name or --batch is required")
+
+    if args.batch:
+        tenants = load_rows(args.batch)
+    else:
+        tenants = [{"name": args.name, "api_port": args.api_port, "web_port": args.web_port, "db_port": args.db_port}]
+
+    # Check every target before writing anything, so a bad row can't leave half a batch behind.
+    names = [t["name"] for t in tenants]
+    dupes = sorted({n for n in names if names.count(n) > 1})
+    if dupes:
+        print(f"Duplicate names in batch: {', '.join(dupes)}", file=sys.stderr)
+        sys.exit(1)
+    busy = [] if args.update else [n for n in names if not_empty(Path(n))]
+    for n in busy:
+        print(f"Target '{n}' exists and is not empty (use --update to rewrite it).", file=sys.stderr)
+    if busy:
+        sys.exit(1)
+
+    for t in tenants:
+        t["jwt_secret"] = (args.update and existing_secret(Path(t["name"]))) or rand_secret()
 
-    print(f"Root structure for '{args.name}' created successfully.")
+    done = "updated" if args.update else "created"
+    with dedup.using(args) as store:
+        if len(tenants) == 1:
+            create(tenants[0])
+            print(f"Root structure for '{tenants[0]['name']}' {done} successfully.")
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+                for name in pool.map(create, tenants):
+                    print(f"Root structure for '{name}' {done} successfully.")
+            print(f"\n✅ {done.capitalize()} {len(tenants)} roots.")
+    if store is not None:
+        print(store.summary())
 
 if __name__ == "__main__":
     main()
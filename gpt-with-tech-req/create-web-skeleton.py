@@ -1,4 +1,10 @@
+import argparse
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import dedup  # noqa: E402
+from common.vfs import output  # noqa: E402
 
 # ----- Directories -----
 dirs = [
@@ -337,22 +343,33 @@ files = [
 ]
 
 def touch(path: str, content: str = ""):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(content)
-
-# Create directories
-for d in dirs:
-    os.makedirs(d, exist_ok=True)
-
-# Create empty files
-for fpath in files:
-    # Place a tiny placeholder in a couple of obvious files
-    if fpath.endswith("logo.svg"):
-        touch(fpath, '<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64"><rect width="64" height="64" fill="#1976d2"/></svg>\n')
-    elif fpath.endswith("en.json"):
-        touch(fpath, '{ "app": { "title": "Ticketing App" } }\n')
-    else:
-        touch(fpath, "")
-
-print("✅ Angular + Material web skeleton created under ./web")
+    # Like the original open(path, "w"): (re)write the file, empty or not.
+    output().write(path, content)
+
+def main(root="."):
+    # Create directories
+    for d in dirs:
+        output().mkdir(os.path.join(root, d))
+
+    # Create empty files
+    for fpath in files:
+        fpath = os.path.join(root, fpath)
+        # Place a tiny placeholder in a couple of obvious files
+        if fpath.endswith("logo.svg"):
+            touch(fpath, '<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64"><rect width="64" height="64" fill="#1976d2"/></svg>\n')
+        elif fpath.endswith("en.json"):
+            touch(fpath, '{ "app": { "title": "Ticketing App" } }\n')
+        else:
+            touch(fpath, "")
+
+    print(f"✅ Angular + Material web skeleton created under {os.path.join(root, 'web')}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Create the Angular + Material web skeleton under <root>/web")
+    ap.add_argument("--root", default=".", help="Project root (default: current directory)")
+    dedup.add_arguments(ap)
+    args = ap.parse_args()
+    with dedup.using(args) as store:
+        main(args.root)
+    if store is not None:
+        print(store.summary())
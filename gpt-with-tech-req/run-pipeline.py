@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Run the whole scaffold flow as a DAG instead of by hand:
+
+    create-root -> create-api -> create-api-full
+                -> create-web-skeleton -> fix_angular_builder
+                                       -> fix_angular_schema
+
+api and web steps run in parallel. Steps whose outputs are newer than their
+script and inputs are skipped, so re-running after editing one generator only
+redoes that step and what depends on it. The root step runs create-root.py with
+--update, so re-running it over an existing root rewrites the root files
+instead of failing.
+"""
+import argparse, sys, time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+from common.dag import CANCELLED, FAILED, RAN, SKIPPED, Runner, Step, python  # noqa: E402
+
+FIXERS = HERE.parent / "chatgpt"
+
+def pipeline(root: Path):
+    api, web = root / "api", root / "web"
+    return [
+        Step("root", python(HERE / "create-root.py", "--name", root, "--update"),
+             outputs=[root / ".env.example", root / "Makefile"]),
+        Step("api", python(HERE / "create-api.py", "--root", root), deps=["root"],
+             outputs=[api / "openapi.yaml", api / "src/lib/prisma.ts"]),
+        Step("api-full", python(HERE / "create-api-full.py", "--root", root), deps=["api"],
+             outputs=[api / "prisma/schema.prisma", api / "pages/api/tickets/validate.js"]),
+        Step("web", python(HERE / "create-web-skeleton.py", "--root", root), deps=["root"],
+             outputs=[web / "src/app/app.module.ts", web / "src/assets/i18n/en.json"]),
+        Step("fix-builder", python(FIXERS / "fix_angular_builder.py", "--root", root), deps=["web"],
+             outputs=[web / "package.json", web / "package-lock.json"]),
+        Step("fix-schema", python(FIXERS / "fix_angular_schema.py", "--root", root), deps=["web"],
+             outputs=[web / "angular.json", web / "tsconfig.app.json"]),
+    ]
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the scaffold scripts as a parallel DAG")
+    ap.add_argument("--root", default="ticketing-app", help="Project root to create (default: ticketing-app)")
+    ap.add_argument("--jobs", type=int, default=4, help="Steps to run at once (default: 4)")
+    ap.add_argument("--force", action="append", default=[], metavar="STEP",
+                    help="Re-run STEP (and what depends on it) even if its outputs are up to date; repeatable")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Show each step's output")
+    args = ap.parse_args()
+
+    icons = {RAN: "✅", FAILED: "❌", CANCELLED: "⏹️ "}
+
+    def show(r):
+        timing = f" in {r.seconds:.2f}s" if r.status in (RAN, FAILED) else ""
+        print(f"{icons.get(r.status, '⏭️ ')} {r.step}: {r.status}{timing}")
+        if r.output and (args.verbose or r.status == FAILED):
+            print("   " + r.output.rstrip().replace("\n", "\n   "))
+
+    steps = pipeline(Path(args.root))
+    unknown = set(args.force) - {s.name for s in steps}
+    if unknown:
+        ap.error(f"unknown step(s) for --force: {', '.join(sorted(unknown))}")
+
+    runner = Runner(steps, jobs=args.jobs, force=args.force)
+    t0 = time.perf_counter()
+    ok = runner.run(on_result=show)
+    statuses = [r.status for r in runner.results.values()]
+    busy = sum(r.seconds for r in runner.results.values())
+    print(f"\n{'Done' if ok else 'Failed'}: {statuses.count(RAN)} ran, {statuses.count(SKIPPED)} up to date "
+          f"in {time.perf_counter() - t0:.2f}s wall ({busy:.2f}s of step time).")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
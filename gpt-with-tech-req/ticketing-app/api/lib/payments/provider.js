@@ -33,6 +33,7 @@
 //   }
 
 import prisma from '../db/client.js';
+import { invalidatePayment } from '../tickets/cache.js';
 import {
   isEnabled as stripeEnabled,
   getMode as stripeMode,
@@ -273,6 +274,8 @@ export async function refundPaymentById({ paymentId, amountCents }) {
       where: { id: paymentId },
       data: { status: PaymentStatus.REFUNDED, updated_at: new Date() }
     });
+    // Tickets bought with this payment may be voided along with it.
+    invalidatePayment(paymentId);
   }
 
   return { ok, refund: r };
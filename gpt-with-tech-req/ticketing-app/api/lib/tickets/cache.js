@@ -0,0 +1,113 @@
+// lib/tickets/cache.js
+// Bounded LRU + TTL cache of tickets for the scan path, keyed by id and qr_token.
+//
+// Busy gates re-scan the same QR codes over and over ("already used", revoked
+// passes). validate.js answers tickets cached in a terminal state (USED,
+// REVOKED, REFUNDED) without touching Postgres; everything else still goes to
+// the database, which stays the authority for the ISSUED -> USED transition.
+//
+// Anything that changes or deletes a ticket must call invalidateTicket()
+// (tickets/[id].js and admin/tickets/[id].js PATCH/DELETE, offline sync), and
+// refunds must call invalidatePayment().
+// The cache is per process, so TICKET_CACHE_TTL_MS also bounds how long
+// another instance's change can go unseen.
+//
+// Env: TICKET_CACHE_MAX (entries, default 10000; 0 disables),
+//      TICKET_CACHE_TTL_MS (default 60000).
+
+const intFromEnv = (name, def) => {
+  const n = parseInt(process.env[name] ?? '', 10);
+  return Number.isFinite(n) && n >= 0 ? n : def;
+};
+
+export const TERMINAL_STATUSES = new Set(['USED', 'REVOKED', 'REFUNDED']);
+
+export class TicketCache {
+  /**
+   * @param {{ max?: number, ttlMs?: number, now?: () => number }} [o]
+   */
+  constructor({ max = intFromEnv('TICKET_CACHE_MAX', 10000), ttlMs = intFromEnv('TICKET_CACHE_TTL_MS', 60000), now = Date.now } = {}) {
+    this.max = max;
+    this.ttlMs = ttlMs;
+    this.now = now;
+    this.byId = new Map(); // id -> { ticket, expires }; Map order is LRU order
+    this.idByToken = new Map();
+    this.stats = { hits: 0, misses: 0 };
+  }
+
+  get size() {
+    return this.byId.size;
+  }
+
+  /** Cached ticket by id, or undefined. */
+  get(id) {
+    const entry = id != null ? this.byId.get(id) : undefined;
+    if (!entry || entry.expires <= this.now()) {
+      if (entry) this.#remove(id);
+      this.stats.misses++;
+      return undefined;
+    }
+    // Refresh recency: re-inserting moves the key to the end.
+    this.byId.delete(id);
+    this.byId.set(id, entry);
+    this.stats.hits++;
+    return entry.ticket;
+  }
+
+  /** Cached ticket by qr_token, or undefined. */
+  getByToken(token) {
+    const id = this.idByToken.get(token);
+    if (id === undefined) {
+      this.stats.misses++;
+      return undefined;
+    }
+    return this.get(id);
+  }
+
+  /** Cache a ticket row (needs id; qr_token makes it reachable by token). */
+  set(ticket) {
+    if (!this.max || !ticket?.id) return;
+    this.#remove(ticket.id);
+    this.byId.set(ticket.id, { ticket, expires: this.now() + this.ttlMs });
+    if (ticket.qr_token) this.idByToken.set(ticket.qr_token, ticket.id);
+    while (this.byId.size > this.max) {
+      this.#remove(this.byId.keys().next().value);
+    }
+  }
+
+  /** Forget a ticket by id. */
+  invalidate(id) {
+    this.#remove(id);
+  }
+
+  /** Forget every cached ticket bought with a payment. */
+  invalidatePayment(paymentId) {
+    for (const [id, { ticket }] of this.byId) {
+      if (ticket.payment_id === paymentId) this.#remove(id);
+    }
+  }
+
+  clear() {
+    this.byId.clear();
+    this.idByToken.clear();
+  }
+
+  #remove(id) {
+    const entry = this.byId.get(id);
+    if (!entry) return;
+    this.byId.delete(id);
+    const token = entry.ticket.qr_token;
+    if (token && this.idByToken.get(token) === id) this.idByToken.delete(token);
+  }
+}
+
+// One cache per process, surviving dev hot reloads (like the Prisma client).
+export const ticketCache = (globalThis.__ticketCache ??= new TicketCache());
+
+export function invalidateTicket(id) {
+  ticketCache.invalidate(id);
+}
+
+export function invalidatePayment(paymentId) {
+  ticketCache.invalidatePayment(paymentId);
+}
@@ -0,0 +1,155 @@
+// lib/tickets/consume-sql.cjs
+// One-statement validate-and-consume for a scanned ticket.
+//
+// Lookup, the conditional ISSUED -> USED transition, the ticket_scans insert and
+// the result fetch run as a single data-modifying CTE, i.e. one round trip and
+// one implicit transaction instead of up to five queries.
+//
+// Shared (CommonJS) by lib/tickets/validate.js and scripts/bench-validate.cjs.
+// Run it with prisma.$queryRawUnsafe(CONSUME_SQL, ...consumeParams(p)): the
+// text is constant and every value is a bound parameter ($1..$7).
+//
+// BATCH_LOOKUP_SQL / BATCH_CONSUME_SQL serve validateAndConsumeMany(): a whole
+// batch of scans is looked up and consumed with one array parameter each.
+// SYNC_CONSUME_SQL does the same consume for offline-sync.js, where every
+// ticket gets its own used_at (the time it was scanned offline).
+
+/**
+ * Concurrency: the UPDATE only matches a row that is still ISSUED when it gets
+ * the row lock, so two gates scanning the same ticket can't both consume it.
+ * The loser still sees the ISSUED snapshot in `t`; a ticket that was ISSUED but
+ * not updated while consuming was taken by a concurrent scan -> ALREADY_USED.
+ *
+ * Timestamps: the columns are TIMESTAMP(3) holding UTC (Prisma's convention),
+ * so `now` is converted from timestamptz at UTC whatever the session TimeZone.
+ */
+const CONSUME_SQL = `
+WITH p AS (
+  SELECT $1::text    AS token,
+         $2::text    AS ticket_id,
+         $3::int     AS qr_version,
+         $4::boolean AS consume,
+         $5::text    AS scanned_by,
+         $6::text    AS user_agent,
+         $7::text    AS ip_address,
+         (now() AT TIME ZONE 'UTC')::timestamp(3) AS now
+),
+t AS (
+  SELECT tk.*
+  FROM tickets tk, p
+  WHERE (p.token IS NOT NULL AND tk.qr_token = p.token)
+     OR (p.token IS NULL AND tk.id = p.ticket_id)
+),
+consumed AS (
+  UPDATE tickets u
+  SET status = 'USED', used_at = p.now
+  FROM t, p
+  WHERE u.id = t.id
+    AND p.consume
+    AND u.status = 'ISSUED'
+    AND (u.expires_at IS NULL OR u.expires_at > p.now)
+    AND (p.qr_version IS NULL OR u.qr_version = p.qr_version)
+  RETURNING u.id, u.status, u.used_at
+),
+verdict AS (
+  SELECT t.id,
+         CASE
+           WHEN c.id IS NOT NULL THEN 'VALIDATED'
+           WHEN p.qr_version IS NOT NULL AND t.qr_version <> p.qr_version THEN 'INVALID'
+           WHEN t.expires_at IS NOT NULL AND t.expires_at <= p.now THEN 'EXPIRED'
+           WHEN t.status IN ('REVOKED', 'REFUNDED') THEN 'REVOKED'
+           WHEN t.status = 'USED' THEN 'ALREADY_USED'
+           WHEN t.status = 'ISSUED' AND NOT p.consume THEN 'VALIDATED'
+           WHEN t.status = 'ISSUED' THEN 'ALREADY_USED'
+           ELSE 'INVALID'
+         END AS result,
+         COALESCE(c.status, t.status) AS status,
+         COALESCE(c.used_at, t.used_at) AS used_at
+  FROM t
+  CROSS JOIN p
+  LEFT JOIN consumed c ON c.id = t.id
+),
+scan AS (
+  INSERT INTO ticket_scans (id, ticket_id, scanned_by_user_id, result, user_agent, ip_address, scanned_at)
+  SELECT gen_random_uuid()::text, v.id, p.scanned_by, v.result::"ScanResult", p.user_agent, p.ip_address, p.now
+  FROM verdict v, p
+  RETURNING id
+)
+SELECT v.result,
+       t.id, t.serial, v.status::text AS status, t.issued_at, v.used_at, t.expires_at,
+       t.qr_version, t.ticket_type_id, t.user_id, t.purchaser_name,
+       t.qr_token, t.payment_id, tt.event_id
+FROM verdict v
+JOIN t ON t.id = v.id
+LEFT JOIN ticket_types tt ON tt.id = t.ticket_type_id
+`;
+
+/**
+ * Positional parameters for CONSUME_SQL.
+ * Exactly one of token (opaque QR) or ticketId (JWT `sub`) should be set;
+ * version is only checked when given.
+ */
+function consumeParams({ token = null, ticketId = null, version = null, consume = true, scannedByUserId, userAgent, ip }) {
+  return [
+    token,
+    ticketId,
+    Number.isFinite(version) ? version : null,
+    Boolean(consume),
+    scannedByUserId,
+    userAgent || null,
+    ip || null
+  ];
+}
+
+/**
+ * Tickets for a batch of scans: $1 = opaque qr_tokens, $2 = ticket ids (JWT `sub`).
+ * Rows are locked so the batch's verdicts hold until BATCH_CONSUME_SQL commits.
+ * The locking subquery takes the locks in id order, so two batches sharing
+ * tickets queue behind each other instead of deadlocking.
+ */
+const BATCH_LOOKUP_SQL = `
+SELECT tk.id, tk.serial, tk.status::text AS status, tk.issued_at, tk.used_at, tk.expires_at,
+       tk.qr_version, tk.ticket_type_id, tk.user_id, tk.purchaser_name,
+       tk.qr_token, tk.payment_id, tt.event_id
+FROM (
+  SELECT *
+  FROM tickets
+  WHERE qr_token = ANY($1::text[]) OR id = ANY($2::text[])
+  ORDER BY id
+  FOR UPDATE
+) tk
+LEFT JOIN ticket_types tt ON tt.id = tk.ticket_type_id
+`;
+
+/** ISSUED -> USED for $1 = ticket ids; returns the ids actually consumed. */
+const BATCH_CONSUME_SQL = `
+UPDATE tickets
+SET status = 'USED', used_at = (now() AT TIME ZONE 'UTC')::timestamp(3)
+WHERE id = ANY($1::text[])
+  AND status = 'ISSUED'
+  AND (expires_at IS NULL OR expires_at > (now() AT TIME ZONE 'UTC')::timestamp(3))
+RETURNING id, used_at
+`;
+
+/**
+ * ISSUED -> USED for $1 = ticket ids with $2 = their used_at (ISO timestamps);
+ * returns the ids actually consumed. Locks are taken in id order, like
+ * BATCH_LOOKUP_SQL, and a row no longer ISSUED once locked is skipped.
+ */
+const SYNC_CONSUME_SQL = `
+WITH claim AS (
+  SELECT id
+  FROM tickets
+  WHERE id = ANY($1::text[]) AND status = 'ISSUED'
+  ORDER BY id
+  FOR UPDATE
+)
+UPDATE tickets t
+SET status = 'USED', used_at = (v.used_at AT TIME ZONE 'UTC')::timestamp(3)
+FROM claim
+JOIN unnest($1::text[], $2::timestamptz[]) AS v(id, used_at) ON v.id = claim.id
+WHERE t.id = claim.id
+RETURNING t.id, t.used_at
+`;
+
+module.exports = { CONSUME_SQL, consumeParams, BATCH_LOOKUP_SQL, BATCH_CONSUME_SQL, SYNC_CONSUME_SQL };
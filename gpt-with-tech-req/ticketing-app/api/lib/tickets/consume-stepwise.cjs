@@ -0,0 +1,86 @@
+// lib/tickets/consume-stepwise.cjs
+// The step-by-step Prisma consume path (SCAN_FAST_PATH=false): lookup, guards,
+// then a transaction with a conditional ISSUED -> USED update and the scan row.
+//
+// Shared (CommonJS) by lib/tickets/validate.js and scripts/bench-validate.cjs,
+// so the benchmark measures the same code the fallback runs. Every function
+// takes the Prisma client (or transaction) as its first argument.
+
+const WITH_EVENT = { ticket_type: { select: { event_id: true } } };
+
+/**
+ * Ticket for a normalized QR payload (see normalizeFromQrText), or null.
+ * @param {import('@prisma/client').PrismaClient} db
+ */
+async function findTicketForScan(db, norm) {
+  if (norm.kind === 'opaque' && norm.token) {
+    return db.ticket.findFirst({ where: { qr_token: norm.token }, include: WITH_EVENT });
+  }
+  if (norm.kind === 'jwt' && norm.decoded?.sub) {
+    return db.ticket.findUnique({ where: { id: String(norm.decoded.sub) }, include: WITH_EVENT });
+  }
+  return null;
+}
+
+/**
+ * ScanResult for a ticket that can't be consumed, or null if it is ISSUED and valid.
+ * Checks run in the same order as the SQL fast path.
+ */
+function scanResultFor(ticket, norm, now) {
+  if (norm.kind === 'jwt' && Number.isFinite(norm.version) && ticket.qr_version !== norm.version) return 'INVALID';
+  if (ticket.expires_at && new Date(ticket.expires_at) <= now) return 'EXPIRED';
+  if (ticket.status === 'REVOKED' || ticket.status === 'REFUNDED') return 'REVOKED';
+  if (ticket.status === 'USED') return 'ALREADY_USED';
+  if (ticket.status !== 'ISSUED') return 'INVALID';
+  return null;
+}
+
+function mapStatusToScanResult(status) {
+  switch (status) {
+    case 'REVOKED':
+    case 'REFUNDED':
+      return 'REVOKED';
+    case 'USED':
+      return 'ALREADY_USED';
+    default:
+      return 'INVALID';
+  }
+}
+
+/**
+ * Atomically consume a ticket that passed scanResultFor and log the scan.
+ * Resolves to { ok: true, used } when this call made it USED, otherwise to
+ * { ok: false, current } with the row as it is now (e.g. a concurrent scan won).
+ * @param {import('@prisma/client').PrismaClient} db
+ */
+function consumeTicket(db, ticket, { scannedByUserId, userAgent, ip, now }) {
+  const scanRow = (result) => ({
+    ticket_id: ticket.id,
+    scanned_by_user_id: scannedByUserId,
+    result,
+    user_agent: userAgent || null,
+    ip_address: ip || null,
+    scanned_at: now
+  });
+
+  return db.$transaction(async (tx) => {
+    const { count } = await tx.ticket.updateMany({
+      where: { id: ticket.id, status: 'ISSUED' },
+      data: { status: 'USED', used_at: now }
+    });
+
+    if (count === 1) {
+      const used = await tx.ticket.findUnique({ where: { id: ticket.id }, include: WITH_EVENT });
+      await tx.ticketScan.create({ data: scanRow('VALIDATED') });
+      return { ok: true, used };
+    }
+
+    const current = await tx.ticket.findUnique({ where: { id: ticket.id }, include: WITH_EVENT });
+    await tx.ticketScan.create({
+      data: scanRow(current?.status === 'USED' ? 'ALREADY_USED' : mapStatusToScanResult(current?.status))
+    });
+    return { ok: false, current };
+  });
+}
+
+module.exports = { findTicketForScan, scanResultFor, consumeTicket };
@@ -0,0 +1,164 @@
+// lib/tickets/manifest.js
+// Signed per-event ticket manifests for offline checkers.
+//
+// A manifest lets a scanner validate tickets with no network: for every ticket
+// of the event it holds a salted, truncated SHA-256 of the QR data (never the
+// token itself) with the ticket's status, qr_version and expiry.
+//
+//   { v: 1, event_id, generated_at, salt, kid,
+//     tickets: [[hash, status, qr_version, expires_at_epoch_s | 0], ...] }
+//
+// status is one letter: I(ssued) U(sed) R(evoked) F (refunded).
+// hash = base64url(sha256(`${salt}:${qrData}`)).slice(0, 22), where qrData is
+// the part after "TKT:<version>:" in the QR text (= tickets.qr_token).
+//
+// The JSON text is signed with ECDSA P-256 / SHA-256 (IEEE P1363 signature,
+// the format WebCrypto verifies). Every API instance must sign with the same
+// key, and it must outlive restarts, or devices can't verify what they hold:
+//  - MANIFEST_SIGNING_KEY: PKCS#8 PEM EC P-256 private key. Required when
+//    NODE_ENV=production; /api/readyz reports not ready without it.
+//  - otherwise (development) a key is generated once and kept in
+//    MANIFEST_KEY_FILE (default .manifest-signing-key.pem), which local
+//    instances and restarts share.
+//
+// Each manifest also comes with an issue stamp, `${generated_at ms}.${sig}`
+// (signature over "manifest-issued:<event_id>:<ms>"), which checkers upload
+// with their offline scans: it tells the server, unforgeably, the earliest time
+// those scans can have been made (see offline-sync.js).
+
+import crypto from 'crypto';
+import fs from 'fs';
+import prisma from '../db/client.js';
+
+export const MANIFEST_VERSION = 1;
+const HASH_CHARS = 22; // 132 bits of the digest
+
+const STATUS_CODES = { ISSUED: 'I', USED: 'U', REVOKED: 'R', REFUNDED: 'F' };
+
+/** Why manifests can't be signed in this process, or null. */
+export function signingKeyProblem() {
+  if (process.env.MANIFEST_SIGNING_KEY || process.env.NODE_ENV !== 'production') return null;
+  return 'MANIFEST_SIGNING_KEY is not set';
+}
+
+function loadSigningKey() {
+  const pem = process.env.MANIFEST_SIGNING_KEY;
+  if (pem) {
+    return crypto.createPrivateKey(pem.replace(/\\n/g, '\n'));
+  }
+  const problem = signingKeyProblem();
+  if (problem) throw new Error(`Cannot sign offline manifests: ${problem}`);
+  return devSigningKey(process.env.MANIFEST_KEY_FILE || '.manifest-signing-key.pem');
+}
+
+/** Development key, created on first use and shared through a file. */
+function devSigningKey(file) {
+  try {
+    return crypto.createPrivateKey(fs.readFileSync(file, 'utf8'));
+  } catch (e) {
+    if (e.code !== 'ENOENT') throw e;
+  }
+  const { privateKey } = crypto.generateKeyPairSync('ec', { namedCurve: 'P-256' });
+  // Write aside, then link into place: the file appears complete or not at
+  // all, and if another instance got there first we use its key.
+  const tmp = `${file}.${process.pid}.tmp`;
+  fs.writeFileSync(tmp, privateKey.export({ type: 'pkcs8', format: 'pem' }), { mode: 0o600 });
+  try {
+    fs.linkSync(tmp, file);
+    console.warn(`⚠️  MANIFEST_SIGNING_KEY is not set; generated a development manifest key in ${file}.`);
+    return privateKey;
+  } catch (e) {
+    if (e.code !== 'EEXIST') throw e;
+    return crypto.createPrivateKey(fs.readFileSync(file, 'utf8'));
+  } finally {
+    fs.rmSync(tmp, { force: true });
+  }
+}
+
+function signingKey() {
+  if (!globalThis.__manifestKey) {
+    const privateKey = loadSigningKey();
+    const jwk = crypto.createPublicKey(privateKey).export({ format: 'jwk' });
+    const kid = crypto.createHash('sha256').update(`${jwk.x}.${jwk.y}`).digest('base64url').slice(0, 16);
+    globalThis.__manifestKey = {
+      privateKey,
+      publicKey: crypto.createPublicKey(privateKey),
+      publicJwk: { ...jwk, kid, alg: 'ES256', use: 'sig' },
+      kid
+    };
+  }
+  return globalThis.__manifestKey;
+}
+
+/** Public JWK (with kid) that checkers use to verify manifests. */
+export function manifestPublicKey() {
+  return signingKey().publicJwk;
+}
+
+function stampMessage(eventId, issuedMs) {
+  return Buffer.from(`manifest-issued:${eventId}:${issuedMs}`);
+}
+
+function issueStamp(privateKey, eventId, issuedMs) {
+  const sig = crypto.sign('sha256', stampMessage(eventId, issuedMs), { key: privateKey, dsaEncoding: 'ieee-p1363' });
+  return `${issuedMs}.${sig.toString('base64url')}`;
+}
+
+/**
+ * When the manifest behind an issue stamp was generated for eventId.
+ * @returns {Date | null} null if the stamp is malformed, for another event or not signed by this key
+ */
+export function manifestIssuedAt(eventId, stamp) {
+  const m = /^(\d{1,15})\.([\w-]+)$/.exec(typeof stamp === 'string' ? stamp : '');
+  if (!m) return null;
+  const ok = crypto.verify(
+    'sha256',
+    stampMessage(eventId, m[1]),
+    { key: signingKey().publicKey, dsaEncoding: 'ieee-p1363' },
+    Buffer.from(m[2], 'base64url')
+  );
+  return ok ? new Date(Number(m[1])) : null;
+}
+
+/** Salted, truncated hash of a ticket's QR data, as stored in manifests. */
+export function hashQrData(salt, qrData) {
+  return crypto.createHash('sha256').update(`${salt}:${qrData}`).digest('base64url').slice(0, HASH_CHARS);
+}
+
+/**
+ * Build and sign the manifest for one event.
+ * @param {string} eventId
+ * @returns {Promise<{ manifest: string, signature: string, kid: string, count: number, stamp: string } | null>} null if no such event
+ */
+export async function buildManifest(eventId) {
+  const event = await prisma.event.findUnique({ where: { id: eventId }, select: { id: true } });
+  if (!event) return null;
+
+  const rows = await prisma.ticket.findMany({
+    where: { ticket_type: { event_id: eventId } },
+    select: { qr_token: true, status: true, qr_version: true, expires_at: true }
+  });
+
+  const { privateKey, kid } = signingKey();
+  const salt = crypto.randomBytes(16).toString('base64url');
+  const generatedAt = new Date();
+  const manifest = JSON.stringify({
+    v: MANIFEST_VERSION,
+    event_id: eventId,
+    generated_at: generatedAt.toISOString(),
+    salt,
+    kid,
+    tickets: rows.map((t) => [
+      hashQrData(salt, t.qr_token),
+      STATUS_CODES[t.status] || 'R',
+      t.qr_version,
+      t.expires_at ? Math.floor(t.expires_at.getTime() / 1000) : 0
+    ])
+  });
+  const signature = crypto
+    .sign('sha256', Buffer.from(manifest), { key: privateKey, dsaEncoding: 'ieee-p1363' })
+    .toString('base64url');
+
+  // The manifest goes out as the exact signed text; clients verify, then JSON.parse it.
+  return { manifest, signature, kid, count: rows.length, stamp: issueStamp(privateKey, eventId, generatedAt.getTime()) };
+}
@@ -0,0 +1,223 @@
+// lib/tickets/offline-sync.js
+// Reconcile scans recorded by offline checkers (see manifest.js) with the database.
+//
+// A device that lost connectivity admits tickets from its signed manifest and
+// queues every scan; once back online it posts the queue here. Each scan is
+// judged against the database in scanned_at order:
+//  - accepted       first admission of an ISSUED ticket -> USED, used_at = scanned_at
+//  - double_use     admitted, but the ticket was already used (online, by another
+//                   device, or earlier in the same batch)
+//  - revoked / expired / invalid   admitted a ticket the server would have refused
+//  - rejected       the device refused the scan; logged only
+//  - already_synced the scan_id is already in ticket_scans (retried upload)
+// scan_id (a client-generated UUID) becomes the ticket_scans row id, which
+// makes re-posting the same queue idempotent.
+//
+// scanned_at comes from the device clock, so it is only trusted within the
+// window the scan can have happened in: from the issue of the manifest it was
+// checked against (its manifest_stamp) to the arrival of the upload. A time
+// outside the window is clamped into it and the result flagged `clamped`;
+// without a valid stamp the scan is judged at the arrival time. Audit rows
+// keep the judged time as scanned_at and the arrival as received_at.
+//
+// The whole batch is judged in memory, then the winning admissions are
+// consumed with one UPDATE (SYNC_CONSUME_SQL) and the audit rows written with
+// one INSERT, so the transaction is a few statements whatever the batch size.
+
+import prisma from '../db/client.js';
+import { looksLikeJwt, parseQrText } from '../qr/payload.js';
+import { invalidateTicket } from './cache.js';
+import { manifestIssuedAt } from './manifest.js';
+import { SYNC_CONSUME_SQL } from './consume-sql.cjs';
+
+export const MAX_SYNC_SCANS = 1000;
+
+export const SyncOutcome = /** @type {const} */ ({
+  ACCEPTED: 'accepted',
+  DOUBLE_USE: 'double_use',
+  REVOKED: 'revoked',
+  EXPIRED: 'expired',
+  INVALID: 'invalid',
+  REJECTED: 'rejected',
+  ALREADY_SYNCED: 'already_synced'
+});
+
+/** outcome -> ScanResult of the audit row */
+const RESULT_BY_OUTCOME = {
+  accepted: 'VALIDATED',
+  double_use: 'ALREADY_USED',
+  revoked: 'REVOKED',
+  expired: 'EXPIRED',
+  invalid: 'INVALID'
+};
+
+const UUID_RE = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+/**
+ * Check one uploaded scan; returns an error message or null.
+ * @param {any} s
+ */
+export function invalidScan(s) {
+  if (!s || typeof s !== 'object') return 'scan must be an object';
+  if (typeof s.scan_id !== 'string' || !UUID_RE.test(s.scan_id)) return 'scan_id must be a UUID';
+  if (typeof s.qr_text !== 'string' || !s.qr_text) return 'qr_text is required';
+  if (Number.isNaN(Date.parse(s.scanned_at))) return 'scanned_at must be an ISO timestamp';
+  if (typeof s.admitted !== 'boolean') return 'admitted must be a boolean';
+  if (s.manifest_stamp != null && typeof s.manifest_stamp !== 'string') return 'manifest_stamp must be a string';
+  return null;
+}
+
+function qrData(qrText) {
+  try {
+    return parseQrText(qrText);
+  } catch {
+    return null;
+  }
+}
+
+/** Outcome for a ticket the server would not admit at `at`, or null. */
+function refusal(ticket, parsed, at) {
+  if (looksLikeJwt(parsed.data) && ticket.qr_version !== parsed.version) return SyncOutcome.INVALID;
+  if (ticket.expires_at && ticket.expires_at <= at) return SyncOutcome.EXPIRED;
+  if (ticket.status === 'REVOKED' || ticket.status === 'REFUNDED') return SyncOutcome.REVOKED;
+  if (ticket.status === 'USED') return SyncOutcome.DOUBLE_USE;
+  if (ticket.status !== 'ISSUED') return SyncOutcome.INVALID;
+  return null;
+}
+
+/**
+ * Set s.outcome for each scan in order (null: the device refused a ticket the
+ * server would admit). With claim, the first admission of an admissible ticket
+ * claims it, and later scans see it as used.
+ * @returns {Map<string, any>} ticket id -> claiming scan
+ */
+function judge(scans, claim) {
+  const claims = new Map();
+  for (const s of scans) {
+    let outcome = refusal(s.ticket, s.parsed, s.at);
+    if (!outcome && s.admitted) {
+      if (claim) {
+        claims.set(s.ticket.id, s);
+        s.ticket.status = 'USED';
+        s.ticket.used_at = s.at;
+        outcome = SyncOutcome.ACCEPTED;
+      } else {
+        outcome = SyncOutcome.DOUBLE_USE;
+      }
+    }
+    s.outcome = outcome;
+  }
+  return claims;
+}
+
+/**
+ * Apply a batch of offline scans for one event.
+ *
+ * @param {Object} p
+ * @param {string} p.eventId
+ * @param {Array<{ scan_id: string, qr_text: string, scanned_at: string, admitted: boolean, manifest_stamp?: string }>} p.scans - pre-validated with invalidScan()
+ * @param {string} p.scannedByUserId
+ * @param {string} [p.userAgent]
+ * @param {string} [p.ip]
+ * @returns {Promise<{ results: Array<{ scan_id: string, outcome: string, ticket_id?: string, used_at?: Date|null, scanned_at?: Date, clamped?: true }>, summary: Record<string, number> }>}
+ */
+export async function syncOfflineScans({ eventId, scans, scannedByUserId, userAgent, ip }) {
+  const receivedAt = new Date();
+  const synced = await prisma.ticketScan.findMany({
+    where: { id: { in: scans.map((s) => s.scan_id) } },
+    select: { id: true }
+  });
+  const seen = new Set(synced.map((r) => r.id));
+
+  const issued = new Map(); // manifest_stamp -> Date | null
+  const fresh = [];
+  const results = new Map();
+  for (const s of scans) {
+    if (seen.has(s.scan_id)) {
+      results.set(s.scan_id, { scan_id: s.scan_id, outcome: SyncOutcome.ALREADY_SYNCED });
+      continue;
+    }
+    seen.add(s.scan_id); // a scan_id repeated within the batch counts once
+    if (!issued.has(s.manifest_stamp)) issued.set(s.manifest_stamp, manifestIssuedAt(eventId, s.manifest_stamp));
+    const from = issued.get(s.manifest_stamp) ?? receivedAt;
+    const claimed = new Date(s.scanned_at);
+    const at = new Date(Math.min(Math.max(claimed, Math.min(from, receivedAt)), receivedAt));
+    fresh.push({ ...s, at, clamped: at.getTime() !== claimed.getTime(), parsed: qrData(s.qr_text) });
+  }
+  fresh.sort((a, b) => a.at - b.at);
+
+  const tokens = [...new Set(fresh.filter((s) => s.parsed).map((s) => s.parsed.data))];
+  const tickets = tokens.length
+    ? await prisma.ticket.findMany({
+        where: { qr_token: { in: tokens }, ticket_type: { event_id: eventId } },
+        select: { id: true, qr_token: true, status: true, qr_version: true, used_at: true, expires_at: true }
+      })
+    : [];
+  const byToken = new Map(tickets.map((t) => [t.qr_token, t]));
+  for (const s of fresh) s.ticket = (s.parsed && byToken.get(s.parsed.data)) || null;
+  const known = fresh.filter((s) => s.ticket);
+
+  const claims = judge(known, true);
+  const touched = new Set();
+  await prisma.$transaction(async (tx) => {
+    if (claims.size) {
+      const ids = [...claims.keys()];
+      const consumed = await tx.$queryRawUnsafe(SYNC_CONSUME_SQL, ids, ids.map((id) => claims.get(id).at.toISOString()));
+      for (const row of consumed) {
+        claims.get(row.id).ticket.used_at = row.used_at;
+        touched.add(row.id);
+      }
+      const lost = ids.filter((id) => !touched.has(id));
+      if (lost.length) {
+        // Consumed or revoked concurrently since we read them: judge their
+        // scans again against the rows as they are now.
+        const current = await tx.ticket.findMany({ where: { id: { in: lost } }, select: { id: true, status: true, used_at: true } });
+        for (const row of current) Object.assign(claims.get(row.id).ticket, row);
+        const again = new Set(lost);
+        judge(known.filter((s) => again.has(s.ticket.id)), false);
+      }
+    }
+
+    if (known.length) {
+      await tx.ticketScan.createMany({
+        data: known.map((s) => ({
+          id: s.scan_id,
+          ticket_id: s.ticket.id,
+          scanned_by_user_id: scannedByUserId,
+          // A refused scan of a valid ticket means the device had already admitted it.
+          result: RESULT_BY_OUTCOME[s.outcome ?? SyncOutcome.DOUBLE_USE],
+          user_agent: userAgent || null,
+          ip_address: ip || null,
+          scanned_at: s.at,
+          received_at: receivedAt
+        })),
+        skipDuplicates: true
+      });
+    }
+  });
+
+  for (const id of touched) invalidateTicket(id);
+
+  for (const s of fresh) {
+    const result = s.ticket
+      ? {
+          scan_id: s.scan_id,
+          outcome: s.admitted ? s.outcome : SyncOutcome.REJECTED,
+          ticket_id: s.ticket.id,
+          used_at: s.ticket.used_at
+        }
+      : {
+          // No ticket of this event: nothing to attach an audit row to.
+          scan_id: s.scan_id,
+          outcome: s.admitted ? SyncOutcome.INVALID : SyncOutcome.REJECTED
+        };
+    result.scanned_at = s.at;
+    if (s.clamped) result.clamped = true;
+    results.set(s.scan_id, result);
+  }
+
+  const ordered = scans.map((s) => results.get(s.scan_id));
+  const summary = {};
+  for (const r of ordered) summary[r.outcome] = (summary[r.outcome] || 0) + 1;
+  return { results: ordered, summary };
+}
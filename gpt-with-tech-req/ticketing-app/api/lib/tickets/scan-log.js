@@ -0,0 +1,143 @@
+// lib/tickets/scan-log.js
+// In-process, batched writer for ticket_scans audit rows.
+//
+// Scan logging must not sit on the gate's latency path: enqueue() only buffers
+// the row, and a background flush writes batches with one createMany each.
+//  - Flushes when SCAN_LOG_BATCH rows are waiting, or SCAN_LOG_FLUSH_MS after
+//    the first row of a batch arrived, whichever comes first.
+//  - Backpressure: above SCAN_LOG_MAX_PENDING buffered rows, enqueue() returns
+//    a promise that resolves once a flush has made room, so a stalled database
+//    slows scans down instead of growing memory without bound.
+//  - Drains on shutdown (SIGTERM/SIGINT/beforeExit); drain() is also exported.
+// Rows are best-effort, as before: a failed batch is retried once, then dropped
+// with an error log.
+
+import prisma from '../db/client.js';
+
+const intFromEnv = (name, def) => Math.max(parseInt(process.env[name] || String(def), 10) || def, 1);
+
+export class ScanLogBuffer {
+  /**
+   * @param {Object} [o]
+   * @param {(rows: any[]) => Promise<any>} [o.write] - persists one batch
+   * @param {number} [o.maxBatch]   - rows per createMany
+   * @param {number} [o.flushMs]    - max time a row waits before its batch is flushed
+   * @param {number} [o.maxPending] - buffered rows above which enqueue() waits
+   */
+  constructor({
+    write = (rows) => prisma.ticketScan.createMany({ data: rows }),
+    maxBatch = intFromEnv('SCAN_LOG_BATCH', 200),
+    flushMs = intFromEnv('SCAN_LOG_FLUSH_MS', 250),
+    maxPending = intFromEnv('SCAN_LOG_MAX_PENDING', 10000)
+  } = {}) {
+    this.write = write;
+    this.maxBatch = maxBatch;
+    this.flushMs = flushMs;
+    this.maxPending = Math.max(maxPending, maxBatch);
+    this.rows = [];
+    this.timer = null;
+    this.flushing = null;
+    this.waiters = [];
+    this.stats = { written: 0, dropped: 0, batches: 0 };
+  }
+
+  get pending() {
+    return this.rows.length;
+  }
+
+  /**
+   * Buffer one row. Resolves immediately unless the buffer is over maxPending.
+   * @returns {Promise<void>}
+   */
+  enqueue(row) {
+    this.rows.push(row);
+    if (this.rows.length >= this.maxBatch) {
+      this.flush();
+    } else if (!this.timer) {
+      this.timer = setTimeout(() => this.flush(), this.flushMs);
+      this.timer.unref?.();
+    }
+    if (this.rows.length <= this.maxPending) return Promise.resolve();
+    return new Promise((resolve) => this.waiters.push(resolve));
+  }
+
+  /** Write everything buffered so far; concurrent calls share one flush loop. */
+  flush() {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    if (!this.flushing) {
+      this.flushing = this.#flushLoop().finally(() => {
+        this.flushing = null;
+        // Rows that arrived during the last write get their own timer.
+        if (this.rows.length && !this.timer) {
+          this.timer = setTimeout(() => this.flush(), this.flushMs);
+          this.timer.unref?.();
+        }
+      });
+    }
+    return this.flushing;
+  }
+
+  async #flushLoop() {
+    while (this.rows.length >= this.maxBatch || (this.rows.length && !this.timer)) {
+      const batch = this.rows.splice(0, this.maxBatch);
+      await this.#writeBatch(batch);
+      this.#release();
+    }
+  }
+
+  async #writeBatch(batch) {
+    for (let attempt = 1; attempt <= 2; attempt++) {
+      try {
+        await this.write(batch);
+        this.stats.written += batch.length;
+        this.stats.batches += 1;
+        return;
+      } catch (e) {
+        if (attempt === 2) {
+          this.stats.dropped += batch.length;
+          console.error(`❌ Dropped ${batch.length} scan log rows: ${e?.message || e}`);
+        }
+      }
+    }
+  }
+
+  #release() {
+    while (this.waiters.length && this.rows.length <= this.maxPending) {
+      this.waiters.shift()();
+    }
+  }
+
+  /** Flush until the buffer is empty (shutdown, tests). */
+  async drain() {
+    while (this.rows.length || this.flushing) {
+      await this.flush();
+    }
+    this.#release();
+  }
+}
+
+// One buffer per process, surviving dev hot reloads (like the Prisma client).
+export const scanLog = (globalThis.__scanLog ??= new ScanLogBuffer());
+
+export function drain() {
+  return scanLog.drain();
+}
+
+// Drain before the process goes away. Signals are re-raised once drained so
+// the default (or Next's own) handling still runs.
+function hookShutdown() {
+  if (globalThis.__scanLogHooked || typeof process === 'undefined' || !process.once) return;
+  globalThis.__scanLogHooked = true;
+  process.once('beforeExit', () => scanLog.drain());
+  for (const sig of ['SIGTERM', 'SIGINT']) {
+    const onSignal = async () => {
+      await scanLog.drain().catch(() => {});
+      if (process.listenerCount(sig) === 0) process.kill(process.pid, sig);
+    };
+    process.once(sig, onSignal);
+  }
+}
+hookShutdown();
@@ -2,9 +2,28 @@
 // Validate (and optionally consume) a ticket QR, with atomic state transition and scan logging.
 // Returns one of: 'valid_unused' | 'already_used' | 'invalid' | 'expired' | 'revoked'.
 // On first valid scan, transitions ISSUED -> USED (terminal).
+//
+// The default path does lookup, transition, scan log and result fetch in one
+// SQL statement (see consume-sql.cjs). SCAN_FAST_PATH=false switches back to
+// the step-by-step Prisma queries (see consume-stepwise.cjs).
 
 import prisma from '../db/client.js';
 import { normalizeFromQrText } from '../qr/payload.js';
+import { BATCH_CONSUME_SQL, BATCH_LOOKUP_SQL, CONSUME_SQL, consumeParams } from './consume-sql.cjs';
+import { consumeTicket, findTicketForScan, scanResultFor } from './consume-stepwise.cjs';
+import { scanLog } from './scan-log.js';
+import { TERMINAL_STATUSES, ticketCache } from './cache.js';
+
+const FAST_PATH = process.env.SCAN_FAST_PATH !== 'false';
+
+/** SQL verdict (ScanResult) -> API status */
+const STATUS_BY_RESULT = {
+  VALIDATED: 'valid_unused',
+  ALREADY_USED: 'already_used',
+  INVALID: 'invalid',
+  EXPIRED: 'expired',
+  REVOKED: 'revoked'
+};
 
 /** Response status union */
 export const ValidationStatus = /** @type {const} */ ({
@@ -44,9 +63,10 @@ function toTicketPayload(t) {
  * @param {string} [p.userAgent]
  * @param {string} [p.ip]
  * @param {boolean} [p.consume=true]
+ * @param {boolean} [p.fastPath] - one-statement consume (default: unless SCAN_FAST_PATH=false)
  * @returns {Promise<{ status: typeof ValidationStatus[keyof typeof ValidationStatus], ticket?: any }>}
  */
-export async function validateAndConsume({ qrText, scannedByUserId, userAgent, ip, consume = true }) {
+export async function validateAndConsume({ qrText, scannedByUserId, userAgent, ip, consume = true, fastPath = FAST_PATH }) {
   if (!qrText || typeof qrText !== 'string') {
     return { status: ValidationStatus.INVALID };
   }
@@ -63,104 +83,47 @@ export async function validateAndConsume({ qrText, scannedByUserId, userAgent, i
     return { status: ValidationStatus.INVALID };
   }
 
-  // 2) Locate ticket
-  let ticket = null;
-  if (norm.kind === 'opaque' && norm.token) {
-    ticket = await prisma.ticket.findFirst({
-      where: { qr_token: norm.token },
-      include: { ticket_type: { select: { event_id: true } } }
-    });
-  } else if (norm.kind === 'jwt' && norm.decoded?.sub) {
-    ticket = await prisma.ticket.findUnique({
-      where: { id: String(norm.decoded.sub) },
-      include: { ticket_type: { select: { event_id: true } } }
-    });
-    if (ticket && Number.isFinite(norm.version) && ticket.qr_version !== norm.version) {
-      await logScan(ticket.id, scannedByUserId, 'INVALID', userAgent, ip);
-      return { status: ValidationStatus.INVALID };
-    }
-  }
-
-  if (!ticket) {
-    await logScan(null, scannedByUserId, 'INVALID', userAgent, ip);
-    return { status: ValidationStatus.INVALID };
-  }
-
-  // 3) Expiry & status guards
+  // 2) A ticket cached in a terminal state is answered without Postgres
   const now = new Date();
-  if (ticket.expires_at && ticket.expires_at <= now) {
-    await logScan(ticket.id, scannedByUserId, 'EXPIRED', userAgent, ip);
-    return { status: ValidationStatus.EXPIRED, ticket: toTicketPayload(ticket) };
+  const cached = cachedTerminal(norm);
+  if (cached) {
+    const result = scanResultFor(cached, norm, now);
+    await logScan(cached.id, scannedByUserId, result, userAgent, ip);
+    return toResponse(result, cached);
   }
 
-  if (ticket.status === 'REVOKED' || ticket.status === 'REFUNDED') {
-    await logScan(ticket.id, scannedByUserId, 'REVOKED', userAgent, ip);
-    return { status: ValidationStatus.REVOKED, ticket: toTicketPayload(ticket) };
+  if (fastPath) {
+    return consumeInOneStatement(norm, { scannedByUserId, userAgent, ip, consume });
   }
 
-  if (ticket.status === 'USED') {
-    await logScan(ticket.id, scannedByUserId, 'ALREADY_USED', userAgent, ip);
-    return { status: ValidationStatus.ALREADY_USED, ticket: toTicketPayload(ticket) };
-  }
+  // 3) Locate ticket
+  const ticket = await findTicketForScan(prisma, norm);
 
-  if (ticket.status !== 'ISSUED') {
-    await logScan(ticket.id, scannedByUserId, 'INVALID', userAgent, ip);
+  if (!ticket) {
+    await logScan(null, scannedByUserId, 'INVALID', userAgent, ip);
     return { status: ValidationStatus.INVALID };
   }
+  ticketCache.set(ticket);
+
+  // Version, expiry & status guards
+  const verdict = scanResultFor(ticket, norm, now);
+  if (verdict) {
+    await logScan(ticket.id, scannedByUserId, verdict, userAgent, ip);
+    return toResponse(verdict, ticket);
+  }
 
   // 4) Atomic consume
   if (consume) {
-    const result = await prisma.$transaction(async (tx) => {
-      const updatedCount = await tx.ticket.updateMany({
-        where: { id: ticket.id, status: 'ISSUED' },
-        data: { status: 'USED', used_at: now }
-      });
-
-      if (updatedCount === 1) {
-        const used = await tx.ticket.findUnique({
-          where: { id: ticket.id },
-          include: { ticket_type: { select: { event_id: true } } }
-        });
-
-        await tx.ticketScan.create({
-          data: {
-            ticket_id: ticket.id,
-            scanned_by_user_id: scannedByUserId,
-            result: 'VALIDATED',
-            user_agent: userAgent || null,
-            ip_address: ip || null,
-            scanned_at: now
-          }
-        });
-
-        return { ok: true, used };
-      }
-
-      const current = await tx.ticket.findUnique({
-        where: { id: ticket.id },
-        include: { ticket_type: { select: { event_id: true } } }
-      });
-
-      await tx.ticketScan.create({
-        data: {
-          ticket_id: ticket.id,
-          scanned_by_user_id: scannedByUserId,
-          result: current?.status === 'USED' ? 'ALREADY_USED' : mapStatusToScanResult(current?.status),
-          user_agent: userAgent || null,
-          ip_address: ip || null,
-          scanned_at: now
-        }
-      });
-
-      return { ok: false, current };
-    });
+    const result = await consumeTicket(prisma, ticket, { scannedByUserId, userAgent, ip, now });
 
     if (result.ok) {
+      ticketCache.set(result.used);
       return { status: ValidationStatus.VALID_UNUSED, ticket: toTicketPayload(result.used) };
     }
 
     const cur = result.current;
     if (!cur) return { status: ValidationStatus.INVALID };
+    ticketCache.set(cur);
     if (cur.status === 'USED') return { status: ValidationStatus.ALREADY_USED, ticket: toTicketPayload(cur) };
     if (cur.expires_at && cur.expires_at <= now) return { status: ValidationStatus.EXPIRED, ticket: toTicketPayload(cur) };
     if (cur.status === 'REVOKED' || cur.status === 'REFUNDED') return { status: ValidationStatus.REVOKED, ticket: toTicketPayload(cur) };
@@ -173,34 +136,176 @@ export async function validateAndConsume({ qrText, scannedByUserId, userAgent, i
 }
 
 /**
- * Create a TicketScan row (best-effort).
+ * Validate and optionally consume a batch of scanned QR texts (turnstile
+ * controllers). Each item gets the status validateAndConsume would give it if
+ * the QR texts were scanned one after another in array order, so a QR repeated
+ * within the batch is valid_unused once and already_used after that.
+ *
+ * The tickets are looked up with one array query and consumed with one UPDATE,
+ * together with their scan rows, in a single transaction.
+ *
+ * @param {Object} p
+ * @param {string[]} p.qrTexts
+ * @param {string} p.scannedByUserId
+ * @param {string} [p.userAgent]
+ * @param {string} [p.ip]
+ * @param {boolean} [p.consume=true]
+ * @returns {Promise<Array<{ status: typeof ValidationStatus[keyof typeof ValidationStatus], ticket?: any }>>} one result per QR text, in order
  */
-async function logScan(ticketId, scannedByUserId, result, userAgent, ip) {
-  try {
-    if (!scannedByUserId || !ticketId) return;
-    await prisma.ticketScan.create({
-      data: {
-        ticket_id: ticketId,
+export async function validateAndConsumeMany({ qrTexts, scannedByUserId, userAgent, ip, consume = true }) {
+  if (!scannedByUserId) {
+    throw new Error('scannedByUserId is required');
+  }
+
+  const now = new Date();
+  const results = new Array(qrTexts.length);
+  const pending = []; // { i, norm, ticket?, result? } still needing the database
+
+  for (let i = 0; i < qrTexts.length; i++) {
+    let norm = null;
+    try {
+      if (qrTexts[i] && typeof qrTexts[i] === 'string') norm = normalizeFromQrText(qrTexts[i]);
+    } catch {
+      // invalid or expired JWT
+    }
+    if (!norm || !(norm.kind === 'opaque' ? norm.token : norm.decoded?.sub)) {
+      results[i] = { status: ValidationStatus.INVALID };
+      continue;
+    }
+    const cached = cachedTerminal(norm);
+    if (cached) {
+      const result = scanResultFor(cached, norm, now);
+      await logScan(cached.id, scannedByUserId, result, userAgent, ip);
+      results[i] = toResponse(result, cached);
+      continue;
+    }
+    pending.push({ i, norm });
+  }
+  if (!pending.length) return results;
+
+  const tokens = new Set();
+  const ids = new Set();
+  for (const { norm } of pending) {
+    if (norm.kind === 'opaque') tokens.add(norm.token);
+    else ids.add(String(norm.decoded.sub));
+  }
+
+  await prisma.$transaction(async (tx) => {
+    const rows = await tx.$queryRawUnsafe(BATCH_LOOKUP_SQL, [...tokens], [...ids]);
+    const byToken = new Map();
+    const byId = new Map();
+    for (const row of rows) {
+      const ticket = { ...row, ticket_type: { event_id: row.event_id } };
+      byId.set(ticket.id, ticket);
+      byToken.set(ticket.qr_token, ticket);
+    }
+
+    // Verdicts in scan order; the first valid scan of a ticket claims it.
+    const claims = new Map();
+    for (const scan of pending) {
+      const ticket = scan.norm.kind === 'opaque' ? byToken.get(scan.norm.token) : byId.get(String(scan.norm.decoded.sub));
+      if (!ticket) continue;
+      scan.ticket = ticket;
+      scan.result = scanResultFor(ticket, scan.norm, now) || (consume && claims.has(ticket.id) ? 'ALREADY_USED' : 'VALIDATED');
+      if (consume && scan.result === 'VALIDATED') claims.set(ticket.id, scan);
+    }
+
+    if (claims.size) {
+      const consumed = await tx.$queryRawUnsafe(BATCH_CONSUME_SQL, [...claims.keys()]);
+      const usedAt = new Map(consumed.map((r) => [r.id, r.used_at]));
+      for (const [id, scan] of claims) {
+        if (usedAt.has(id)) {
+          scan.ticket.status = 'USED';
+          scan.ticket.used_at = usedAt.get(id);
+        } else {
+          // The rows are locked, so only the clock can have moved past expires_at.
+          scan.result = 'EXPIRED';
+        }
+      }
+    }
+
+    const scanRows = pending
+      .filter((scan) => scan.ticket)
+      .map((scan) => ({
+        ticket_id: scan.ticket.id,
         scanned_by_user_id: scannedByUserId,
-        result,
+        result: scan.result,
         user_agent: userAgent || null,
         ip_address: ip || null,
-        scanned_at: new Date()
-      }
-    });
-  } catch {
-    // swallow; logging must not block validation
+        scanned_at: now
+      }));
+    if (scanRows.length) await tx.ticketScan.createMany({ data: scanRows });
+  });
+
+  for (const scan of pending) {
+    if (!scan.ticket) {
+      results[scan.i] = { status: ValidationStatus.INVALID };
+      continue;
+    }
+    ticketCache.set(scan.ticket);
+    results[scan.i] = toResponse(scan.result, scan.ticket);
   }
+  return results;
 }
 
-function mapStatusToScanResult(status) {
-  switch (status) {
-    case 'REVOKED':
-    case 'REFUNDED':
-      return 'REVOKED';
-    case 'USED':
-      return 'ALREADY_USED';
-    default:
-      return 'INVALID';
-  }
+/**
+ * Fast path: a single round trip for lookup, ISSUED -> USED, scan log and result.
+ * Same statuses as the step-by-step path; an unknown ticket is not logged.
+ */
+async function consumeInOneStatement(norm, { scannedByUserId, userAgent, ip, consume }) {
+  const lookup =
+    norm.kind === 'opaque' && norm.token
+      ? { token: norm.token }
+      : norm.kind === 'jwt' && norm.decoded?.sub
+        ? { ticketId: String(norm.decoded.sub), version: norm.version }
+        : null;
+  if (!lookup) return { status: ValidationStatus.INVALID };
+
+  const rows = await prisma.$queryRawUnsafe(
+    CONSUME_SQL,
+    ...consumeParams({ ...lookup, consume, scannedByUserId, userAgent, ip })
+  );
+  const row = rows[0];
+  if (!row) return { status: ValidationStatus.INVALID };
+
+  const ticket = { ...row, ticket_type: { event_id: row.event_id } };
+  ticketCache.set(ticket);
+  return toResponse(row.result, ticket);
+}
+
+/**
+ * The cached ticket for a scan, if it is in a terminal state (those can only
+ * change through paths that invalidate the cache).
+ */
+function cachedTerminal(norm) {
+  const hit =
+    norm.kind === 'opaque' && norm.token
+      ? ticketCache.getByToken(norm.token)
+      : norm.kind === 'jwt' && norm.decoded?.sub
+        ? ticketCache.get(String(norm.decoded.sub))
+        : undefined;
+  return hit && TERMINAL_STATUSES.has(hit.status) ? hit : null;
+}
+
+/** API response for a ScanResult; a bare INVALID carries no ticket details. */
+function toResponse(result, ticket) {
+  const status = STATUS_BY_RESULT[result] || ValidationStatus.INVALID;
+  if (status === ValidationStatus.INVALID) return { status };
+  return { status, ticket: toTicketPayload(ticket) };
+}
+
+/**
+ * Queue a TicketScan row (best-effort). Rows are written in batches by
+ * scan-log.js; awaiting this only waits when that buffer is full.
+ */
+async function logScan(ticketId, scannedByUserId, result, userAgent, ip) {
+  if (!scannedByUserId || !ticketId) return;
+  await scanLog.enqueue({
+    ticket_id: ticketId,
+    scanned_by_user_id: scannedByUserId,
+    result,
+    user_agent: userAgent || null,
+    ip_address: ip || null,
+    scanned_at: new Date()
+  });
 }
@@ -19,6 +19,13 @@ const nextConfig = {
   // Output directory
   output: 'standalone',
 
+  // A page file can't be named validate:batch; serve it from validate-batch.js.
+  async rewrites() {
+    return [
+      { source: '/api/checker/validate\\:batch', destination: '/api/checker/validate-batch' },
+    ];
+  },
+
   async headers() {
     return [
       {
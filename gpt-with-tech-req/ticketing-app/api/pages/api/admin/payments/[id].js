@@ -3,6 +3,7 @@
 import prisma from '../../../../lib/db/client.js';
 import { verifyToken } from '../../../../lib/auth/jwt.js';
 import { refundPayment } from '../../../../lib/payments/provider.js';
+import { invalidatePayment } from '../../../../lib/tickets/cache.js';
 
 /**
  * @openapi
@@ -115,6 +116,7 @@ export default async function handler(req, res) {
         where: { id },
         data: { status: 'REFUNDED', refunded_at: new Date() }
       });
+      invalidatePayment(id);
       return res.json({ refunded: true, payment: updated, refundResult });
     } catch (err) {
       console.error('Refund failed:', err);
@@ -1,7 +1,8 @@
 // pages/api/admin/tickets/[id].js
 
-import prisma from '../../../../../lib/db/client.js';
-import { verifyToken } from '../../../../../lib/auth/jwt.js';
+import prisma from '../../../../lib/db/client.js';
+import { verifyToken } from '../../../../lib/auth/jwt.js';
+import { invalidateTicket } from '../../../../lib/tickets/cache.js';
 
 /**
  * @openapi
@@ -141,6 +142,8 @@ export default async function handler(req, res) {
         ticket_type: { select: { id: true, name: true } }
       }
     });
+    // Status (or anything else) changed: scanners must not answer from a stale copy.
+    invalidateTicket(id);
 
     await prisma.audit_logs.create({
       data: {
@@ -162,6 +165,7 @@ export default async function handler(req, res) {
     }
 
     await prisma.ticket.delete({ where: { id } });
+    invalidateTicket(id);
     await prisma.audit_logs.create({
       data: {
         actor_user_id: me.id,
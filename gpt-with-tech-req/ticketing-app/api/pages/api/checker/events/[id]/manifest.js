@@ -0,0 +1,84 @@
+// pages/api/checker/events/[id]/manifest.js
+
+import { verifyToken } from '../../../../../lib/auth/jwt.js';
+import { buildManifest } from '../../../../../lib/tickets/manifest.js';
+
+/**
+ * @openapi
+ * /api/checker/events/{id}/manifest:
+ *   get:
+ *     summary: Signed offline manifest for an event (checker access)
+ *     description: >
+ *       Returns every ticket of the event as a salted hash of its QR data with its
+ *       status, qr_version and expiry, so a checker device can validate scans
+ *       while offline. `manifest` is the exact signed JSON text; verify
+ *       `signature` (ECDSA P-256 / SHA-256, base64url, IEEE P1363) with the key
+ *       from /api/checker/manifest-key before parsing it.
+ *     tags:
+ *       - Checker
+ *     security:
+ *       - bearerAuth: []
+ *     parameters:
+ *       - in: path
+ *         name: id
+ *         required: true
+ *         schema:
+ *           type: string
+ *     responses:
+ *       200:
+ *         description: Signed manifest
+ *         content:
+ *           application/json:
+ *             schema:
+ *               type: object
+ *               properties:
+ *                 manifest:
+ *                   type: string
+ *                 signature:
+ *                   type: string
+ *                 kid:
+ *                   type: string
+ *                 count:
+ *                   type: integer
+ *                 stamp:
+ *                   type: string
+ *                   description: Issue stamp; send it back as manifest_stamp with scans made against this manifest
+ *       401:
+ *         description: Unauthorized
+ *       403:
+ *         description: Forbidden
+ *       404:
+ *         description: Event not found
+ */
+export default async function handler(req, res) {
+  if (req.method !== 'GET') {
+    return res.status(405).json({ error: 'Method not allowed' });
+  }
+
+  const auth = req.headers.authorization || '';
+  const token = auth.startsWith('Bearer ') ? auth.slice(7) : null;
+  if (!token) return res.status(401).json({ error: 'Unauthorized' });
+
+  let me;
+  try {
+    me = verifyToken(token);
+  } catch {
+    return res.status(401).json({ error: 'Invalid token' });
+  }
+
+  if (!['ADMIN', 'STAFF', 'CHECKER'].includes(me.role)) {
+    return res.status(403).json({ error: 'Forbidden' });
+  }
+
+  try {
+    const signed = await buildManifest(String(req.query.id));
+    if (!signed) {
+      return res.status(404).json({ error: 'Event not found' });
+    }
+    res.setHeader('Cache-Control', 'no-store');
+    return res.status(200).json(signed);
+  } catch (err) {
+    console.error('Error building offline manifest:', err);
+    return res.status(500).json({ error: 'Internal server error' });
+  }
+}
@@ -0,0 +1,45 @@
+// pages/api/checker/manifest-key.js
+
+import { verifyToken } from '../../../lib/auth/jwt.js';
+import { manifestPublicKey } from '../../../lib/tickets/manifest.js';
+
+/**
+ * @openapi
+ * /api/checker/manifest-key:
+ *   get:
+ *     summary: Public key for offline manifests (checker access)
+ *     description: ECDSA P-256 public key (JWK, with kid) that verifies the signature of /api/checker/events/{id}/manifest.
+ *     tags:
+ *       - Checker
+ *     security:
+ *       - bearerAuth: []
+ *     responses:
+ *       200:
+ *         description: Public JWK
+ *       401:
+ *         description: Unauthorized
+ *       403:
+ *         description: Forbidden
+ */
+export default async function handler(req, res) {
+  if (req.method !== 'GET') {
+    return res.status(405).json({ error: 'Method not allowed' });
+  }
+
+  const auth = req.headers.authorization || '';
+  const token = auth.startsWith('Bearer ') ? auth.slice(7) : null;
+  if (!token) return res.status(401).json({ error: 'Unauthorized' });
+
+  let me;
+  try {
+    me = verifyToken(token);
+  } catch {
+    return res.status(401).json({ error: 'Invalid token' });
+  }
+
+  if (!['ADMIN', 'STAFF', 'CHECKER'].includes(me.role)) {
+    return res.status(403).json({ error: 'Forbidden' });
+  }
+
+  return res.status(200).json(manifestPublicKey());
+}
@@ -0,0 +1,108 @@
+// pages/api/checker/sync.js
+
+import { verifyToken } from '../../../lib/auth/jwt.js';
+import { MAX_SYNC_SCANS, invalidScan, syncOfflineScans } from '../../../lib/tickets/offline-sync.js';
+
+/**
+ * @openapi
+ * /api/checker/sync:
+ *   post:
+ *     summary: Upload scans recorded offline (checker access)
+ *     description: >
+ *       Applies a checker device's queued offline scans for one event in
+ *       scanned_at order. The first admission of an issued ticket consumes it;
+ *       later admissions are reported as double_use. scan_id makes retries
+ *       idempotent (already_synced). scanned_at is clamped between the issue
+ *       time of the scan's manifest (manifest_stamp) and the upload; a scan
+ *       outside that window is judged at the clamped time and flagged with
+ *       clamped: true.
+ *     tags:
+ *       - Checker
+ *     security:
+ *       - bearerAuth: []
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             required: [event_id, scans]
+ *             properties:
+ *               event_id:
+ *                 type: string
+ *               scans:
+ *                 type: array
+ *                 maxItems: 1000
+ *                 items:
+ *                   type: object
+ *                   required: [scan_id, qr_text, scanned_at, admitted]
+ *                   properties:
+ *                     scan_id:
+ *                       type: string
+ *                       format: uuid
+ *                     qr_text:
+ *                       type: string
+ *                     scanned_at:
+ *                       type: string
+ *                       format: date-time
+ *                     admitted:
+ *                       type: boolean
+ *                     manifest_stamp:
+ *                       type: string
+ *                       description: stamp of the manifest the scan was checked against
+ *     responses:
+ *       200:
+ *         description: Per-scan outcomes (accepted, double_use, revoked, expired, invalid, rejected, already_synced) and counts
+ *       400:
+ *         description: Invalid input
+ *       401:
+ *         description: Unauthorized
+ *       403:
+ *         description: Forbidden
+ */
+export default async function handler(req, res) {
+  if (req.method !== 'POST') {
+    return res.status(405).json({ error: 'Method not allowed' });
+  }
+
+  const auth = req.headers.authorization || '';
+  const token = auth.startsWith('Bearer ') ? auth.slice(7) : null;
+  if (!token) return res.status(401).json({ error: 'Unauthorized' });
+
+  let me;
+  try {
+    me = verifyToken(token);
+  } catch {
+    return res.status(401).json({ error: 'Invalid token' });
+  }
+
+  if (!['ADMIN', 'STAFF', 'CHECKER'].includes(me.role)) {
+    return res.status(403).json({ error: 'Forbidden' });
+  }
+
+  const { event_id: eventId, scans } = req.body || {};
+  if (!eventId || typeof eventId !== 'string') {
+    return res.status(400).json({ error: 'event_id is required' });
+  }
+  if (!Array.isArray(scans) || scans.length === 0 || scans.length > MAX_SYNC_SCANS) {
+    return res.status(400).json({ error: `scans must be an array of 1..${MAX_SYNC_SCANS} items` });
+  }
+  for (let i = 0; i < scans.length; i++) {
+    const problem = invalidScan(scans[i]);
+    if (problem) return res.status(400).json({ error: `scans[${i}]: ${problem}` });
+  }
+
+  try {
+    const result = await syncOfflineScans({
+      eventId,
+      scans,
+      scannedByUserId: me.id,
+      userAgent: req.headers['user-agent'],
+      ip: req.headers['x-forwarded-for']?.split(',')[0].trim() || req.socket?.remoteAddress
+    });
+    return res.status(200).json(result);
+  } catch (err) {
+    console.error('Error syncing offline scans:', err);
+    return res.status(500).json({ error: 'Internal server error' });
+  }
+}
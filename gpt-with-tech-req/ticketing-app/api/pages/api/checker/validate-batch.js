@@ -0,0 +1,99 @@
+// pages/api/checker/validate-batch.js
+// Served as POST /api/checker/validate:batch (rewrite in next.config.js).
+
+import { verifyToken } from '../../../lib/auth/jwt.js';
+import { validateAndConsumeMany } from '../../../lib/tickets/validate.js';
+
+const MAX_BATCH = Math.max(parseInt(process.env.VALIDATE_BATCH_MAX || '50', 10) || 50, 1);
+
+/**
+ * @openapi
+ * /api/checker/validate:batch:
+ *   post:
+ *     summary: Validate and consume a batch of scanned QR codes (checker access)
+ *     description: >
+ *       For turnstile controllers that buffer several reads. Results come back
+ *       in request order with the same statuses as single validation, as if
+ *       the codes had been scanned one after another. Accessible to CHECKER,
+ *       STAFF, or ADMIN roles.
+ *     tags:
+ *       - Checker
+ *     security:
+ *       - bearerAuth: []
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             required: [qrTexts]
+ *             properties:
+ *               qrTexts:
+ *                 type: array
+ *                 description: Scanned QR texts (TKT:<version>:<data>), at most VALIDATE_BATCH_MAX (default 50)
+ *                 items:
+ *                   type: string
+ *     responses:
+ *       200:
+ *         description: One result per QR text
+ *         content:
+ *           application/json:
+ *             schema:
+ *               type: object
+ *               properties:
+ *                 results:
+ *                   type: array
+ *                   items:
+ *                     type: object
+ *                     properties:
+ *                       status:
+ *                         type: string
+ *                         enum: [valid_unused, already_used, invalid, expired, revoked]
+ *                       ticket:
+ *                         $ref: '#/components/schemas/Ticket'
+ *       400:
+ *         description: Invalid input
+ *       401:
+ *         description: Unauthorized
+ *       403:
+ *         description: Forbidden
+ */
+export default async function handler(req, res) {
+  if (req.method !== 'POST') {
+    return res.status(405).json({ error: 'Method not allowed' });
+  }
+
+  const auth = req.headers.authorization || '';
+  const token = auth.startsWith('Bearer ') ? auth.slice(7) : null;
+  if (!token) return res.status(401).json({ error: 'Unauthorized' });
+
+  let me;
+  try {
+    me = verifyToken(token);
+  } catch {
+    return res.status(401).json({ error: 'Invalid token' });
+  }
+
+  // Only ADMIN, STAFF, or CHECKER can validate tickets here
+  if (!['ADMIN', 'STAFF', 'CHECKER'].includes(me.role)) {
+    return res.status(403).json({ error: 'Forbidden' });
+  }
+
+  const { qrTexts } = req.body || {};
+  if (!Array.isArray(qrTexts) || qrTexts.length === 0 || qrTexts.length > MAX_BATCH) {
+    return res.status(400).json({ error: `qrTexts must be an array of 1..${MAX_BATCH} QR texts` });
+  }
+
+  try {
+    const results = await validateAndConsumeMany({
+      qrTexts,
+      scannedByUserId: me.id,
+      userAgent: req.headers['user-agent'],
+      ip: req.headers['x-forwarded-for']?.split(',')[0].trim() || req.socket?.remoteAddress
+    });
+    return res.status(200).json({ results });
+  } catch (err) {
+    console.error('Error validating ticket batch (checker):', err);
+    return res.status(500).json({ error: 'Internal server error' });
+  }
+}
@@ -1,5 +1,6 @@
 // pages/api/readyz.js
 import prisma from '../../lib/db/client';
+import { signingKeyProblem } from '../../lib/tickets/manifest.js';
 
 export const config = {
   api: {
@@ -58,6 +59,17 @@ export default async function handler(req, res) {
     });
   }
 
+  // Offline checkers can't verify manifests from instances with different keys
+  const manifestKey = signingKeyProblem();
+  if (manifestKey) {
+    return res.status(503).json({
+      status: 'not ready',
+      db: dbStatus,
+      manifest_key: manifestKey,
+      uptime,
+    });
+  }
+
   // You could add more checks here (cache, external APIs, etc.)
   return res.status(200).json({
     status: 'ready',
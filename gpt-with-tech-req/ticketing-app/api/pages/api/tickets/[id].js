@@ -2,6 +2,7 @@
 
 import prisma from '../../../lib/db/client.js';
 import { verifyToken } from '../../../lib/auth/jwt.js';
+import { invalidateTicket } from '../../../lib/tickets/cache.js';
 
 /**
  * @openapi
@@ -144,6 +145,7 @@ export default async function handler(req, res) {
       data,
       include: { event: true, ticket_type: true }
     });
+    invalidateTicket(id);
 
     return res.status(200).json(updated);
   }
@@ -157,6 +159,7 @@ export default async function handler(req, res) {
     }
 
     await prisma.ticket.delete({ where: { id } });
+    invalidateTicket(id);
     return res.status(204).end();
   }
 
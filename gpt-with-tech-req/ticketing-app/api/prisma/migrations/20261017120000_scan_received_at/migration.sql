@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "ticket_scans" ADD COLUMN     "received_at" TIMESTAMP(3);
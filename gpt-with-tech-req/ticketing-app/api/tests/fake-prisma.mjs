@@ -0,0 +1,67 @@
+// tests/fake-prisma.mjs
+// In-memory stand-in for the few PrismaClient calls the scan paths make, so
+// route + cache behaviour can be tested without Postgres. Tests seed and read
+// rows through `db` (shared by every PrismaClient instance).
+
+export const db = { events: new Set(), tickets: new Map(), scans: [], queries: [] };
+
+const pick = (row) => (row ? { ...row, ticket_type: { event_id: row.event_id ?? null } } : null);
+
+/** The subset of Prisma `where` the code under test uses: equality, { in: [...] } and ticket_type.event_id. */
+const matches = (row, where = {}) =>
+  Object.entries(where).every(([k, v]) => {
+    if (k === 'ticket_type') return row.event_id === v.event_id;
+    if (v && typeof v === 'object' && 'in' in v) return v.in.includes(row[k]);
+    return row[k] === v;
+  });
+
+export class PrismaClient {
+  constructor() {
+    this.event = {
+      findUnique: async ({ where }) => (db.events.has(where.id) ? { id: where.id } : null)
+    };
+    this.ticket = {
+      findMany: async ({ where }) => [...db.tickets.values()].filter((t) => matches(t, where)).map((t) => ({ ...t })),
+      findUnique: async ({ where }) => pick(db.tickets.get(where.id)),
+      findFirst: async ({ where }) => pick([...db.tickets.values()].find((t) => t.qr_token === where.qr_token)),
+      update: async ({ where, data }) => {
+        const row = db.tickets.get(where.id);
+        Object.assign(row, data);
+        return pick(row);
+      },
+      updateMany: async ({ where, data }) => {
+        const row = db.tickets.get(where.id);
+        if (!row || (where.status && row.status !== where.status)) return { count: 0 };
+        Object.assign(row, data);
+        return { count: 1 };
+      },
+      delete: async ({ where }) => {
+        const row = db.tickets.get(where.id);
+        db.tickets.delete(where.id);
+        return row;
+      }
+    };
+    this.ticketScan = {
+      findMany: async ({ where }) => db.scans.filter((s) => matches(s, where)),
+      create: async ({ data }) => db.scans.push(data),
+      createMany: async ({ data }) => db.scans.push(...data)
+    };
+  }
+
+  $transaction(fn) {
+    return fn(this);
+  }
+
+  // Only SYNC_CONSUME_SQL ($1 ticket ids, $2 used_at per id) so far.
+  async $queryRawUnsafe(sql, ids, usedAts) {
+    db.queries.push(sql);
+    const consumed = [];
+    ids.forEach((id, i) => {
+      const row = db.tickets.get(id);
+      if (row?.status !== 'ISSUED') return;
+      Object.assign(row, { status: 'USED', used_at: new Date(usedAts[i]) });
+      consumed.push({ id, used_at: row.used_at });
+    });
+    return consumed;
+  }
+}
@@ -0,0 +1,10 @@
+// tests/hooks.mjs
+// Module resolve hook: `@prisma/client` resolves to the in-memory fake.
+// Registered by the tests with module.register() before they import lib code.
+
+export async function resolve(specifier, context, next) {
+  if (specifier === '@prisma/client') {
+    return { url: new URL('./fake-prisma.mjs', import.meta.url).href, shortCircuit: true };
+  }
+  return next(specifier, context);
+}
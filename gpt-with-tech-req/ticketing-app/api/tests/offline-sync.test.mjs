@@ -0,0 +1,66 @@
+// tests/offline-sync.test.mjs
+// Offline scans are judged at a time the server can vouch for, and a batch is
+// consumed with one statement.
+
+import assert from 'node:assert/strict';
+import { randomUUID } from 'node:crypto';
+import { mkdtempSync } from 'node:fs';
+import { register } from 'node:module';
+import { tmpdir } from 'node:os';
+import { join } from 'node:path';
+import { beforeEach, test } from 'node:test';
+
+register('./hooks.mjs', import.meta.url);
+process.env.MANIFEST_KEY_FILE = join(mkdtempSync(join(tmpdir(), 'manifest-key-')), 'key.pem');
+
+const { db } = await import('@prisma/client');
+const { buildManifest } = await import('../lib/tickets/manifest.js');
+const { syncOfflineScans } = await import('../lib/tickets/offline-sync.js');
+
+const HOUR = 3600 * 1000;
+
+function scan(token, scannedAt, stamp, admitted = true) {
+  return { scan_id: randomUUID(), qr_text: `TKT:1:${token}`, scanned_at: new Date(scannedAt).toISOString(), admitted, manifest_stamp: stamp };
+}
+
+const sync = (scans) => syncOfflineScans({ eventId: 'e-1', scans, scannedByUserId: 'checker-1' });
+
+beforeEach(() => {
+  db.events.clear();
+  db.tickets.clear();
+  db.scans.length = 0;
+  db.queries.length = 0;
+  db.events.add('e-1');
+  const ticket = (id, fields) => db.tickets.set(id, { id, qr_token: `tok-${id}`, status: 'ISSUED', qr_version: 1, used_at: null, expires_at: null, event_id: 'e-1', ...fields });
+  ticket('a');
+  ticket('b', { expires_at: new Date(Date.now() - HOUR) });
+});
+
+test('a backdated scan cannot admit a ticket that expired before the manifest was issued', async () => {
+  const { stamp } = await buildManifest('e-1');
+  const [r] = (await sync([scan('tok-b', Date.now() - 2 * HOUR, stamp)])).results;
+  assert.equal(r.outcome, 'expired');
+  assert.equal(r.clamped, true);
+  assert.equal(db.tickets.get('b').status, 'ISSUED');
+  assert.ok(db.scans[0].scanned_at >= new Date(Number(stamp.split('.')[0])));
+  assert.ok(db.scans[0].received_at instanceof Date);
+});
+
+test('future or unstamped scan times are clamped to the upload', async () => {
+  const { stamp } = await buildManifest('e-1');
+  const before = Date.now();
+  const { results } = await sync([scan('tok-a', Date.now() + HOUR, stamp), scan('tok-a', Date.now() - HOUR, 'forged.stamp')]);
+  assert.deepEqual(results.map((r) => [r.outcome, r.clamped]), [['accepted', true], ['double_use', true]]);
+  assert.ok(db.tickets.get('a').used_at.getTime() <= Date.now() && db.tickets.get('a').used_at.getTime() >= before);
+});
+
+test('one consume statement per batch; the first admission wins', async () => {
+  const { stamp } = await buildManifest('e-1');
+  const t0 = Number(stamp.split('.')[0]);
+  await new Promise((resolve) => setTimeout(resolve, 50)); // scanned between issue and upload
+  const { summary, results } = await sync([scan('tok-a', t0 + 20, stamp), scan('tok-a', t0 + 10, stamp), scan('tok-a', t0 + 30, stamp, false)]);
+  assert.deepEqual(summary, { double_use: 1, accepted: 1, rejected: 1 });
+  assert.equal(results[1].outcome, 'accepted');
+  assert.equal(db.queries.length, 1);
+  assert.equal(db.tickets.get('a').used_at.getTime(), t0 + 10);
+});
@@ -0,0 +1,54 @@
+// tests/ticket-cache.test.mjs
+// A ticket changed or deleted through /api/tickets/[id] must not keep
+// validating from the hot ticket cache.
+
+import assert from 'node:assert/strict';
+import { register } from 'node:module';
+import { beforeEach, test } from 'node:test';
+
+register('./hooks.mjs', import.meta.url);
+
+const { db } = await import('@prisma/client');
+const { generateToken } = await import('../lib/auth/jwt.js');
+const { validateAndConsume } = await import('../lib/tickets/validate.js');
+const { ticketCache } = await import('../lib/tickets/cache.js');
+const { default: ticketRoute } = await import('../pages/api/tickets/[id].js');
+
+const owner = { id: 'user-1', email: 'owner@example.com', role: 'USER' };
+
+function call(handler, { method, id, body }) {
+  const req = { method, query: { id }, body, headers: { authorization: `Bearer ${generateToken(owner)}` } };
+  return new Promise((resolve) => {
+    const res = {
+      statusCode: 200,
+      status(code) {
+        this.statusCode = code;
+        return this;
+      },
+      json: () => resolve(res.statusCode),
+      end: () => resolve(res.statusCode)
+    };
+    handler(req, res);
+  });
+}
+
+const scan = () => validateAndConsume({ qrText: 'TKT:1:tok-1', scannedByUserId: 'checker-1', fastPath: false });
+
+beforeEach(() => {
+  db.tickets.clear();
+  ticketCache.clear();
+  db.tickets.set('t-1', { id: 't-1', qr_token: 'tok-1', status: 'USED', qr_version: 1, user_id: owner.id, event_id: 'e-1' });
+});
+
+test('a deleted ticket no longer validates from the cache', async () => {
+  assert.equal((await scan()).status, 'already_used'); // now cached as USED
+  assert.equal(await call(ticketRoute, { method: 'DELETE', id: 't-1' }), 204);
+  assert.equal((await scan()).status, 'invalid');
+});
+
+test('a re-statused ticket is read again after PATCH', async () => {
+  assert.equal((await scan()).status, 'already_used');
+  db.tickets.get('t-1').expires_at = new Date(0); // visible only if the row is re-read
+  assert.equal(await call(ticketRoute, { method: 'PATCH', id: 't-1', body: { status: 'USED' } }), 200);
+  assert.equal((await scan()).status, 'expired');
+});
@@ -0,0 +1,394 @@
+// web/src/app/core/services/offline-checker.service.ts
+import { Injectable, NgZone } from '@angular/core';
+import { BehaviorSubject, firstValueFrom } from 'rxjs';
+import { ApiService } from './api.service';
+
+/**
+ * Offline ticket checking.
+ *
+ * downloadManifest() fetches the signed per-event manifest
+ * (GET /checker/events/:id/manifest), verifies it with WebCrypto and keeps it in
+ * IndexedDB. The verifying key is pinned on first use: the first key fetched
+ * from /checker/manifest-key is stored, and manifests signed with any other
+ * key are refused until forgetManifestKey() is called (key rotation). Stored
+ * manifests are verified again before they are used.
+ *
+ * validate() then answers scans from an in-memory Map (one SHA-256 and one
+ * lookup per scan), marks admitted tickets as consumed and queues every scan.
+ * sync() uploads the queue to POST /checker/sync, which settles double uses;
+ * it runs automatically whenever the browser comes back online. Each scan
+ * carries the issue stamp of the manifest it was checked against, which the
+ * API uses to bound the device's scanned_at.
+ */
+
+export type OfflineStatus = 'valid_unused' | 'already_used' | 'invalid' | 'expired' | 'revoked';
+
+export interface OfflineVerdict {
+  status: OfflineStatus;
+  offline: true;
+}
+
+export interface QueuedScan {
+  scan_id: string;
+  event_id: string;
+  qr_text: string;
+  scanned_at: string;
+  admitted: boolean;
+  manifest_stamp?: string;
+}
+
+export interface SyncResult {
+  scan_id: string;
+  outcome: 'accepted' | 'double_use' | 'revoked' | 'expired' | 'invalid' | 'rejected' | 'already_synced';
+  ticket_id?: string;
+  used_at?: string | null;
+  /** The time the API judged the scan at. */
+  scanned_at?: string;
+  /** scanned_at was outside the manifest-issue..upload window and was clamped. */
+  clamped?: boolean;
+}
+
+export interface SyncResponse {
+  results: SyncResult[];
+  summary: Record<string, number>;
+}
+
+interface SignedManifest {
+  manifest: string;
+  signature: string;
+  kid: string;
+  count: number;
+  stamp: string;
+}
+
+interface ManifestBody {
+  v: number;
+  event_id: string;
+  generated_at: string;
+  salt: string;
+  kid: string;
+  /** [hash, status I|U|R|F, qr_version, expires_at epoch seconds or 0] */
+  tickets: [string, string, number, number][];
+}
+
+type ManifestKey = JsonWebKey & { kid: string };
+
+interface ManifestRecord extends SignedManifest {
+  event_id: string;
+  saved_at: string;
+}
+
+interface LoadedManifest {
+  eventId: string;
+  salt: string;
+  generatedAt: string;
+  stamp?: string;
+  entries: Map<string, { status: string; version: number; expires: number }>;
+  consumed: Set<string>;
+}
+
+const DB_NAME = 'ticketing-checker';
+const DB_VERSION = 2;
+const SYNC_BATCH = 500; // API accepts up to 1000 scans per request
+const HASH_CHARS = 22;
+const JWT_RE = /^\w+?\.\w+?\.\w+$/;
+
+@Injectable({
+  providedIn: 'root',
+})
+export class OfflineCheckerService {
+  /** Scans recorded offline and not yet synced. */
+  readonly pending$ = new BehaviorSubject<number>(0);
+
+  private db?: Promise<IDBDatabase>;
+  private key?: ManifestKey;
+  private active?: LoadedManifest;
+  private syncing?: Promise<SyncResponse>;
+
+  constructor(private api: ApiService, zone: NgZone) {
+    zone.runOutsideAngular(() => {
+      window.addEventListener('online', () => {
+        this.sync().catch((err) => console.warn('Offline scan sync failed:', err));
+      });
+    });
+    this.countPending().catch(() => undefined);
+  }
+
+  /** Event whose manifest is loaded, if any. */
+  get eventId(): string | undefined {
+    return this.active?.eventId;
+  }
+
+  /** Download, verify and store an event's manifest, then make it active. */
+  async downloadManifest(eventId: string): Promise<{ tickets: number; generatedAt: string }> {
+    const [signed, key] = await Promise.all([
+      firstValueFrom(this.api.get<SignedManifest>(`/checker/events/${encodeURIComponent(eventId)}/manifest`)),
+      this.trustedKey(true),
+    ]);
+    if (!key) throw new Error('No manifest key');
+    const body = await verified(signed, key, eventId);
+
+    // Tickets consumed by scans that are still queued stay consumed; synced
+    // ones are already USED in the fresh manifest.
+    const db = await this.open();
+    const pending = await this.queued(eventId);
+    const loaded = toLoaded(body, signed.stamp);
+    for (const scan of pending) {
+      if (scan.admitted) loaded.consumed.add(await hashQrData(loaded.salt, splitQrText(scan.qr_text)?.data ?? ''));
+    }
+    await tx(db, ['manifests', 'consumed'], 'readwrite', (t) => {
+      const record: ManifestRecord = { ...signed, event_id: eventId, saved_at: new Date().toISOString() };
+      t.objectStore('manifests').put(record);
+      const consumed = t.objectStore('consumed');
+      consumed.delete(eventRange(eventId));
+      loaded.consumed.forEach((hash) => consumed.put({ event_id: eventId, hash }));
+    });
+
+    this.active = loaded;
+    return { tickets: loaded.entries.size, generatedAt: loaded.generatedAt };
+  }
+
+  /** Make a previously downloaded manifest active (works offline). */
+  async useStoredManifest(eventId: string): Promise<boolean> {
+    const db = await this.open();
+    const record = await req<ManifestRecord | undefined>(
+      db.transaction('manifests').objectStore('manifests').get(eventId),
+    );
+    if (!record) return false;
+    const key = await this.trustedKey(false);
+    if (!key) return false;
+    const loaded = toLoaded(await verified(record, key, eventId), record.stamp);
+    const consumed = await req<{ hash: string }[]>(
+      db.transaction('consumed').objectStore('consumed').getAll(eventRange(eventId)),
+    );
+    consumed.forEach((c) => loaded.consumed.add(c.hash));
+    this.active = loaded;
+    return true;
+  }
+
+  /**
+   * Validate a scanned QR text against the active manifest. An admitted ticket
+   * is consumed locally; every parseable scan is queued for sync.
+   */
+  async validate(qrText: string): Promise<OfflineVerdict> {
+    const m = this.active;
+    if (!m) throw new Error('No offline manifest loaded');
+
+    const parsed = splitQrText(qrText);
+    if (!parsed) return { status: 'invalid', offline: true };
+
+    const hash = await hashQrData(m.salt, parsed.data);
+    const status = localStatus(m, hash, parsed);
+    const admitted = status === 'valid_unused';
+    if (admitted) m.consumed.add(hash);
+
+    const scan: QueuedScan = {
+      scan_id: crypto.randomUUID(),
+      event_id: m.eventId,
+      qr_text: qrText,
+      scanned_at: new Date().toISOString(),
+      admitted,
+      manifest_stamp: m.stamp,
+    };
+    const db = await this.open();
+    await tx(db, ['queue', 'consumed'], 'readwrite', (t) => {
+      t.objectStore('queue').put(scan);
+      if (admitted) t.objectStore('consumed').put({ event_id: m.eventId, hash });
+    });
+    this.pending$.next(this.pending$.value + 1);
+    return { status, offline: true };
+  }
+
+  /**
+   * Drop the pinned manifest key; the next download trusts whatever key the
+   * API serves. Only for a deliberate key rotation.
+   */
+  async forgetManifestKey(): Promise<void> {
+    const db = await this.open();
+    await tx(db, ['keys'], 'readwrite', (t) => t.objectStore('keys').delete('manifest'));
+    this.key = undefined;
+  }
+
+  /** Upload queued scans; synced scans leave the queue. Concurrent calls share one run. */
+  sync(): Promise<SyncResponse> {
+    if (!this.syncing) {
+      this.syncing = this.uploadQueue().finally(() => (this.syncing = undefined));
+    }
+    return this.syncing;
+  }
+
+  private async uploadQueue(): Promise<SyncResponse> {
+    const out: SyncResponse = { results: [], summary: {} };
+    if (!navigator.onLine) return out;
+
+    const db = await this.open();
+    const byEvent = new Map<string, QueuedScan[]>();
+    for (const scan of await this.queued()) {
+      const list = byEvent.get(scan.event_id);
+      if (list) list.push(scan);
+      else byEvent.set(scan.event_id, [scan]);
+    }
+
+    for (const [eventId, scans] of byEvent) {
+      for (let i = 0; i < scans.length; i += SYNC_BATCH) {
+        const batch = scans.slice(i, i + SYNC_BATCH).map(({ scan_id, qr_text, scanned_at, admitted, manifest_stamp }) => ({
+          scan_id,
+          qr_text,
+          scanned_at,
+          admitted,
+          manifest_stamp,
+        }));
+        const res = await firstValueFrom(
+          this.api.post<SyncResponse>('/checker/sync', { event_id: eventId, scans: batch }),
+        );
+        await tx(db, ['queue'], 'readwrite', (t) => {
+          res.results.forEach((r) => t.objectStore('queue').delete(r.scan_id));
+        });
+        out.results.push(...res.results);
+        Object.entries(res.summary).forEach(([k, n]) => (out.summary[k] = (out.summary[k] ?? 0) + n));
+      }
+    }
+    await this.countPending();
+    return out;
+  }
+
+  /** The pinned key; with fetch, the API's key is pinned now if none is yet. */
+  private async trustedKey(fetch: boolean): Promise<ManifestKey | undefined> {
+    if (this.key) return this.key;
+    const db = await this.open();
+    const stored = await req<{ id: string; jwk: ManifestKey } | undefined>(
+      db.transaction('keys').objectStore('keys').get('manifest'),
+    );
+    if (stored) {
+      this.key = stored.jwk;
+    } else if (fetch) {
+      const jwk = await firstValueFrom(this.api.get<ManifestKey>('/checker/manifest-key'));
+      await tx(db, ['keys'], 'readwrite', (t) => t.objectStore('keys').put({ id: 'manifest', jwk }));
+      this.key = jwk;
+    }
+    return this.key;
+  }
+
+  private async queued(eventId?: string): Promise<QueuedScan[]> {
+    const db = await this.open();
+    const all = await req<QueuedScan[]>(db.transaction('queue').objectStore('queue').getAll());
+    const scans = eventId ? all.filter((s) => s.event_id === eventId) : all;
+    return scans.sort((a, b) => a.scanned_at.localeCompare(b.scanned_at));
+  }
+
+  private async countPending(): Promise<void> {
+    const db = await this.open();
+    this.pending$.next(await req<number>(db.transaction('queue').objectStore('queue').count()));
+  }
+
+  private open(): Promise<IDBDatabase> {
+    this.db ??= new Promise((resolve, reject) => {
+      const r = indexedDB.open(DB_NAME, DB_VERSION);
+      r.onupgradeneeded = () => {
+        const stores: [string, IDBObjectStoreParameters][] = [
+          ['manifests', { keyPath: 'event_id' }],
+          ['consumed', { keyPath: ['event_id', 'hash'] }],
+          ['queue', { keyPath: 'scan_id' }],
+          ['keys', { keyPath: 'id' }],
+        ];
+        for (const [name, options] of stores) {
+          if (!r.result.objectStoreNames.contains(name)) r.result.createObjectStore(name, options);
+        }
+      };
+      r.onsuccess = () => resolve(r.result);
+      r.onerror = () => reject(r.error);
+    });
+    return this.db;
+  }
+}
+
+// ---------- helpers ----------
+
+/** Same checks, in the same order, as the API's validate path. */
+function localStatus(m: LoadedManifest, hash: string, qr: { version: number; data: string }): OfflineStatus {
+  const entry = m.entries.get(hash);
+  if (!entry) return 'invalid';
+  if (JWT_RE.test(qr.data) && entry.version !== qr.version) return 'invalid';
+  if (entry.expires && entry.expires * 1000 <= Date.now()) return 'expired';
+  if (entry.status === 'R' || entry.status === 'F') return 'revoked';
+  if (entry.status === 'U' || m.consumed.has(hash)) return 'already_used';
+  return entry.status === 'I' ? 'valid_unused' : 'invalid';
+}
+
+/** The parsed manifest, if it is signed by the pinned key and is for eventId. */
+async function verified(signed: SignedManifest, key: ManifestKey, eventId: string): Promise<ManifestBody> {
+  if (signed.kid !== key.kid) {
+    throw new Error(`Manifest is signed with key ${signed.kid}, not the trusted key ${key.kid}`);
+  }
+  if (!(await verifySignature(signed, key))) {
+    throw new Error('Manifest signature is not valid');
+  }
+  const body = JSON.parse(signed.manifest) as ManifestBody;
+  if (body.event_id !== eventId) {
+    throw new Error('Manifest is for another event');
+  }
+  return body;
+}
+
+function toLoaded(body: ManifestBody, stamp?: string): LoadedManifest {
+  const entries = new Map<string, { status: string; version: number; expires: number }>();
+  for (const [hash, status, version, expires] of body.tickets) {
+    entries.set(hash, { status, version, expires });
+  }
+  return { eventId: body.event_id, salt: body.salt, generatedAt: body.generated_at, stamp, entries, consumed: new Set() };
+}
+
+/** "TKT:<version>:<data>", as built by the API's buildQrText. */
+function splitQrText(text: string): { version: number; data: string } | null {
+  const [prefix, version, ...rest] = (text || '').split(':');
+  const data = rest.join(':');
+  const v = Number.parseInt(version, 10);
+  return prefix === 'TKT' && Number.isFinite(v) && data ? { version: v, data } : null;
+}
+
+async function hashQrData(salt: string, data: string): Promise<string> {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(`${salt}:${data}`));
+  return toBase64Url(new Uint8Array(digest)).slice(0, HASH_CHARS);
+}
+
+async function verifySignature(signed: SignedManifest, jwk: JsonWebKey): Promise<boolean> {
+  const key = await crypto.subtle.importKey('jwk', jwk, { name: 'ECDSA', namedCurve: 'P-256' }, false, ['verify']);
+  return crypto.subtle.verify(
+    { name: 'ECDSA', hash: 'SHA-256' },
+    key,
+    fromBase64Url(signed.signature),
+    new TextEncoder().encode(signed.manifest),
+  );
+}
+
+function toBase64Url(bytes: Uint8Array): string {
+  let s = '';
+  bytes.forEach((b) => (s += String.fromCharCode(b)));
+  return btoa(s).replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+}
+
+function fromBase64Url(s: string): Uint8Array {
+  const bin = atob(s.replace(/-/g, '+').replace(/_/g, '/'));
+  return Uint8Array.from(bin, (c) => c.charCodeAt(0));
+}
+
+function eventRange(eventId: string): IDBKeyRange {
+  return IDBKeyRange.bound([eventId, ''], [eventId, '\uffff']);
+}
+
+function req<T>(r: IDBRequest): Promise<T> {
+  return new Promise((resolve, reject) => {
+    r.onsuccess = () => resolve(r.result as T);
+    r.onerror = () => reject(r.error);
+  });
+}
+
+function tx(db: IDBDatabase, stores: string[], mode: IDBTransactionMode, fn: (t: IDBTransaction) => void): Promise<void> {
+  return new Promise((resolve, reject) => {
+    const t = db.transaction(stores, mode);
+    fn(t);
+    t.oncomplete = () => resolve();
+    t.onerror = () => reject(t.error);
+    t.onabort = () => reject(t.error);
+  });
+}
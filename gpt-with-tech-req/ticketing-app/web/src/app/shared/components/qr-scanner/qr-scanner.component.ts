@@ -1,6 +1,25 @@
 // web/src/app/shared/components/qr-scanner/qr-scanner.component.ts
-import { Component, OnInit } from '@angular/core';
-import { MatDialogRef } from '@angular/material/dialog';
+import { Component, Inject, OnInit, Optional } from '@angular/core';
+import { MAT_DIALOG_DATA, MatDialogRef } from '@angular/material/dialog';
+import {
+  OfflineCheckerService,
+  OfflineVerdict,
+} from '../../../core/services/offline-checker.service';
+
+/**
+ * Optional dialog data. With `offline: true` scans are validated against the
+ * event's manifest (downloaded now when online, else the stored copy) and the
+ * dialog closes with `{ qrText, verdict }`; otherwise it closes with the text.
+ */
+export interface QrScannerData {
+  eventId?: string;
+  offline?: boolean;
+}
+
+export interface OfflineScanResult {
+  qrText: string;
+  verdict: OfflineVerdict;
+}
 
 @Component({
   selector: 'app-qr-scanner',
@@ -11,10 +30,24 @@ export class QrScannerComponent implements OnInit {
   availableDevices: MediaDeviceInfo[] = [];
   currentDevice?: MediaDeviceInfo;
   torchEnabled = false;
+  offline = false;
+  offlineError?: string;
 
-  constructor(private dialogRef: MatDialogRef<QrScannerComponent>) {}
+  constructor(
+    private dialogRef: MatDialogRef<QrScannerComponent>,
+    private offlineChecker: OfflineCheckerService,
+    @Optional() @Inject(MAT_DIALOG_DATA) private data: QrScannerData | null,
+  ) {}
+
+  get pendingScans$() {
+    return this.offlineChecker.pending$;
+  }
 
   async ngOnInit(): Promise<void> {
+    if (this.data?.offline && this.data.eventId) {
+      await this.loadManifest(this.data.eventId);
+    }
+
     try {
       // Prompt for camera access so labels are available on some browsers
       await navigator.mediaDevices.getUserMedia({ video: true });
@@ -40,9 +73,33 @@ export class QrScannerComponent implements OnInit {
     }
   }
 
-  onCodeResult(result: string): void {
-    if (result) {
+  async onCodeResult(result: string): Promise<void> {
+    if (!result) return;
+    if (!this.offline) {
       this.dialogRef.close(result); // return the scanned QR payload to opener
+      return;
+    }
+    const verdict = await this.offlineChecker.validate(result);
+    const scan: OfflineScanResult = { qrText: result, verdict };
+    this.dialogRef.close(scan);
+  }
+
+  private async loadManifest(eventId: string): Promise<void> {
+    try {
+      if (navigator.onLine) {
+        await this.offlineChecker.downloadManifest(eventId);
+        this.offlineChecker.sync().catch(() => undefined);
+        this.offline = true;
+      } else {
+        this.offline = this.offlineChecker.eventId === eventId
+          || (await this.offlineChecker.useStoredManifest(eventId));
+      }
+    } catch (err) {
+      console.error('Failed to load offline manifest:', err);
+      this.offline = await this.offlineChecker.useStoredManifest(eventId).catch(() => false);
+    }
+    if (!this.offline) {
+      this.offlineError = 'No offline manifest for this event';
     }
   }
 
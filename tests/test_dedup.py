@@ -0,0 +1,27 @@
+from common.dedup import DedupStore
+
+
+def edit_in_place(path, data):
+    with open(path, "r+b") as f:
+        f.write(data)
+
+
+def test_hardlinked_output_edited_in_place_does_not_leak(tmp_path):
+    store = DedupStore(tmp_path / "store", "hardlink")
+    a, b = tmp_path / "a.env", tmp_path / "b.env"
+    assert store.link(b"PORT=3000", a) == "hardlink"
+    assert not a.stat().st_mode & 0o222       # blobs, and so hardlinks, are read-only
+
+    a.chmod(0o644)
+    edit_in_place(a, b"PORT=3001")
+    store.link(b"PORT=3000", b)
+    assert b.read_bytes() == b"PORT=3000"
+
+
+def test_auto_never_hardlinks(tmp_path):
+    store = DedupStore(tmp_path / "store", "auto")
+    a, b = tmp_path / "a.env", tmp_path / "b.env"
+    assert store.link(b"PORT=3000", a) in ("reflink", "copy")
+    store.link(b"PORT=3000", b)
+    assert a.stat().st_nlink == 1 and b.stat().st_nlink == 1
+    assert store.stats["hardlink"] == 0
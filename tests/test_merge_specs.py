@@ -0,0 +1,14 @@
+from common.merge_specs import build_plan, index_spec
+
+
+def spec(path, body):
+    path.write_text(f"### `a.txt`\n```\n{body}\n```\n")
+    return str(path)
+
+
+def test_strip_only_differences_do_not_conflict(tmp_path):
+    specs = [spec(tmp_path / "one.md", "hello"), spec(tmp_path / "two.md", "\nhello  \n")]
+    _, conflicts = build_plan([index_spec(s, strip=True) for s in specs])
+    assert conflicts == {}
+    _, conflicts = build_plan([index_spec(s) for s in specs])
+    assert list(conflicts) == ["a.txt"]
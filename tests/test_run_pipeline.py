@@ -0,0 +1,22 @@
+import subprocess
+import sys
+from pathlib import Path
+
+PIPELINE = Path(__file__).resolve().parents[1] / "gpt-with-tech-req" / "run-pipeline.py"
+
+
+def run(tmp_path, *args):
+    return subprocess.run([sys.executable, str(PIPELINE), "--root", "app", *args],
+                          cwd=tmp_path, capture_output=True, text=True)
+
+
+def test_rerun_with_root_invalidated(tmp_path):
+    first = run(tmp_path)
+    assert first.returncode == 0, first.stdout
+    secret = [l for l in (tmp_path / "app/.env.example").read_text().splitlines() if l.startswith("JWT_SECRET=")]
+
+    second = run(tmp_path, "--force", "root")
+    assert second.returncode == 0, second.stdout
+    assert "root: ran" in second.stdout
+    assert "cancelled" not in second.stdout
+    assert [l for l in (tmp_path / "app/.env.example").read_text().splitlines() if l.startswith("JWT_SECRET=")] == secret
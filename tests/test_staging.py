@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from common.emit import CREATED, UNCHANGED, FileEmitter
+from common.manifest import Manifest
+from common.staging import StagedTree
+
+
+def test_commit_moves_only_written_files(tmp_path):
+    app = tmp_path / "app"
+    (app / "node_modules/pkg").mkdir(parents=True)
+    (app / "node_modules/pkg/index.js").write_text("dep")
+    (app / "src").mkdir()
+    (app / "src/main.ts").write_text("old")
+    dir_ino = app.stat().st_ino
+    dep_ino = (app / "node_modules/pkg/index.js").stat().st_ino
+
+    with StagedTree(app) as stage:
+        assert not any(stage.path.iterdir())          # nothing seeded from the live tree
+        (stage.path / "src").mkdir()
+        (stage.path / "src/main.ts").write_text("new")
+        (stage.path / "src/app.ts").write_text("app")
+
+    assert app.stat().st_ino == dir_ino               # watchers keep their directory
+    assert (app / "node_modules/pkg/index.js").stat().st_ino == dep_ino
+    assert (app / "src/main.ts").read_text() == "new"
+    assert (app / "src/app.ts").read_text() == "app"
+    assert [p.name for p in tmp_path.iterdir()] == ["app"]
+
+
+def test_staged_emitter_compares_against_live_tree(tmp_path):
+    app = tmp_path / "app"
+    app.mkdir()
+    (app / "same.txt").write_text("same")
+    stage = StagedTree(app).begin()
+    with FileEmitter(manifest=Manifest(app), no_clobber=True, live=stage.live) as em:
+        em.submit("same.txt", stage.path / "same.txt", "same")
+        em.submit("other.txt", stage.path / "other.txt", "x")
+        list(em.drain())
+    assert em.counts[UNCHANGED] == 1 and em.counts[CREATED] == 1
+    assert not (stage.path / "same.txt").exists()
+    stage.abort()
+
+
+def test_interrupted_commit_leaves_whole_files_and_can_finish(tmp_path, monkeypatch):
+    app = tmp_path / "app"
+    app.mkdir()
+    for name in "abcd":
+        (app / f"{name}.txt").write_text("old " * 1000)
+
+    stage = StagedTree(app).begin()
+    for name in "abcd":
+        (stage.path / f"{name}.txt").write_text("new " * 1000)
+
+    real_replace, moved = os.replace, []
+
+    def replace(src, dst):
+        if len(moved) == 2:
+            raise KeyboardInterrupt
+        real_replace(src, dst)
+        moved.append(dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(KeyboardInterrupt):
+        stage.commit()
+    contents = sorted(p.read_text() for p in app.iterdir())
+    assert contents == ["new " * 1000] * 2 + ["old " * 1000] * 2   # mixed, but no file half written
+
+    monkeypatch.setattr(os, "replace", real_replace)
+    stage.commit()
+    assert all(p.read_text() == "new " * 1000 for p in app.iterdir())
+    assert [p.name for p in tmp_path.iterdir()] == ["app"]